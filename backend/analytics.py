@@ -0,0 +1,154 @@
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+# Columnar analytics over a user's expenses. ColumnarSnapshot turns the
+# list of dicts into NumPy arrays once per expense version; the functions
+# below answer analytics questions with whole-array operations instead of
+# per-expense Python loops.
+
+FLAGS = (None, "red", "green")
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+PERCENTILES = (50, 90, 95)
+
+
+class ColumnarSnapshot:
+    """One user's expenses as parallel arrays.
+
+    amount: float64; day: int32 days since 1970-01-01; category: int16 index
+    into `categories`; flag: int8 index into FLAGS.
+    """
+
+    def __init__(self, amount: np.ndarray, day: np.ndarray, category: np.ndarray, flag: np.ndarray,
+                 categories: List[str]):
+        self.amount = amount
+        self.day = day
+        self.category = category
+        self.flag = flag
+        self.categories = categories
+
+    @classmethod
+    def from_expenses(cls, expenses: Sequence[dict]) -> "ColumnarSnapshot":
+        count = len(expenses)
+        amount = np.fromiter((expense["amount"] for expense in expenses), dtype=np.float64, count=count)
+        day = np.array([expense["date"][:10] for expense in expenses], dtype="datetime64[D]").astype(np.int32)
+        category_ids: Dict[str, int] = {}
+        category = np.fromiter(
+            (category_ids.setdefault(expense["category"], len(category_ids)) for expense in expenses),
+            dtype=np.int16, count=count,
+        )
+        flag_ids = {name: index for index, name in enumerate(FLAGS)}
+        flag = np.fromiter((flag_ids.get(expense.get("flag"), 0) for expense in expenses), dtype=np.int8, count=count)
+        return cls(amount, day, category, flag, list(category_ids))
+
+    def __len__(self) -> int:
+        return len(self.amount)
+
+    @property
+    def nbytes(self) -> int:
+        return self.amount.nbytes + self.day.nbytes + self.category.nbytes + self.flag.nbytes
+
+
+def _day_label(day: int) -> str:
+    return str(np.datetime64(int(day), "D"))
+
+
+def summary(snapshot: ColumnarSnapshot) -> dict:
+    flags = np.bincount(snapshot.flag, minlength=len(FLAGS))
+    return {
+        "total": round(float(snapshot.amount.sum()), 2),
+        "count": len(snapshot),
+        "mean": round(float(snapshot.amount.mean()), 2) if len(snapshot) else 0.0,
+        "first_date": _day_label(snapshot.day.min()) if len(snapshot) else None,
+        "last_date": _day_label(snapshot.day.max()) if len(snapshot) else None,
+        "flags": {"red": int(flags[1]), "green": int(flags[2])},
+    }
+
+
+def category_stats(snapshot: ColumnarSnapshot, percentiles: Iterable[int] = PERCENTILES) -> List[dict]:
+    """Total, count, mean and amount percentiles per category, largest total first."""
+    if not len(snapshot):
+        return []
+    percentiles = list(percentiles)
+    totals = np.bincount(snapshot.category, weights=snapshot.amount, minlength=len(snapshot.categories))
+    counts = np.bincount(snapshot.category, minlength=len(snapshot.categories))
+    # Sort by (category, amount) once; each category is then one contiguous, sorted slice
+    order = np.lexsort((snapshot.amount, snapshot.category))
+    sorted_amounts = snapshot.amount[order]
+    bounds = np.concatenate(([0], np.cumsum(counts)))
+    stats = []
+    for index, name in enumerate(snapshot.categories):
+        if not counts[index]:
+            continue
+        values = np.percentile(sorted_amounts[bounds[index]:bounds[index + 1]], percentiles)
+        stats.append({
+            "category": name,
+            "total": round(float(totals[index]), 2),
+            "count": int(counts[index]),
+            "mean": round(float(totals[index] / counts[index]), 2),
+            **{f"p{p}": round(float(value), 2) for p, value in zip(percentiles, values)},
+        })
+    stats.sort(key=lambda item: item["total"], reverse=True)
+    return stats
+
+
+def day_of_week(snapshot: ColumnarSnapshot) -> List[dict]:
+    """Total, count and mean spend per weekday, Monday first."""
+    # 1970-01-01 was a Thursday
+    weekday = (snapshot.day + 3) % 7
+    totals = np.bincount(weekday, weights=snapshot.amount, minlength=7)
+    counts = np.bincount(weekday, minlength=7)
+    means = np.divide(totals, counts, out=np.zeros(7), where=counts > 0)
+    return [
+        {"day": WEEKDAYS[index], "total": round(float(totals[index]), 2), "count": int(counts[index]),
+         "mean": round(float(means[index]), 2)}
+        for index in range(7)
+    ]
+
+
+def rolling_daily(snapshot: ColumnarSnapshot, windows: Sequence[int] = (7, 30), last_days: int = 90) -> List[dict]:
+    """Daily totals over the last `last_days` days of data, with trailing rolling averages per window."""
+    if not len(snapshot):
+        return []
+    first, last = int(snapshot.day.min()), int(snapshot.day.max())
+    daily = np.bincount(snapshot.day - first, weights=snapshot.amount, minlength=last - first + 1)
+    cumulative = np.concatenate(([0.0], np.cumsum(daily)))
+    start = max(0, len(daily) - last_days)
+    positions = np.arange(start, len(daily))
+    averages = {}
+    for window in windows:
+        # Days before the first expense count as zero spend
+        lower = np.maximum(positions + 1 - window, 0)
+        averages[window] = (cumulative[positions + 1] - cumulative[lower]) / window
+    return [
+        {"date": _day_label(first + position), "total": round(float(daily[position]), 2),
+         **{f"avg_{window}d": round(float(averages[window][offset]), 2) for window in windows}}
+        for offset, position in enumerate(positions)
+    ]
+
+
+def month_over_month(snapshot: ColumnarSnapshot) -> List[dict]:
+    """Total per calendar month, oldest first, with the change from the month before."""
+    if not len(snapshot):
+        return []
+    month = snapshot.day.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    first = int(month.min())
+    totals = np.bincount(month - first, weights=snapshot.amount)
+    previous = np.concatenate(([np.nan], totals[:-1]))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = (totals - previous) / previous * 100
+    return [
+        {"month": str(np.datetime64(first + index, "M")), "total": round(float(totals[index]), 2),
+         "change_pct": round(float(change[index]), 1) if np.isfinite(change[index]) else None}
+        for index in range(len(totals))
+    ]
+
+
+def analyze(snapshot: ColumnarSnapshot, last_days: int = 90) -> dict:
+    return {
+        "summary": summary(snapshot),
+        "categories": category_stats(snapshot),
+        "day_of_week": day_of_week(snapshot),
+        "daily": rolling_daily(snapshot, last_days=last_days),
+        "month_over_month": month_over_month(snapshot),
+    }
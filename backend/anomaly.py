@@ -0,0 +1,178 @@
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Automatic red-flag suggestions for unusually large expenses. Per user and
+# category we keep an exponentially weighted mean and variance of
+# log(amount) (expenses are roughly log-normal), updated in O(1) per new
+# expense. A new expense whose log-amount sits ANOMALY_Z_THRESHOLD standard
+# deviations above its category's mean is suggested as a red flag. Memory
+# per user is bounded by ANOMALY_MAX_CATEGORIES stats and
+# ANOMALY_MAX_SUGGESTIONS suggestions.
+
+ANOMALY_Z_THRESHOLD = float(os.environ.get("ANOMALY_Z_THRESHOLD", "3.0"))
+ANOMALY_MIN_HISTORY = int(os.environ.get("ANOMALY_MIN_HISTORY", "5"))
+# Expenses after which an old one's weight in a category's stats has halved
+ANOMALY_HALF_LIFE = float(os.environ.get("ANOMALY_HALF_LIFE", "30"))
+ANOMALY_MAX_CATEGORIES = int(os.environ.get("ANOMALY_MAX_CATEGORIES", "64"))
+ANOMALY_MAX_SUGGESTIONS = int(os.environ.get("ANOMALY_MAX_SUGGESTIONS", "100"))
+
+# Floor for the standard deviation of log(amount), about 10%: without it a
+# category of identical bills would flag any change in price
+MIN_LOG_STD = 0.1
+
+
+class _UserState:
+    def __init__(self, version: int):
+        self.version = version
+        # category -> [mean, variance, count] of log(amount)
+        self.stats: Dict[str, list] = {}
+        # expense id -> suggestion, oldest first
+        self.suggestions: "OrderedDict[int, dict]" = OrderedDict()
+
+
+class AnomalyDetector:
+    """Per-user EWMA stats and red-flag suggestions, built lazily with `load` and updated by `record`.
+
+    `load(username)` returns (version, expenses) as one consistent snapshot.
+    A user's state is rebuilt from the store if it misses a version.
+    """
+
+    def __init__(self, load: Callable[[str], Tuple[int, Iterable[dict]]], threshold: float = ANOMALY_Z_THRESHOLD,
+                 min_history: int = ANOMALY_MIN_HISTORY, half_life: float = ANOMALY_HALF_LIFE,
+                 max_categories: int = ANOMALY_MAX_CATEGORIES, max_suggestions: int = ANOMALY_MAX_SUGGESTIONS):
+        self.load = load
+        self.threshold = threshold
+        self.min_history = min_history
+        self.alpha = 1 - 0.5 ** (1 / half_life)
+        self.max_categories = max_categories
+        self.max_suggestions = max_suggestions
+        self._users: Dict[str, _UserState] = {}
+        self._lock = threading.Lock()
+
+    def backfill(self, state: _UserState, expenses: Iterable[dict], exclude_id: Optional[int] = None):
+        """Score and learn from existing expenses in store order. Hand-flagged ones are learned, not suggested."""
+        alpha, threshold, min_history = self.alpha, self.threshold, self.min_history
+        stats, log = state.stats, math.log
+        for expense in expenses:
+            amount = expense["amount"]
+            if amount <= 0 or expense["id"] == exclude_id:
+                continue
+            x = log(amount)
+            cell = stats.get(expense["category"])
+            if cell is None:
+                if len(stats) >= self.max_categories:
+                    del stats[next(iter(stats))]
+                stats[expense["category"]] = [x, 0.0, 1]
+                continue
+            diff = x - cell[0]
+            if cell[2] >= min_history and expense.get("flag") is None:
+                std = math.sqrt(cell[1])
+                if diff > threshold * (std if std > MIN_LOG_STD else MIN_LOG_STD):
+                    self._suggest(state, expense, cell)
+            increment = alpha * diff
+            cell[0] += increment
+            cell[1] = (1 - alpha) * (cell[1] + diff * increment)
+            cell[2] += 1
+
+    def _score(self, cell: Optional[list], amount: float) -> Optional[float]:
+        """Standard deviations of log(amount) above the category mean; None without enough history."""
+        if cell is None or cell[2] < self.min_history or amount <= 0:
+            return None
+        return (math.log(amount) - cell[0]) / max(math.sqrt(cell[1]), MIN_LOG_STD)
+
+    def _learn(self, state: _UserState, expense: dict):
+        """Fold one expense into its category's stats (the update backfill() does inline)."""
+        if expense["amount"] <= 0:
+            return
+        x = math.log(expense["amount"])
+        cell = state.stats.get(expense["category"])
+        if cell is None:
+            if len(state.stats) >= self.max_categories:
+                del state.stats[next(iter(state.stats))]
+            state.stats[expense["category"]] = [x, 0.0, 1]
+            return
+        diff = x - cell[0]
+        increment = self.alpha * diff
+        cell[0] += increment
+        cell[1] = (1 - self.alpha) * (cell[1] + diff * increment)
+        cell[2] += 1
+
+    def _suggest(self, state: _UserState, expense: dict, cell: list):
+        score = self._score(cell, expense["amount"])
+        state.suggestions[expense["id"]] = {
+            "id": expense["id"],
+            "category": expense["category"],
+            "amount": expense["amount"],
+            "date": expense["date"],
+            "description": expense.get("description"),
+            "score": round(score, 2),
+            "typical_amount": round(math.exp(cell[0]), 2),
+            "suggested_flag": "red",
+        }
+        state.suggestions.move_to_end(expense["id"])
+        while len(state.suggestions) > self.max_suggestions:
+            state.suggestions.popitem(last=False)
+
+    def _build(self, version: int, expenses: Iterable[dict], exclude_id: Optional[int] = None) -> _UserState:
+        state = _UserState(version)
+        self.backfill(state, expenses, exclude_id)
+        return state
+
+    def record(self, username: str, version: int, op: str, before: Optional[dict], after: Optional[dict]):
+        """Expense change listener: score adds and edits inline.
+
+        Adds are scored against the stats before them, then learned. Edits are
+        rescored but not learned again. A delete or a hand-set flag drops the
+        expense's suggestion.
+        """
+        expense = after if after is not None else before
+        with self._lock:
+            state = self._users.get(username)
+            if state is None or state.version != version - 1:
+                # Called under the store's write lock, so the snapshot already includes this change
+                _, expenses = self.load(username)
+                state = self._users[username] = self._build(version, expenses, expense["id"] if op == "add" else None)
+            state.version = version
+            state.suggestions.pop(expense["id"], None)
+            if op not in ("add", "edit") or after.get("flag") is not None:
+                return
+            cell = state.stats.get(after["category"])
+            score = self._score(cell, after["amount"])
+            if score is not None and score > self.threshold:
+                self._suggest(state, after, cell)
+            if op == "add":
+                self._learn(state, after)
+
+    def suggestion(self, username: str, expense_id: int) -> Optional[dict]:
+        """The open suggestion for one expense, if any (as left by its last add or edit)."""
+        with self._lock:
+            state = self._users.get(username)
+            return state.suggestions.get(expense_id) if state is not None else None
+
+    def suggestions(self, username: str, current_version: int) -> List[dict]:
+        """Open red-flag suggestions, newest first."""
+        with self._lock:
+            state = self._users.get(username)
+            if state is not None and state.version == current_version:
+                return list(reversed(state.suggestions.values()))
+        version, expenses = self.load(username)
+        state = self._build(version, expenses)
+        with self._lock:
+            current = self._users.get(username)
+            if current is None or current.version < version:
+                self._users[username] = state
+            return list(reversed(state.suggestions.values()))
+
+    def dismiss(self, username: str, expense_id: int) -> bool:
+        with self._lock:
+            state = self._users.get(username)
+            return state is not None and state.suggestions.pop(expense_id, None) is not None
+
+    def sizes(self) -> Tuple[int, int]:
+        """(category stats, open suggestions) across all users."""
+        with self._lock:
+            states = list(self._users.values())
+            return sum(len(state.stats) for state in states), sum(len(state.suggestions) for state in states)
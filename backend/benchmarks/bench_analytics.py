@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the vectorized analytics behind GET /analytics
+
+Builds --rows synthetic expenses (default 1M over two years) and times each
+analytics function on the NumPy columnar snapshot against a pure-Python
+equivalent over the list of dicts, checking that both give the same
+answer. The one-off snapshot build (paid once per expense version) is
+reported separately.
+
+Requires numpy. Usage: python benchmarks/bench_analytics.py [--rows N] [--repeat N]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import analytics
+from bench_api import synthetic_expenses
+
+
+# --- Pure-Python equivalents ---
+
+def py_category_stats(expenses):
+    by_category = {}
+    for expense in expenses:
+        by_category.setdefault(expense["category"], []).append(expense["amount"])
+    stats = []
+    for category, amounts in by_category.items():
+        amounts.sort()
+        item = {"category": category, "total": round(sum(amounts), 2), "count": len(amounts),
+                "mean": round(sum(amounts) / len(amounts), 2)}
+        for p in analytics.PERCENTILES:
+            # Linear interpolation, as numpy.percentile
+            rank = (len(amounts) - 1) * p / 100
+            low = math.floor(rank)
+            high = min(low + 1, len(amounts) - 1)
+            item[f"p{p}"] = round(amounts[low] + (amounts[high] - amounts[low]) * (rank - low), 2)
+        stats.append(item)
+    stats.sort(key=lambda item: item["total"], reverse=True)
+    return stats
+
+
+def py_day_of_week(expenses):
+    totals, counts = [0.0] * 7, [0] * 7
+    for expense in expenses:
+        weekday = date.fromisoformat(expense["date"]).weekday()
+        totals[weekday] += expense["amount"]
+        counts[weekday] += 1
+    return [{"day": analytics.WEEKDAYS[index], "total": round(totals[index], 2), "count": counts[index],
+             "mean": round(totals[index] / counts[index], 2) if counts[index] else 0.0} for index in range(7)]
+
+
+def py_rolling_daily(expenses, windows=(7, 30), last_days=90):
+    daily = {}
+    for expense in expenses:
+        daily[expense["date"]] = daily.get(expense["date"], 0.0) + expense["amount"]
+    first, last = date.fromisoformat(min(daily)), date.fromisoformat(max(daily))
+    days = [(first + timedelta(days=offset)).isoformat() for offset in range((last - first).days + 1)]
+    totals = [daily.get(day, 0.0) for day in days]
+    result = []
+    for position in range(max(0, len(days) - last_days), len(days)):
+        item = {"date": days[position], "total": round(totals[position], 2)}
+        for window in windows:
+            item[f"avg_{window}d"] = round(sum(totals[max(0, position + 1 - window):position + 1]) / window, 2)
+        result.append(item)
+    return result
+
+
+def py_month_over_month(expenses):
+    months = {}
+    for expense in expenses:
+        months[expense["date"][:7]] = months.get(expense["date"][:7], 0.0) + expense["amount"]
+    result, previous = [], None
+    year, month = map(int, min(months).split("-"))
+    while f"{year:04d}-{month:02d}" <= max(months):
+        key = f"{year:04d}-{month:02d}"
+        total = months.get(key, 0.0)
+        change = round((total - previous) / previous * 100, 1) if previous else None
+        result.append({"month": key, "total": round(total, 2), "change_pct": change})
+        previous = total
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return result
+
+
+def best_of(repeat, fn):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def close(a, b):
+    """Equal up to float summation order (cent rounding can differ by one)."""
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(close(a[key], b[key]) for key in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(close(x, y) for x, y in zip(a, b))
+    if isinstance(a, float) and isinstance(b, float):
+        return abs(a - b) <= max(0.011, abs(a) * 1e-9)
+    return a == b
+
+
+def main_benchmark():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--rows", type=int, default=1_000_000)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    expenses = synthetic_expenses(random.Random(7), args.rows)
+    build, snapshot = best_of(1, lambda: analytics.ColumnarSnapshot.from_expenses(expenses))
+    print(f"{args.rows} rows, snapshot build {build * 1000:.0f} ms, {snapshot.nbytes / 2**20:.1f} MB")
+    print(f"{'function':<18}{'python ms':>11}{'numpy ms':>10}{'speedup':>9}{'same':>6}")
+    cases = [
+        ("category_stats", py_category_stats, analytics.category_stats),
+        ("day_of_week", py_day_of_week, analytics.day_of_week),
+        ("rolling_daily", py_rolling_daily, analytics.rolling_daily),
+        ("month_over_month", py_month_over_month, analytics.month_over_month),
+    ]
+    for name, python_fn, numpy_fn in cases:
+        python_time, expected = best_of(args.repeat, lambda: python_fn(expenses))
+        numpy_time, actual = best_of(args.repeat, lambda: numpy_fn(snapshot))
+        print(f"{name:<18}{python_time * 1000:>11.1f}{numpy_time * 1000:>10.2f}{python_time / numpy_time:>8.0f}x"
+              f"{'yes' if close(expected, actual) else 'NO':>6}")
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the anomaly detector behind red-flag suggestions
+
+Backfills the detector over --rows synthetic expenses per run (the cold
+start for a user with existing history) and reports rows scored per second,
+then the latency of scoring one new expense inline, and the memory held per
+user (category stats and suggestions are both capped).
+
+Usage: python benchmarks/bench_anomaly.py [--rows 100000,1000000] [--inserts N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from anomaly import AnomalyDetector
+from bench_api import synthetic_expenses
+
+
+def run(rows_list, inserts):
+    rng = random.Random(7)
+    print(f"{'rows':>9}{'backfill ms':>13}{'rows/s':>12}{'insert us':>11}{'stats':>7}{'suggestions':>13}")
+    for rows in rows_list:
+        expenses = synthetic_expenses(rng, rows)
+        state = {"version": 1}
+        detector = AnomalyDetector(lambda username: (state["version"], expenses))
+
+        start = time.perf_counter()
+        detector.suggestions("bench", state["version"])
+        backfill = time.perf_counter() - start
+
+        new = synthetic_expenses(rng, inserts)
+        start = time.perf_counter()
+        for index, expense in enumerate(new):
+            expense["id"] = rows + index + 1
+            state["version"] += 1
+            detector.record("bench", state["version"], "add", None, expense)
+        insert = (time.perf_counter() - start) / inserts
+
+        stats, suggestions = detector.sizes()
+        print(f"{rows:>9}{backfill * 1000:>13.1f}{rows / backfill:>12,.0f}{insert * 1e6:>11.2f}"
+              f"{stats:>7}{suggestions:>13}")
+
+
+def main_benchmark():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--rows", default="100000,1000000")
+    arg_parser.add_argument("--inserts", type=int, default=10_000)
+    args = arg_parser.parse_args()
+    run([int(rows) for rows in args.rows.split(",")], args.inserts)
+
+
+if __name__ == "__main__":
+    main_benchmark()
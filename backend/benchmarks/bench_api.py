@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+In-process load test for the API (main.py and main_simple.py)
+
+Drives the ASGI app directly with an async httpx client (no server, no
+network) at a controlled concurrency, after loading N synthetic users x M
+expenses into the in-memory stores. Replicate and Tesseract are replaced by
+local stand-ins with configurable latency, so no API token or OCR install is
+needed. For every endpoint it reports throughput and p50/p95/p99 latency.
+
+Not driven: GET /expenses/stream (a server-sent event stream never finishes,
+and httpx's ASGI transport only returns a response once its body is
+complete), DELETE /expenses/flag-suggestions/{id} (each user only has the
+few suggestions the anomaly detector raises, so repeated calls would
+measure 404s), and FastAPI's generated /docs, /redoc and /openapi.json.
+
+Baselines are kept in benchmarks/baselines/api_<app>.json. With --save-baseline
+the run is written there; otherwise, if a baseline exists, each endpoint is
+compared against it and the script exits 1 if p95 latency rose or throughput
+fell by more than --threshold (default 25%).
+
+Requires httpx. Usage:
+  python benchmarks/bench_api.py [--app main|main_simple|all] [--users N] [--expenses M]
+      [--requests N] [--concurrency N] [--endpoints a,b] [--llm-latency S] [--ocr-latency S]
+      [--threshold F] [--save-baseline]
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import importlib
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+# Configure the apps for an in-process run before they are imported
+os.environ.setdefault("REPLICATE_API_TOKEN", "r8_benchmark_placeholder")
+os.environ.setdefault("RECEIPT_WARMUP", "lazy")
+os.environ.setdefault("OCR_WORKERS", "0")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# Measures capacity, not the per-user limits
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx
+
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures", "ocr")
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+
+CATEGORIES = ["Food", "Shopping", "Transport", "Health", "Entertainment", "Utilities", "Other"]
+DESCRIPTIONS = {
+    "Food": ["Lunch with colleagues", "Coffee", "Groceries", "Dinner out", "Receipt items - MILK 1L", "Bakery"],
+    "Shopping": ["New headphones", "T-shirt", "Phone case", "Receipt items - USB CABLE", "Shoes"],
+    "Transport": ["Metro card recharge", "Cab to airport", "Fuel", "Parking", "Bus pass"],
+    "Health": ["Pharmacy", "Receipt items - PARACETAMOL", "Doctor visit", "Gym membership"],
+    "Entertainment": ["Movie tickets", "Streaming subscription", "Concert", "Video game"],
+    "Utilities": ["Electricity bill", "Internet bill", "Water bill", "Mobile recharge"],
+    "Other": ["Gift", "Donation", "Laundry", "Haircut"],
+}
+PASSWORD = "password123"
+
+
+# --- Local stand-ins ---
+
+class FakeReplicate:
+    """Stands in for the replicate module: run() blocks for `latency` seconds and streams a canned answer."""
+
+    ANSWER = ("Your spending is concentrated in Food and Shopping. Set a weekly limit for eating out "
+              "and review subscriptions you no longer use.").split(" ")
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.models = self
+
+    def run(self, model, input):
+        time.sleep(self.latency)
+        return iter(word + " " for word in self.ANSWER)
+
+    def get(self, name):
+        return {"name": name}
+
+
+class FakeOCR:
+    """Stands in for Tesseract: returns the OCR text fixtures in turn after `latency` seconds."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        texts = []
+        for filename in sorted(os.listdir(FIXTURES_DIR)):
+            if filename.endswith(".txt"):
+                with open(os.path.join(FIXTURES_DIR, filename), encoding="utf-8") as f:
+                    texts.append(f.read())
+        self._texts = itertools.cycle(texts)
+        self._lock = threading.Lock()
+
+    def __call__(self, image_path, lang="eng"):
+        time.sleep(self.latency)
+        with self._lock:
+            return next(self._texts)
+
+
+def tiny_png(width=64, height=96) -> bytes:
+    """A valid grayscale PNG, so upload size and header checks run for real."""
+    def chunk(kind, data):
+        return len(data).to_bytes(4, "big") + kind + data + zlib.crc32(kind + data).to_bytes(4, "big")
+
+    raw = b"".join(b"\x00" + b"\xff" * width for _ in range(height))
+    ihdr = width.to_bytes(4, "big") + height.to_bytes(4, "big") + bytes([8, 0, 0, 0, 0])
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IDAT", zlib.compress(raw))
+            + chunk(b"IEND", b""))
+
+
+# --- Synthetic data ---
+
+def synthetic_expenses(rng: random.Random, count: int, days: int = 730):
+    today = date.today()
+    expenses = []
+    for expense_id in range(1, count + 1):
+        category = rng.choice(CATEGORIES)
+        expenses.append({
+            "id": expense_id,
+            "amount": round(rng.lognormvariate(5, 1), 2),
+            "category": category,
+            "description": rng.choice(DESCRIPTIONS[category]),
+            "date": (today - timedelta(days=rng.randrange(days))).isoformat(),
+            "flag": rng.choice([None, None, None, "red", "green"]),
+        })
+    return expenses
+
+
+class Target:
+    """One app under test: how to load it, seed it, authenticate and call each endpoint."""
+
+    name = ""
+    module_name = ""
+
+    def __init__(self, args):
+        self.args = args
+        self.module = importlib.import_module(self.module_name)
+        self.rng = random.Random(args.seed)
+        self.users = [f"loadtest{index}@example.com" for index in range(args.users)]
+        self.added_ids = {user: [] for user in self.users}
+        self.unique_ids = itertools.count()
+        self.install_stand_ins()
+        self.seed()
+
+    def seed(self):
+        for user in self.users:
+            self.module.fake_users_db[user] = self.user_record(user)
+            self.module.user_expenses[user] = synthetic_expenses(self.rng, self.args.expenses)
+
+    def random_expense_id(self, user):
+        expenses = self.module.user_expenses.get(user) or [{"id": 1}]
+        return self.rng.choice(expenses)["id"]
+
+    def pop_added_id(self, user):
+        ids = self.added_ids[user]
+        return ids.pop() if ids else self.random_expense_id(user)
+
+    def new_username(self):
+        return f"registered{next(self.unique_ids)}@example.com"
+
+    def remember_added(self, user, response):
+        if response.status_code in (200, 201):
+            self.added_ids[user].append(response.json()["id"])
+
+    def new_expense(self):
+        category = self.rng.choice(CATEGORIES)
+        return {
+            "amount": round(self.rng.uniform(10, 2000), 2),
+            "category": category,
+            "description": self.rng.choice(DESCRIPTIONS[category]),
+            "date": (date.today() - timedelta(days=self.rng.randrange(60))).isoformat(),
+        }
+
+
+class MainTarget(Target):
+    name = "main"
+    module_name = "main"
+
+    def install_stand_ins(self):
+        fake_replicate = FakeReplicate(self.args.llm_latency)
+        self.module.get_replicate = lambda: fake_replicate
+        receipt_parser_module = importlib.import_module("receipt_parser")
+        receipt_parser_module.ocr_image_file = FakeOCR(self.args.ocr_latency)
+        # Seeded users share the test user's password hash
+        self.password_hash = self.module.fake_users_db[self.module.test_user]["hashed_password"]
+
+    def user_record(self, user):
+        return {"username": user, "full_name": "Load Test", "email": user,
+                "hashed_password": self.password_hash, "disabled": False}
+
+    def headers(self, user):
+        if not hasattr(self, "_tokens"):
+            self._tokens = {}
+        if user not in self._tokens:
+            token = self.module.create_access_token({"sub": user}, timedelta(hours=1))
+            self._tokens[user] = {"Authorization": f"Bearer {token}"}
+        return self._tokens[user]
+
+    def since_version(self, user):
+        """A version a few changes back, as a client catching up would send."""
+        return max(0, self.module.expense_versions.get(user, 0) - 5)
+
+    def budget_to_delete(self, user):
+        """Creates the budget the timed DELETE removes (one per request, so concurrent calls never collide)."""
+        category = f"Budget{next(self.unique_ids)}"
+        self.module.budget_tracker.set(user, category, 5000.0)
+        return category
+
+    def endpoints(self):
+        png = tiny_png()
+        return {
+            "health": lambda user: ("GET", "/", {}),
+            "livez": lambda user: ("GET", "/livez", {}),
+            "readyz": lambda user: ("GET", "/readyz", {}),
+            "metrics": lambda user: ("GET", "/metrics", {}),
+            "register": lambda user: ("POST", "/register", {"json": {"username": self.new_username(), "password": PASSWORD}}),
+            "token": lambda user: ("POST", "/token", {"data": {"username": user, "password": PASSWORD}}),
+            "expenses": lambda user: ("GET", "/expenses", {"headers": self.headers(user)}),
+            "expenses-changes": lambda user: ("GET", "/expenses/changes", {
+                "headers": self.headers(user), "params": {"since": self.since_version(user)}}),
+            "stream-ticket": lambda user: ("POST", "/expenses/stream-ticket", {"headers": self.headers(user)}),
+            "search": lambda user: ("GET", "/expenses/search", {
+                "headers": self.headers(user), "params": {"q": self.rng.choice(["coffee", "bill", "receipt milk", "cab"])}}),
+            "recurring": lambda user: ("GET", "/expenses/recurring", {"headers": self.headers(user)}),
+            "flag-suggestions": lambda user: ("GET", "/expenses/flag-suggestions", {"headers": self.headers(user)}),
+            "timeseries": lambda user: ("GET", "/stats/timeseries", {
+                "headers": self.headers(user), "params": {"bucket": "month", "group_by": "category"}}),
+            "analytics": lambda user: ("GET", "/analytics", {"headers": self.headers(user)}),
+            "forecast": lambda user: ("GET", "/stats/forecast", {"headers": self.headers(user)}),
+            "budget-set": lambda user: ("PUT", f"/budgets/{self.rng.choice(CATEGORIES)}", {
+                "headers": self.headers(user), "json": {"monthly_limit": round(self.rng.uniform(1000, 20000), 2)}}),
+            "budgets": lambda user: ("GET", "/budgets", {"headers": self.headers(user)}),
+            "budget-alerts": lambda user: ("GET", "/budgets/alerts", {"headers": self.headers(user)}),
+            "budget-delete": lambda user: ("DELETE", f"/budgets/{self.budget_to_delete(user)}", {"headers": self.headers(user)}),
+            "add-expense": lambda user: ("POST", "/add-expense", {"headers": self.headers(user), "json": self.new_expense()}),
+            "edit-expense": lambda user: ("PUT", f"/edit-expense/{self.random_expense_id(user)}",
+                                          {"headers": self.headers(user), "json": self.new_expense()}),
+            "flag-expense": lambda user: ("POST", "/flag-expense", {
+                "headers": self.headers(user), "json": {"id": self.random_expense_id(user), "flag": "red"}}),
+            "delete-expense": lambda user: ("DELETE", f"/delete-expense/{self.pop_added_id(user)}", {"headers": self.headers(user)}),
+            "analyze": lambda user: ("POST", "/analyze", {"headers": self.headers(user)}),
+            "chat": lambda user: ("POST", "/chat", {"headers": self.headers(user), "json": {"query": "How can I save more?"}}),
+            "process-receipt": lambda user: ("POST", "/process-receipt", {
+                "headers": self.headers(user), "files": {"file": ("receipt.png", png, "image/png")}}),
+            "process-receipts": lambda user: ("POST", "/process-receipts", {
+                "headers": self.headers(user),
+                "files": [("files", ("page1.png", png, "image/png")), ("files", ("page2.png", png, "image/png"))]}),
+        }
+
+
+class SimpleTarget(Target):
+    name = "main_simple"
+    module_name = "main_simple"
+
+    def install_stand_ins(self):
+        receipt_parser_module = importlib.import_module("receipt_parser")
+        receipt_parser_module.ocr_image_file = FakeOCR(self.args.ocr_latency)
+
+    def user_record(self, user):
+        return {"username": user, "password": hashlib.sha256(PASSWORD.encode()).hexdigest()}
+
+    def headers(self, user):
+        return {"Authorization": f"Bearer {base64.b64encode(user.encode()).decode()}"}
+
+    def form_expense(self):
+        return {key: str(value) for key, value in self.new_expense().items()}
+
+    def endpoints(self):
+        png = tiny_png()
+        return {
+            "health": lambda user: ("GET", "/", {}),
+            "register": lambda user: ("POST", "/register", {"data": {"username": self.new_username(), "password": PASSWORD}}),
+            "token": lambda user: ("POST", "/token", {"data": {"username": user, "password": PASSWORD}}),
+            "expenses": lambda user: ("GET", "/expenses", {"headers": self.headers(user)}),
+            "add-expense": lambda user: ("POST", "/add-expense", {"headers": self.headers(user), "data": self.form_expense()}),
+            "edit-expense": lambda user: ("PUT", f"/edit-expense/{self.random_expense_id(user)}",
+                                          {"headers": self.headers(user), "data": self.form_expense()}),
+            "flag-expense": lambda user: ("POST", "/flag-expense", {
+                "headers": self.headers(user), "data": {"id": str(self.random_expense_id(user)), "flag": "red"}}),
+            "delete-expense": lambda user: ("DELETE", f"/delete-expense/{self.pop_added_id(user)}", {"headers": self.headers(user)}),
+            "analyze": lambda user: ("POST", "/analyze", {"headers": self.headers(user)}),
+            "chat": lambda user: ("POST", "/chat", {"headers": self.headers(user), "data": {"query": "How can I save more?"}}),
+            "process-receipt": lambda user: ("POST", "/process-receipt", {
+                "headers": self.headers(user), "files": {"file": ("receipt.png", png, "image/png")},
+                "data": {"description": "Receipt items"}}),
+        }
+
+
+TARGETS = {"main": MainTarget, "main_simple": SimpleTarget}
+
+
+# --- Runner ---
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run_endpoint(target, endpoint, build_request, requests, concurrency):
+    latencies = []
+    errors = 0
+    transport = httpx.ASGITransport(app=target.module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+        remaining = iter(range(requests))
+
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                user = target.rng.choice(target.users)
+                method, path, kwargs = build_request(user)
+                start = time.perf_counter()
+                response = await client.request(method, path, **kwargs)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code >= 400 and response.status_code not in EXPECTED_STATUSES.get(endpoint, ()):
+                    errors += 1
+                elif endpoint == "add-expense":
+                    target.remember_added(user, response)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+# Endpoints that call the (stand-in) LLM or OCR, or hash a password, run fewer requests by default
+SLOW_ENDPOINTS = {"register", "token", "analyze", "chat", "process-receipt", "process-receipts"}
+# Error statuses that are a normal answer: /readyz is 503 until the (lazy) receipt stack warms up
+EXPECTED_STATUSES = {"readyz": {503}}
+
+
+def compare(results, baseline, threshold):
+    """Names of endpoints that regressed against the baseline, with the reason."""
+    regressions = []
+    for endpoint, result in results.items():
+        before = baseline.get("results", {}).get(endpoint)
+        if not before:
+            continue
+        if result["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(f"{endpoint}: p95 {before['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms")
+        if result["rps"] < before["rps"] * (1 - threshold):
+            regressions.append(f"{endpoint}: throughput {before['rps']:.0f} -> {result['rps']:.0f} req/s")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--app", choices=["main", "main_simple", "all"], default="all")
+    arg_parser.add_argument("--users", type=int, default=50)
+    arg_parser.add_argument("--expenses", type=int, default=1000, help="synthetic expenses per user")
+    arg_parser.add_argument("--requests", type=int, default=2000, help="requests per endpoint (a tenth for slow ones)")
+    arg_parser.add_argument("--concurrency", type=int, default=32)
+    arg_parser.add_argument("--endpoints", default="", help="comma-separated subset of endpoints")
+    arg_parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per stand-in Replicate call")
+    arg_parser.add_argument("--ocr-latency", type=float, default=0.05, help="seconds per stand-in OCR call")
+    arg_parser.add_argument("--threshold", type=float, default=0.25, help="allowed regression fraction")
+    arg_parser.add_argument("--seed", type=int, default=7)
+    arg_parser.add_argument("--save-baseline", action="store_true")
+    args = arg_parser.parse_args()
+
+    apps = list(TARGETS) if args.app == "all" else [args.app]
+    selected = {name for name in args.endpoints.split(",") if name}
+    failed = False
+    for app_name in apps:
+        target = TARGETS[app_name](args)
+        print(f"\n{app_name}: {args.users} users x {args.expenses} expenses, concurrency {args.concurrency}")
+        print(f"{'endpoint':<18}{'requests':>9}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        results = {}
+        for endpoint, build_request in target.endpoints().items():
+            if selected and endpoint not in selected:
+                continue
+            requests = max(args.concurrency, args.requests // 10) if endpoint in SLOW_ENDPOINTS else args.requests
+            result = asyncio.run(run_endpoint(target, endpoint, build_request, requests, args.concurrency))
+            results[endpoint] = result
+            print(f"{endpoint:<18}{result['requests']:>9}{result['errors']:>8}{result['rps']:>10.1f}"
+                  f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}")
+
+        baseline_path = os.path.join(BASELINE_DIR, f"api_{app_name}.json")
+        config = {key: getattr(args, key) for key in ("users", "expenses", "requests", "concurrency", "llm_latency", "ocr_latency")}
+        if args.save_baseline:
+            os.makedirs(BASELINE_DIR, exist_ok=True)
+            with open(baseline_path, "w", encoding="utf-8") as f:
+                json.dump({"config": config, "results": results}, f, indent=2)
+            print(f"Baseline saved to {baseline_path}")
+        elif os.path.exists(baseline_path):
+            with open(baseline_path, encoding="utf-8") as f:
+                baseline = json.load(f)
+            if baseline.get("config") != config:
+                print(f"Note: baseline was recorded with {baseline.get('config')}")
+            regressions = compare(results, baseline, args.threshold)
+            for line in regressions:
+                print(f"REGRESSION {line}")
+            if not regressions:
+                print(f"No regressions beyond {args.threshold:.0%} against {baseline_path}")
+            failed = failed or bool(regressions)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark for rule-based item classification
+
+Compares the lexicon automaton (category_lexicon.CategoryLexicon) with the
+previous ordered any() keyword scans, on the bundled lexicon and on a
+synthetic lexicon of 10k terms.
+
+Usage: python benchmarks/bench_category_lexicon.py [--terms N] [--items N]
+"""
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from category_lexicon import CategoryLexicon, DEFAULT_LEXICON_PATH
+
+
+def linear_classify(keyword_lists, item_name):
+    """The previous approach: substring any() scans per category, first hit wins."""
+    item_lower = item_name.lower()
+    for category, keywords in keyword_lists:
+        if any(keyword in item_lower for keyword in keywords):
+            return category
+    return "Other"
+
+
+def synthetic_lexicon(base, terms, rng):
+    """Extend the bundled lexicon with random pseudo-words up to `terms` keywords."""
+    lexicon = {category: dict(keywords) for category, keywords in base.items()}
+    categories = list(lexicon) + ["Entertainment", "Utilities", "Education", "Travel"]
+    for category in categories:
+        lexicon.setdefault(category, {})
+    seen = {keyword for keywords in lexicon.values() for keyword in keywords}
+    while len(seen) < terms:
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 10)))
+        if word in seen:
+            continue
+        seen.add(word)
+        lexicon[rng.choice(categories)][word] = 1.0
+    return lexicon
+
+
+def synthetic_items(lexicon, count, rng):
+    """Receipt-like item names; about half contain a lexicon keyword."""
+    keywords = [keyword for keywords in lexicon.values() for keyword in keywords]
+    items = []
+    for _ in range(count):
+        words = ["".join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(3, 8)))
+                 for _ in range(rng.randint(1, 3))]
+        if rng.random() < 0.5:
+            words.insert(rng.randint(0, len(words)), rng.choice(keywords).upper())
+        words.append(f"{rng.randint(1, 5)}KG")
+        items.append(" ".join(words))
+    return items
+
+
+def per_second(classify, items):
+    start = time.perf_counter()
+    for item in items:
+        classify(item)
+    return len(items) / (time.perf_counter() - start)
+
+
+def run(label, lexicon, items):
+    keyword_lists = [(category, list(keywords)) for category, keywords in lexicon.items()]
+    start = time.perf_counter()
+    automaton = CategoryLexicon(lexicon)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    linear_rate = per_second(lambda item: linear_classify(keyword_lists, item), items)
+    automaton_rate = per_second(automaton.classify, items)
+    print(f"{label:<22}{len(automaton):>8}{build_ms:>12.1f}{linear_rate:>16,.0f}{automaton_rate:>16,.0f}"
+          f"{automaton_rate / linear_rate:>9.1f}x")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--terms", type=int, default=10000, help="keywords in the synthetic lexicon")
+    arg_parser.add_argument("--items", type=int, default=5000, help="item names to classify")
+    args = arg_parser.parse_args()
+
+    rng = random.Random(42)
+    with open(DEFAULT_LEXICON_PATH, encoding="utf-8") as f:
+        bundled = json.load(f)
+    large = synthetic_lexicon(bundled, args.terms, rng)
+
+    print(f"{'lexicon':<22}{'terms':>8}{'build ms':>12}{'linear items/s':>16}{'automaton/s':>16}{'speedup':>10}")
+    run("bundled", bundled, synthetic_items(bundled, args.items, rng))
+    run(f"synthetic {args.terms // 1000}k", large, synthetic_items(large, args.items, rng))
+
+
+if __name__ == "__main__":
+    main()
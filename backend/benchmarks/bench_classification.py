@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark for zero-shot item classification throughput on CPU
+
+  before: one pipeline call per item (the previous classify_item loop)
+  after:  ReceiptParser.classify_items, one batched call per receipt plus
+          the normalized-name LRU cache, for a cold and a warm cache
+
+Receipts are drawn from fixtures/labeled_items.json, so common items repeat
+across receipts as they do in real traffic. Needs transformers and torch;
+the model is downloaded on first run.
+
+Usage: ENABLE_AI_CLASSIFICATION=true python benchmarks/bench_classification.py [--receipts N]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ["ENABLE_AI_CLASSIFICATION"] = "true"
+
+from receipt_parser import ReceiptParser
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def synthetic_receipts(items, count, rng):
+    return [rng.sample(items, rng.randint(4, 12)) for _ in range(count)]
+
+
+def items_per_second(classify_receipt, receipts):
+    total = sum(len(receipt) for receipt in receipts)
+    start = time.perf_counter()
+    for receipt in receipts:
+        classify_receipt(receipt)
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--receipts", type=int, default=20, help="receipts per measurement")
+    args = arg_parser.parse_args()
+
+    with open(os.path.join(FIXTURES_DIR, "labeled_items.json"), encoding="utf-8") as f:
+        items = [entry["item"] for entry in json.load(f)]
+    receipts = synthetic_receipts(items, args.receipts, random.Random(7))
+
+    receipt_parser = ReceiptParser()
+    start = time.perf_counter()
+    classifier = receipt_parser.classifier
+    if classifier is None:
+        sys.exit("AI classifier could not be loaded; install transformers and torch")
+    print(f"Model load: {time.perf_counter() - start:.1f}s")
+
+    def per_item(receipt):
+        for name in receipt:
+            result = classifier(name, receipt_parser.candidate_labels)
+            receipt_parser.category_mapping.get(str(result['labels'][0]), "Other")
+
+    before = items_per_second(per_item, receipts)
+    cold = items_per_second(receipt_parser.classify_items, receipts)
+    warm = items_per_second(receipt_parser.classify_items, receipts)
+
+    print(f"{'mode':<36}{'items/s':>10}")
+    print(f"{'per-item pipeline calls (before)':<36}{before:>10.1f}")
+    print(f"{'batched + LRU, cold cache':<36}{cold:>10.1f}")
+    print(f"{'batched + LRU, warm cache':<36}{warm:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the zero-shot classifier backends (classifier_backends.py)
+
+Each backend runs in its own subprocess so memory figures are not mixed up.
+For every backend it reports load time, resident memory after load, peak
+memory, per-item latency for batched calls, accuracy on
+fixtures/labeled_items.json and agreement with the reference torch backend.
+
+Usage: python benchmarks/bench_classifier_backends.py [--backends torch,torch-int8,onnx,distilled]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def rss_mb():
+    """Current resident set size in MB (Linux)."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_worker(backend, batch_size):
+    """Measure one backend in this process and print the results as JSON."""
+    os.environ["ENABLE_AI_CLASSIFICATION"] = "true"
+    from receipt_parser import ReceiptParser
+
+    with open(os.path.join(FIXTURES_DIR, "labeled_items.json"), encoding="utf-8") as f:
+        labeled = json.load(f)
+    names = [entry["item"] for entry in labeled]
+
+    baseline_rss = rss_mb()
+    receipt_parser = ReceiptParser(classifier_backend=backend)
+    start = time.perf_counter()
+    if receipt_parser.classifier is None:
+        print(json.dumps({"backend": backend, "error": str(receipt_parser._classifier_error)}))
+        return
+    load_seconds = time.perf_counter() - start
+    loaded_rss = rss_mb()
+
+    # Warm up kernels before timing
+    receipt_parser._classify_batch_with_model(names[:batch_size])
+    predictions = []
+    start = time.perf_counter()
+    for offset in range(0, len(names), batch_size):
+        predictions.extend(receipt_parser._classify_batch_with_model(names[offset:offset + batch_size]))
+    elapsed = time.perf_counter() - start
+
+    correct = sum(prediction == entry["category"] for prediction, entry in zip(predictions, labeled))
+    print(json.dumps({
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "model_rss_mb": loaded_rss - baseline_rss,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "ms_per_item": elapsed / len(names) * 1000,
+        "accuracy": correct / len(labeled),
+        "predictions": predictions,
+    }))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--backends", default="torch,torch-int8,onnx,distilled")
+    arg_parser.add_argument("--batch-size", type=int, default=8)
+    arg_parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.batch_size)
+        return
+
+    results = []
+    for backend in args.backends.split(","):
+        print(f"Measuring {backend}...", file=sys.stderr)
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", backend, "--batch-size", str(args.batch_size)],
+            capture_output=True, text=True,
+        )
+        lines = [line for line in completed.stdout.splitlines() if line.startswith("{")]
+        if not lines:
+            results.append({"backend": backend, "error": completed.stderr.strip().splitlines()[-1:] or "no output"})
+            continue
+        results.append(json.loads(lines[-1]))
+
+    reference = next((r["predictions"] for r in results if r["backend"] == "torch" and "predictions" in r), None)
+
+    print(f"{'backend':<12}{'load s':>8}{'model MB':>10}{'peak MB':>10}{'ms/item':>10}{'accuracy':>10}{'agreement':>11}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['backend']:<12}  unavailable: {result['error']}")
+            continue
+        agreement = "-"
+        if reference is not None:
+            same = sum(a == b for a, b in zip(result["predictions"], reference))
+            agreement = f"{same / len(reference):.3f}"
+        print(f"{result['backend']:<12}{result['load_seconds']:>8.1f}{result['model_rss_mb']:>10.0f}"
+              f"{result['peak_rss_mb']:>10.0f}{result['ms_per_item']:>10.1f}{result['accuracy']:>10.3f}{agreement:>11}")
+
+
+if __name__ == "__main__":
+    main()
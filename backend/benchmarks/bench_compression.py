@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark for GET /expenses compression on a 10k-row history
+
+Calls main.app in-process (httpx ASGITransport) for each encoding the server
+supports (identity, gzip, and br if `brotli` is installed) and reports:
+  - bytes on the wire and the saving against identity
+  - server time with the compressed body cached, and with it rebuilt
+    (cache invalidated before every call, i.e. right after a mutation)
+  - estimated time to last byte on slow mobile links: server time + RTT +
+    bytes / bandwidth
+
+Requires httpx. Usage: python benchmarks/bench_compression.py [--rows N] [--repeat N]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("REPLICATE_API_TOKEN", "r8_benchmark_placeholder")
+os.environ.setdefault("RECEIPT_WARMUP", "lazy")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# Measures capacity, not the per-user limits
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx
+
+import compression
+import main
+from bench_api import synthetic_expenses
+
+# (name, bandwidth in bits/s, round trip in seconds)
+LINKS = [("3G 1.6 Mbps", 1.6e6, 0.150), ("slow 4G 8 Mbps", 8e6, 0.080)]
+
+
+async def median_request(client, headers, repeat, before_each=None):
+    timings = []
+    wire_bytes = 0
+    for _ in range(repeat):
+        if before_each is not None:
+            before_each()
+        start = time.perf_counter()
+        response = await client.get("/expenses", headers=headers)
+        timings.append(time.perf_counter() - start)
+        response.raise_for_status()
+        # response.content is decoded by httpx; Content-Length is what went over the wire
+        wire_bytes = int(response.headers["content-length"])
+    timings.sort()
+    return timings[len(timings) // 2], wire_bytes
+
+
+async def run(rows, repeat):
+    user = main.test_user
+    token = main.create_access_token({"sub": user})
+    main.user_expenses[user] = synthetic_expenses(random.Random(7), rows)
+
+    def invalidate():
+        main.expense_versions[user] = main.expense_versions.get(user, 0) + 1
+
+    transport = httpx.ASGITransport(app=main.app)
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for encoding in ["identity"] + compression.SUPPORTED_ENCODINGS:
+            headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": encoding}
+            rebuilt, size = await median_request(client, headers, repeat, invalidate)
+            cached, _ = await median_request(client, headers, repeat)
+            results.append((encoding, size, cached, rebuilt))
+
+    identity_size = results[0][1]
+    print(f"{rows} rows, levels: gzip {compression.GZIP_LEVEL}, brotli {compression.BROTLI_QUALITY}")
+    header = f"{'encoding':<10}{'KB':>9}{'saved':>8}{'cached ms':>11}{'rebuilt ms':>12}"
+    for name, _, _ in LINKS:
+        header += f"{'TTLB ' + name.split()[0]:>14}"
+    print(header)
+    for encoding, size, cached, rebuilt in results:
+        line = (f"{encoding:<10}{size / 1024:>9.1f}{1 - size / identity_size:>8.0%}"
+                f"{cached * 1000:>11.2f}{rebuilt * 1000:>12.2f}")
+        for _, bandwidth, rtt in LINKS:
+            ttlb = cached + rtt + size * 8 / bandwidth
+            line += f"{ttlb * 1000:>12.0f}ms"
+        print(line)
+
+
+def main_benchmark():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--rows", type=int, default=10_000)
+    arg_parser.add_argument("--repeat", type=int, default=30)
+    args = arg_parser.parse_args()
+    asyncio.run(run(args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main_benchmark()
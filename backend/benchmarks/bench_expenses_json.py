@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark for GET /expenses serialization at 100, 10k and 100k rows
+
+Calls main.app in-process (httpx ASGITransport) and compares:
+  - default      response_model=List[Expense] validation + stdlib JSON encoding
+  - fast, miss   FAST_JSON path with the cache invalidated before every call
+                 (sort + one encoder pass, no revalidation)
+  - fast, hit    FAST_JSON path serving the cached bytes
+and reports latency per request plus the encoder used (orjson if installed).
+
+Requires httpx. Usage: python benchmarks/bench_expenses_json.py [--rows 100,10000,100000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("REPLICATE_API_TOKEN", "r8_benchmark_placeholder")
+os.environ.setdefault("RECEIPT_WARMUP", "lazy")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# Measures capacity, not the per-user limits
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx
+
+import fast_json
+import main
+from bench_api import synthetic_expenses
+
+
+async def time_requests(client, headers, repeat, before_each=None):
+    timings = []
+    body_size = 0
+    for _ in range(repeat):
+        if before_each is not None:
+            before_each()
+        start = time.perf_counter()
+        response = await client.get("/expenses", headers=headers)
+        timings.append(time.perf_counter() - start)
+        response.raise_for_status()
+        body_size = len(response.content)
+    timings.sort()
+    return timings[len(timings) // 2], body_size
+
+
+async def run(rows_list):
+    user = main.test_user
+    # Uncompressed, so every path is measured doing the same work
+    headers = {"Authorization": f"Bearer {main.create_access_token({'sub': user})}", "Accept-Encoding": "identity"}
+    rng = random.Random(7)
+    transport = httpx.ASGITransport(app=main.app)
+    print(f"encoder: {'orjson' if fast_json.orjson is not None else 'stdlib json'}")
+    print(f"{'rows':>8}{'body KB':>10}{'default ms':>12}{'fast miss ms':>14}{'fast hit ms':>13}{'speedup':>9}")
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for rows in rows_list:
+            def invalidate():
+                main.expense_versions[user] = main.expense_versions.get(user, 0) + 1
+
+            main.user_expenses[user] = synthetic_expenses(rng, rows)
+            invalidate()  # drop bodies cached for the previous size
+            repeat = max(5, min(200, 2_000_000 // rows))
+
+            main.FAST_JSON = False
+            default_ms, size = await time_requests(client, headers, repeat)
+            main.FAST_JSON = True
+            miss_ms, _ = await time_requests(client, headers, repeat, invalidate)
+            hit_ms, _ = await time_requests(client, headers, repeat)
+            print(f"{rows:>8}{size / 1024:>10.0f}{default_ms * 1000:>12.2f}{miss_ms * 1000:>14.2f}"
+                  f"{hit_ms * 1000:>13.2f}{default_ms / hit_ms:>8.0f}x")
+
+
+def main_benchmark():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--rows", default="100,10000,100000")
+    args = arg_parser.parse_args()
+    asyncio.run(run([int(rows) for rows in args.rows.split(",")]))
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the month-end forecast behind GET /stats/forecast
+
+For --rows synthetic expenses, times the forecast from the day rollups
+(reading the lookback window, then the weekday model) against the same
+forecast fed by a scan of every expense, and backtests it: forecasting
+last month as of its 10th day and comparing with what it actually totalled.
+
+Usage: python benchmarks/bench_forecast.py [--rows 10000,100000,1000000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_api import synthetic_expenses
+from forecast import FORECAST_LOOKBACK_DAYS, month_end_forecast
+from rollups import Rollups
+
+
+def scan_daily(expenses, start, end):
+    days = {}
+    for expense in expenses:
+        if start <= expense["date"] <= end:
+            categories = days.setdefault(expense["date"], {})
+            categories[expense["category"]] = categories.get(expense["category"], 0.0) + expense["amount"]
+    return [{"bucket": day, "categories": categories} for day, categories in sorted(days.items())]
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main_benchmark():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--rows", default="10000,100000,1000000")
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    today = date.today()
+    start = min(today - timedelta(days=FORECAST_LOOKBACK_DAYS), today.replace(day=1)).isoformat()
+    print(f"{'rows':>9}{'scan ms':>10}{'rollup ms':>11}{'speedup':>9}")
+    for rows in [int(rows) for rows in args.rows.split(",")]:
+        expenses = synthetic_expenses(random.Random(7), rows)
+        rollups = Rollups(lambda username: (1, expenses))
+        rollups.series("bench", 1, "day")  # build once, as on a user's first query
+
+        scan = best_of(args.repeat, lambda: month_end_forecast(scan_daily(expenses, start, today.isoformat()), today))
+        rollup = best_of(args.repeat, lambda: month_end_forecast(
+            rollups.series("bench", 1, "day", by_category=True, start=start, end=today.isoformat()), today))
+        print(f"{rows:>9}{scan * 1000:>10.1f}{rollup * 1000:>11.2f}{scan / rollup:>8.0f}x")
+
+    # Backtest on last month, as of its 10th day
+    as_of = (today.replace(day=1) - timedelta(days=1)).replace(day=10)
+    month = as_of.isoformat()[:7]
+    actual = sum(expense["amount"] for expense in expenses if expense["date"][:7] == month)
+    history_start = (as_of - timedelta(days=FORECAST_LOOKBACK_DAYS)).isoformat()
+    result = month_end_forecast(scan_daily(expenses, history_start, as_of.isoformat()), as_of)
+    total = result["total"]
+    inside = total["low"] <= actual <= total["high"]
+    print(f"backtest {month} as of {as_of}: projected {total['projected']:,.0f} "
+          f"(90% {total['low']:,.0f}-{total['high']:,.0f}), actual {actual:,.0f}, "
+          f"error {abs(total['projected'] - actual) / actual:.1%}, {'inside' if inside else 'outside'} the range")
+
+
+if __name__ == "__main__":
+    main_benchmark()
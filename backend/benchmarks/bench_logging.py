@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark for request throughput with logging on and off
+
+Drives main.app in-process (httpx ASGITransport, no network) with POST
+/add-expense and GET /expenses at fixed concurrency, with log output going
+to a file the way `uvicorn ... > backend.log` does. Modes:
+  - off          logging disabled (CRITICAL)
+  - sync-debug   DEBUG records written by the request thread (what the old
+                 print() calls amounted to)
+  - queue-debug  DEBUG records through the queue handler
+  - queue-info   INFO through the queue handler (the default configuration)
+
+Requires httpx. Usage: python benchmarks/bench_logging.py [--requests N] [--concurrency N]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("REPLICATE_API_TOKEN", "r8_benchmark_placeholder")
+os.environ.setdefault("RECEIPT_WARMUP", "lazy")
+
+import httpx
+
+import main
+from structured_logging import configure_logging, shutdown_logging
+
+MODES = {
+    "off": dict(level="CRITICAL", use_queue=True),
+    "sync-debug": dict(level="DEBUG", use_queue=False),
+    "queue-debug": dict(level="DEBUG", use_queue=True),
+    "queue-info": dict(level="INFO", use_queue=True),
+}
+
+
+async def drive(requests, concurrency, headers):
+    latencies = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        counter = iter(range(requests))
+
+        async def worker():
+            for index in counter:
+                start = time.perf_counter()
+                if index % 2:
+                    response = await client.get("/expenses")
+                else:
+                    response = await client.post("/add-expense", json={
+                        "amount": 12.5, "category": "Food", "description": f"Coffee {index}", "date": "2025-09-27",
+                    })
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return elapsed, latencies
+
+
+def main_benchmark():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--requests", type=int, default=4000)
+    arg_parser.add_argument("--concurrency", type=int, default=32)
+    args = arg_parser.parse_args()
+
+    token = main.create_access_token({"sub": main.test_user})
+    headers = {"Authorization": f"Bearer {token}"}
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    print(f"{'mode':<14}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'log MB':>10}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for mode, options in MODES.items():
+            # Same history size for every mode
+            main.user_expenses[main.test_user] = main.user_expenses[main.test_user][:3]
+            log_path = os.path.join(work_dir, f"{mode}.log")
+            with open(log_path, "w", encoding="utf-8") as log_file:
+                configure_logging(stream=log_file, **options)
+                elapsed, latencies = asyncio.run(drive(args.requests, args.concurrency, headers))
+                shutdown_logging()
+            latencies.sort()
+            p99 = latencies[int(len(latencies) * 0.99) - 1]
+            print(f"{mode:<14}{args.requests / elapsed:>10.0f}{statistics.median(latencies) * 1000:>10.2f}"
+                  f"{p99 * 1000:>10.2f}{os.path.getsize(log_path) / 1e6:>10.2f}")
+    configure_logging()
+
+
+if __name__ == "__main__":
+    main_benchmark()
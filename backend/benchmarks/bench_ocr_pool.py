@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark for OCR throughput: resident worker pool vs a subprocess per call
+
+Renders the OCR text fixtures into receipt images, then measures:
+  - pytesseract in-process (three tesseract launches per receipt)
+  - OCRWorkerPool with 1 worker, after startup (engine loaded once)
+  - OCRWorkerPool with one worker per core
+and reports pool startup time, per-receipt overhead removed and
+receipts/sec per core. Workers run resident tesserocr engines; without
+Tesseract language data they fall back to pytesseract (logged, and shown
+as the engine in the output).
+
+Usage: python benchmarks/bench_ocr_pool.py [--receipts N] [--workers N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from PIL import Image, ImageDraw
+
+from ocr_workers import OCRWorkerPool, ocr_image_file
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "ocr")
+
+
+def render_receipts(work_dir):
+    """Draw every OCR text fixture onto a white receipt-sized image."""
+    paths = []
+    for filename in sorted(os.listdir(FIXTURES_DIR)):
+        if not filename.endswith(".txt"):
+            continue
+        with open(os.path.join(FIXTURES_DIR, filename), encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        image = Image.new("L", (900, 40 + 34 * len(lines)), color=255)
+        draw = ImageDraw.Draw(image)
+        for index, line in enumerate(lines):
+            draw.text((30, 20 + 34 * index), line, fill=0)
+        image = image.resize((image.width * 2, image.height * 2))
+        path = os.path.join(work_dir, filename.replace(".txt", ".png"))
+        image.save(path)
+        paths.append(path)
+    return paths
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--receipts", type=int, default=24, help="receipts OCR'd per measurement")
+    arg_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        images = render_receipts(work_dir)
+        batch = (images * (args.receipts // len(images) + 1))[:args.receipts]
+
+        _, subprocess_seconds = timed(lambda: [ocr_image_file(path) for path in batch])
+
+        single = OCRWorkerPool(1)
+        _, single_startup = timed(single.start)
+        _, single_seconds = timed(lambda: [single.ocr(path) for path in batch])
+        single.shutdown()
+
+        pool = OCRWorkerPool(args.workers)
+        _, pool_startup = timed(pool.start)
+        _, pool_seconds = timed(lambda: pool.ocr_many(batch))
+        pool.shutdown()
+
+    per_receipt_subprocess = subprocess_seconds / len(batch)
+    per_receipt_single = single_seconds / len(batch)
+    print(f"Receipts: {len(batch)}  workers: {args.workers}  engine: {pool.engine}")
+    print(f"{'mode':<34}{'startup s':>10}{'ms/receipt':>12}{'receipts/s':>12}{'per core':>10}")
+    print(f"{'subprocess per call':<34}{'-':>10}{per_receipt_subprocess * 1000:>12.0f}"
+          f"{1 / per_receipt_subprocess:>12.2f}{1 / per_receipt_subprocess:>10.2f}")
+    print(f"{'resident pool, 1 worker':<34}{single_startup:>10.2f}{per_receipt_single * 1000:>12.0f}"
+          f"{1 / per_receipt_single:>12.2f}{1 / per_receipt_single:>10.2f}")
+    pool_rate = len(batch) / pool_seconds
+    print(f"{f'resident pool, {args.workers} workers':<34}{pool_startup:>10.2f}{pool_seconds / len(batch) * 1000:>12.0f}"
+          f"{pool_rate:>12.2f}{pool_rate / args.workers:>10.2f}")
+    print(f"Startup overhead removed per receipt: {(per_receipt_subprocess - per_receipt_single) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Fairness benchmark for the per-user rate limiter under one abusive client
+
+Drives main.app in-process (httpx ASGITransport) for --seconds with:
+  - one abusive user firing /chat from --abuse-concurrency workers, back to back
+  - --users well-behaved users, each reading /expenses with a pause between
+    requests and asking /chat every fifth request
+The stand-in Replicate call blocks a worker thread for --llm-latency seconds,
+so without a limit the abuser holds the thread pool and everyone queues
+behind it. The run is done with the limiter off and on, and reports per
+client class: requests served, 429s, served req/s and p50/p95 latency.
+
+Requires httpx. Usage: python benchmarks/bench_rate_limit.py [--seconds S] [--users N]
+    [--abuse-concurrency N] [--llm-latency S]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("REPLICATE_API_TOKEN", "r8_benchmark_placeholder")
+os.environ.setdefault("RECEIPT_WARMUP", "lazy")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+
+import main
+from bench_api import FakeReplicate, percentile, synthetic_expenses
+from rate_limit import RateLimiter
+
+CHAT = {"query": "How can I save more?"}
+
+
+class ClientStats:
+    def __init__(self):
+        self.latencies = []
+        self.limited = 0
+        self.errors = 0
+
+    def record(self, response, elapsed):
+        if response.status_code == 429:
+            self.limited += 1
+        elif response.status_code >= 400:
+            self.errors += 1
+        else:
+            self.latencies.append(elapsed)
+
+
+async def timed(client, stats, method, path, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, path, **kwargs)
+    stats.record(response, time.perf_counter() - start)
+    return response
+
+
+async def run(args, limited):
+    main.rate_limiter = RateLimiter(enabled=limited)
+    rng = random.Random(7)
+    users = [f"fair{index}@example.com" for index in range(args.users)]
+    abuser = "abuser@example.com"
+    headers = {}
+    for user in users + [abuser]:
+        main.fake_users_db[user] = {**main.fake_users_db[main.test_user], "username": user, "email": user}
+        main.user_expenses[user] = synthetic_expenses(rng, 200)
+        headers[user] = {"Authorization": f"Bearer {main.create_access_token({'sub': user})}"}
+
+    fair, abusive = ClientStats(), ClientStats()
+    deadline = time.perf_counter() + args.seconds
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+        async def abuse():
+            while time.perf_counter() < deadline:
+                response = await timed(client, abusive, "POST", "/chat", headers=headers[abuser], json=CHAT)
+                if response.status_code == 429:
+                    # A client ignoring Retry-After: wait only long enough not to spin the loop
+                    await asyncio.sleep(0.001)
+
+        async def behave(user):
+            count = 0
+            while time.perf_counter() < deadline:
+                count += 1
+                if count % 5 == 0:
+                    await timed(client, fair, "POST", "/chat", headers=headers[user], json=CHAT)
+                else:
+                    await timed(client, fair, "GET", "/expenses", headers=headers[user])
+                await asyncio.sleep(args.think_time)
+
+        await asyncio.gather(*[abuse() for _ in range(args.abuse_concurrency)], *[behave(user) for user in users])
+    return fair, abusive
+
+
+def report(label, stats, seconds):
+    stats.latencies.sort()
+    print(f"{label:<22}{len(stats.latencies):>8}{stats.limited:>8}{stats.errors:>8}"
+          f"{len(stats.latencies) / seconds:>10.1f}{percentile(stats.latencies, 0.50) * 1000:>10.1f}"
+          f"{percentile(stats.latencies, 0.95) * 1000:>10.1f}")
+
+
+def main_benchmark():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--seconds", type=float, default=10)
+    arg_parser.add_argument("--users", type=int, default=5)
+    arg_parser.add_argument("--abuse-concurrency", type=int, default=64)
+    arg_parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per stand-in Replicate call")
+    arg_parser.add_argument("--think-time", type=float, default=0.2, help="pause between a fair user's requests")
+    args = arg_parser.parse_args()
+
+    fake_replicate = FakeReplicate(args.llm_latency)
+    main.get_replicate = lambda: fake_replicate
+    print(f"{args.users} fair users, 1 abuser x {args.abuse_concurrency} workers on /chat, {args.seconds:.0f}s each")
+    print(f"{'':<22}{'served':>8}{'429':>8}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for limited in (False, True):
+        fair, abusive = asyncio.run(run(args, limited))
+        mode = "limited" if limited else "unlimited"
+        report(f"{mode}: fair users", fair, args.seconds)
+        report(f"{mode}: abuser", abusive, args.seconds)
+
+
+if __name__ == "__main__":
+    main_benchmark()
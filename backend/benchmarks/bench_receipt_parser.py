@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark for ReceiptParser.parse_items_from_text
+
+Compares the single-pass compiled line parser against the previous
+eight-pattern implementation on the OCR fixtures in fixtures/ocr:
+  - throughput in lines per second
+  - item extraction precision and recall against the labeled fixtures
+
+Usage: python benchmarks/bench_receipt_parser.py [--repeat N]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from receipt_parser import ReceiptParser
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "ocr")
+
+
+def legacy_parse_items_from_text(text):
+    """The previous per-line parser (eight patterns tried in order), minus its prints."""
+    lines = text.split("\n")
+    items = []
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        patterns = [
+            r"^(.*?)[\s:]+(\d+[.,]\d{2})$",
+            r"^(.*?)[\s:]+\$?\s*(\d+[.,]\d{2})$",
+            r"^(.*?)[\s:]+₹?\s*(\d+[.,]\d{2})$",
+            r"^(.*?)[\s:]+Rs\.?\s*(\d+[.,]\d{2})$",
+            r"^(.*?)[\s]+(\d{1,6}\.\d{2})$",
+            r"^(.*?)[\s]+(\d{1,6},\d{2})$",
+            r"^(.*?)\s+(\d+)\.(\d{2})$",
+            r"^(.*?)\s+(\d+),(\d{2})$",
+        ]
+
+        for pattern in patterns:
+            match = re.match(pattern, line)
+            if match:
+                name = match.group(1).strip()
+                if len(match.groups()) == 3:
+                    price_str = f"{match.group(2)}.{match.group(3)}"
+                else:
+                    price_str = match.group(2).strip()
+                price_str = re.sub(r'[^\d.,]', '', price_str)
+                price_str = price_str.replace(",", ".")
+                try:
+                    price = float(price_str)
+                    if price > 0 and price < 1000000 and len(name) > 1:
+                        skip_words = ['total', 'subtotal', 'tax', 'amount', 'paid', 'change', 'balance', 'receipt', 'thank you']
+                        if not any(skip_word in name.lower() for skip_word in skip_words):
+                            items.append({"item": name, "price": price})
+                            break
+                except ValueError:
+                    continue
+
+    if not items:
+        amounts = re.findall(r'(\d+[.,]\d{2})', text)
+        for idx, amount_str in enumerate(amounts[:5]):
+            try:
+                amount = float(amount_str.replace(",", "."))
+                if 0 < amount < 100000:
+                    items.append({"item": f"Item {idx + 1}", "price": amount})
+            except ValueError:
+                continue
+
+    return items
+
+
+def load_fixtures():
+    """Load (name, text, expected_items) for every OCR fixture."""
+    fixtures = []
+    for filename in sorted(os.listdir(FIXTURES_DIR)):
+        if not filename.endswith(".txt"):
+            continue
+        name = filename[:-len(".txt")]
+        with open(os.path.join(FIXTURES_DIR, filename), encoding="utf-8") as f:
+            text = f.read()
+        with open(os.path.join(FIXTURES_DIR, f"{name}.expected.json"), encoding="utf-8") as f:
+            expected = json.load(f)
+        fixtures.append((name, text, expected))
+    return fixtures
+
+
+def item_key(item):
+    return (" ".join(item["item"].lower().split()), round(item["price"], 2))
+
+
+def score(parse, fixtures):
+    """Micro-averaged precision and recall over all fixtures."""
+    true_positives = predicted = relevant = 0
+    for _, text, expected in fixtures:
+        found = Counter(item_key(item) for item in parse(text))
+        wanted = Counter(item_key(item) for item in expected)
+        true_positives += sum((found & wanted).values())
+        predicted += sum(found.values())
+        relevant += sum(wanted.values())
+    precision = true_positives / predicted if predicted else 0.0
+    recall = true_positives / relevant if relevant else 0.0
+    return precision, recall
+
+
+def lines_per_second(parse, texts, repeat):
+    total_lines = sum(text.count("\n") + 1 for text in texts) * repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            parse(text)
+    elapsed = time.perf_counter() - start
+    return total_lines / elapsed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--repeat", type=int, default=2000, help="passes over the fixture corpus")
+    args = arg_parser.parse_args()
+
+    fixtures = load_fixtures()
+    texts = [text for _, text, _ in fixtures]
+    # A long receipt made of the whole corpus, as seen in bulk reprocessing
+    long_receipt = "\n".join(texts * 20)
+
+    receipt_parser = ReceiptParser()
+    parsers = [
+        ("legacy (8 patterns)", legacy_parse_items_from_text),
+        ("compiled single-pass", receipt_parser.parse_items_from_text),
+    ]
+
+    # The compiled parser prints when it falls back to bare amounts
+    devnull = open(os.devnull, "w")
+    stdout = sys.stdout
+
+    print(f"Fixtures: {len(fixtures)} receipts from {FIXTURES_DIR}")
+    print(f"{'parser':<24}{'lines/s':>14}{'long lines/s':>16}{'precision':>12}{'recall':>10}")
+    for label, parse in parsers:
+        sys.stdout = devnull
+        try:
+            corpus_rate = lines_per_second(parse, texts, args.repeat)
+            long_rate = lines_per_second(parse, [long_receipt], max(1, args.repeat // 20))
+            precision, recall = score(parse, fixtures)
+        finally:
+            sys.stdout = stdout
+        print(f"{label:<24}{corpus_rate:>14,.0f}{long_rate:>16,.0f}{precision:>12.3f}{recall:>10.3f}")
+    devnull.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark for recurring expense detection behind GET /expenses/recurring
+
+Plants weekly, monthly and yearly series in --rows synthetic expenses and
+times the full detection over history (group by hash, then check each
+group's intervals) at each size, to show it grows linearly; then the cost
+of updating the groups on a write and re-detecting.
+
+Usage: python benchmarks/bench_recurring.py [--rows 10000,100000,1000000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_api import synthetic_expenses
+from recurring import RecurringDetector, _add_months
+
+PLANTED = [
+    ("Netflix subscription", "Entertainment", 649.0, "monthly"),
+    ("Cult gym membership", "Health", 1500.0, "monthly"),
+    ("Fibernet broadband bill", "Utilities", 999.0, "monthly"),
+    ("Weekly bus pass", "Transport", 250.0, "weekly"),
+    ("Domain renewal", "Other", 1200.0, "yearly"),
+]
+
+
+def with_planted_series(rng, rows):
+    expenses = synthetic_expenses(rng, rows)
+    start = date.today() - timedelta(days=730)
+    for description, category, amount, period in PLANTED:
+        day = start
+        while day <= date.today():
+            expenses.append({"id": len(expenses) + 1, "amount": round(amount * rng.uniform(0.98, 1.02), 2),
+                             "category": category, "description": description, "date": day.isoformat(), "flag": None})
+            day = day + timedelta(days=7) if period == "weekly" else _add_months(day, 1 if period == "monthly" else 12)
+    return expenses
+
+
+def main_benchmark():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--rows", default="10000,100000,1000000")
+    args = arg_parser.parse_args()
+
+    rng = random.Random(7)
+    print(f"{'rows':>9}{'detect ms':>11}{'us/row':>8}{'groups':>8}{'series':>8}{'write+detect ms':>17}")
+    for rows in [int(rows) for rows in args.rows.split(",")]:
+        expenses = with_planted_series(rng, rows)
+        state = {"version": 1}
+        detector = RecurringDetector(lambda username: (state["version"], expenses))
+        start = time.perf_counter()
+        series = detector.series("bench", state["version"])
+        detect = time.perf_counter() - start
+
+        new = dict(expenses[-1], id=len(expenses) + 1, date=date.today().isoformat())
+        state["version"] += 1
+        start = time.perf_counter()
+        detector.record("bench", state["version"], "add", None, new)
+        detector.series("bench", state["version"])
+        update = time.perf_counter() - start
+
+        print(f"{len(expenses):>9}{detect * 1000:>11.0f}{detect / len(expenses) * 1e6:>8.2f}"
+              f"{detector.group_count():>8}{len(series):>8}{update * 1000:>17.2f}")
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the spending rollups behind GET /stats/timeseries
+
+For a two-year history of --rows expenses, compares a monthly per-category
+breakdown read from the rollup tables against the same breakdown computed
+by scanning every expense, and reports the one-off build time and the cost
+of keeping the tables current on a write.
+
+Usage: python benchmarks/bench_rollups.py [--rows 10000,100000,1000000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_api import synthetic_expenses
+from rollups import Rollups
+
+
+def scan_monthly(expenses):
+    months = {}
+    for expense in expenses:
+        categories = months.setdefault(expense["date"][:7], {})
+        categories[expense["category"]] = categories.get(expense["category"], 0.0) + expense["amount"]
+    return sorted(months.items())
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(rows_list):
+    rng = random.Random(7)
+    print(f"{'rows':>9}{'build ms':>10}{'scan ms':>10}{'rollup ms':>11}{'speedup':>9}{'write us':>10}")
+    for rows in rows_list:
+        expenses = synthetic_expenses(rng, rows)
+        state = {"version": 1}
+        rollups = Rollups(lambda username: (state["version"], expenses))
+
+        build = best_of(1, lambda: rollups.series("bench", state["version"], "month", by_category=True))
+        repeat = max(3, min(50, 1_000_000 // rows))
+        scan = best_of(repeat, lambda: scan_monthly(expenses))
+        read = best_of(repeat * 10, lambda: rollups.series("bench", state["version"], "month", by_category=True))
+
+        writes = 10_000
+        start = time.perf_counter()
+        for index in range(writes):
+            before = expenses[index % rows]
+            after = dict(before, amount=before["amount"] + 1)
+            state["version"] += 1
+            rollups.record("bench", state["version"], "edit", before, after)
+        write = (time.perf_counter() - start) / writes
+
+        print(f"{rows:>9}{build * 1000:>10.1f}{scan * 1000:>10.2f}{read * 1000:>11.3f}"
+              f"{scan / read:>8.0f}x{write * 1e6:>10.2f}")
+
+
+def main_benchmark():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--rows", default="10000,100000,1000000")
+    args = arg_parser.parse_args()
+    run([int(rows) for rows in args.rows.split(",")])
+
+
+if __name__ == "__main__":
+    main_benchmark()
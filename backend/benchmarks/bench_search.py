@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark for GET /expenses/search: inverted index against a linear scan
+
+Builds --rows synthetic expenses (default 1M) and, for a set of queries,
+times the index search (top 50 of every match, counted) against a linear
+scan applying the same prefix-match rule to every expense, and checks both
+find the same number of matches. Index build time (paid once per user)
+and the per-write update cost are reported too.
+
+Usage: python benchmarks/bench_search.py [--rows N] [--queries a,b,...]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_api import synthetic_expenses
+from search_index import SearchIndex, expense_tokens, tokenize
+
+DEFAULT_QUERIES = "coffee,coff,receipt milk,bill,metro card,zzz"
+
+
+def linear_scan(expenses, query):
+    terms = set(tokenize(query))
+    matches = 0
+    for expense in expenses:
+        tokens = expense_tokens(expense)
+        if all(any(token.startswith(term) for token in tokens) for term in terms):
+            matches += 1
+    return matches
+
+
+def main_benchmark():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--rows", type=int, default=1_000_000)
+    arg_parser.add_argument("--queries", default=DEFAULT_QUERIES)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    expenses = synthetic_expenses(random.Random(7), args.rows)
+    state = {"version": 1}
+    index = SearchIndex(lambda username: (state["version"], expenses))
+    start = time.perf_counter()
+    index.search("bench", state["version"], "warm")
+    print(f"{args.rows} rows, index build {time.perf_counter() - start:.2f} s, {index.token_count()} tokens")
+
+    print(f"{'query':<16}{'matches':>9}{'scan ms':>10}{'index ms':>10}{'speedup':>9}{'same':>6}")
+    for query in args.queries.split(","):
+        start = time.perf_counter()
+        expected = linear_scan(expenses, query)
+        scan = time.perf_counter() - start
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            total, _ = index.search("bench", state["version"], query)
+            best = min(best, time.perf_counter() - start)
+        print(f"{query:<16}{total:>9}{scan * 1000:>10.0f}{best * 1000:>10.2f}{scan / best:>8.0f}x"
+              f"{'yes' if total == expected else 'NO':>6}")
+
+    writes = 10_000
+    start = time.perf_counter()
+    for offset in range(writes):
+        before = expenses[offset]
+        after = dict(before, description="Coffee with friends")
+        state["version"] += 1
+        index.record("bench", state["version"], "edit", before, after)
+    print(f"update per write: {(time.perf_counter() - start) / writes * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark for API cold start
+
+Measures, each in a fresh interpreter:
+  - import cost of main.py from `python -X importtime -c "import main"`,
+    with the slowest top-level imports, next to the modules it now loads
+    lazily (receipt_parser, passlib, jose, replicate)
+  - time from launching uvicorn to the first 200 from GET /, and to the
+    first authenticated GET /expenses (POST /token, then the list)
+
+The server runs with RECEIPT_WARMUP=lazy unless --warmup background is given,
+so the numbers show what a pod serving only /expenses pays.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--top N] [--warmup lazy|background]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAZY_MODULES = ["receipt_parser", "passlib.context", "jose.jwt", "replicate"]
+
+
+def child_env(warmup="lazy"):
+    return {
+        **os.environ,
+        "REPLICATE_API_TOKEN": os.environ.get("REPLICATE_API_TOKEN", "r8_benchmark_placeholder"),
+        "RECEIPT_WARMUP": warmup,
+        "PYTHONDONTWRITEBYTECODE": "1",
+    }
+
+
+def import_times(statement):
+    """Run a statement under -X importtime. Returns {module: (self_us, cumulative_us, depth)}."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=BACKEND_DIR, env=child_env(), capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def first_response_times(warmup):
+    """Launch uvicorn; seconds until the first GET / and the first authenticated GET /expenses."""
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=child_env(warmup), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup; run it by hand to see why")
+            try:
+                with urllib.request.urlopen(f"{base}/", timeout=1) as response:
+                    if response.status == 200:
+                        break
+            except OSError:
+                time.sleep(0.005)
+        first_health = time.perf_counter() - start
+
+        form = urllib.parse.urlencode({"username": "user@example.com", "password": "password123"}).encode()
+        with urllib.request.urlopen(f"{base}/token", data=form) as response:
+            token = json.load(response)["access_token"]
+        request = urllib.request.Request(f"{base}/expenses", headers={"Authorization": f"Bearer {token}"})
+        with urllib.request.urlopen(request) as response:
+            response.read()
+        first_expenses = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+    return first_health, first_expenses
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--runs", type=int, default=5, help="cold starts per measurement")
+    arg_parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    arg_parser.add_argument("--warmup", choices=["lazy", "background"], default="lazy")
+    args = arg_parser.parse_args()
+
+    main_imports = [import_times("import main") for _ in range(args.runs)]
+    main_total_ms = statistics.median(m["main"][1] for m in main_imports) / 1000
+    print(f"import main: {main_total_ms:.0f} ms (median of {args.runs})")
+    print("  slowest imports under main:")
+    last = main_imports[-1]
+    top_level = sorted(
+        ((cumulative, name) for name, (_, cumulative, depth) in last.items() if depth == 1 and name != "main"),
+        reverse=True,
+    )
+    for cumulative, name in top_level[:args.top]:
+        print(f"    {name:<40}{cumulative / 1000:>8.1f} ms")
+
+    print("deferred until first use:")
+    for module in LAZY_MODULES:
+        loaded_by_main = module in last
+        try:
+            cost = import_times(f"import {module}")
+        except subprocess.CalledProcessError:
+            print(f"    {module:<40}{'not installed':>12}")
+            continue
+        note = "  (still imported by main!)" if loaded_by_main else ""
+        print(f"    {module:<40}{cost[module][1] / 1000:>8.1f} ms{note}")
+
+    health, expenses = zip(*(first_response_times(args.warmup) for _ in range(args.runs)))
+    print(f"uvicorn launch -> first response (RECEIPT_WARMUP={args.warmup}, median of {args.runs}):")
+    print(f"    GET /                                   {statistics.median(health) * 1000:>8.0f} ms")
+    print(f"    POST /token + GET /expenses             {statistics.median(expenses) * 1000:>8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import itertools
+import os
+import threading
+from collections import deque
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from rollups import Rollups
+
+# Monthly budgets per user and category. Spend comes from the month rollups,
+# which the change listener keeps current, so checking a write against a
+# budget is a dictionary lookup. An alert is raised when a write carries a
+# month's spend across 80% or 100% of the category's budget.
+
+ALERT_THRESHOLDS = (0.8, 1.0)
+MAX_ALERTS_PER_USER = int(os.environ.get("MAX_BUDGET_ALERTS", "100"))
+
+
+def current_month() -> str:
+    return date.today().isoformat()[:7]
+
+
+class BudgetTracker:
+    def __init__(self, rollups: Rollups, thresholds: Tuple[float, ...] = ALERT_THRESHOLDS,
+                 max_alerts: int = MAX_ALERTS_PER_USER):
+        self.rollups = rollups
+        self.thresholds = thresholds
+        self.max_alerts = max_alerts
+        # username -> category -> monthly limit
+        self._budgets: Dict[str, Dict[str, float]] = {}
+        self._alerts: Dict[str, deque] = {}
+        self._alert_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    # --- CRUD ---
+
+    def set(self, username: str, category: str, monthly_limit: float):
+        with self._lock:
+            self._budgets.setdefault(username, {})[category] = monthly_limit
+
+    def delete(self, username: str, category: str) -> bool:
+        with self._lock:
+            budgets = self._budgets.get(username, {})
+            return budgets.pop(category, None) is not None
+
+    def limits(self, username: str) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._budgets.get(username, {}))
+
+    def status(self, username: str, version: int, month: Optional[str] = None) -> List[dict]:
+        """Each budget with the month's spend, remaining amount and percent used (current month by default)."""
+        month = month or current_month()
+        status = []
+        for category, limit in sorted(self.limits(username).items()):
+            spent = self.rollups.total(username, version, "month", month, category)
+            status.append({
+                "category": category,
+                "monthly_limit": round(limit, 2),
+                "month": month,
+                "spent": round(spent, 2),
+                "remaining": round(limit - spent, 2),
+                "percent_used": round(spent / limit * 100, 1),
+            })
+        return status
+
+    # --- Alerts ---
+
+    def record(self, username: str, version: int, op: str, before: Optional[dict], after: Optional[dict]):
+        """Expense change listener, registered after the rollups: alert on threshold crossings.
+
+        Only the (month, category) cells the change touched are checked, each
+        against its spend before and after the change.
+        """
+        if op == "flag":
+            return
+        with self._lock:
+            budgets = self._budgets.get(username)
+            if not budgets:
+                return
+            budgets = dict(budgets)
+        deltas: Dict[Tuple[str, str], float] = {}
+        for expense, sign in ((before, -1), (after, 1)):
+            if expense is not None and expense["category"] in budgets:
+                key = (expense["date"][:7], expense["category"])
+                deltas[key] = deltas.get(key, 0.0) + sign * expense["amount"]
+        for (month, category), delta in deltas.items():
+            if delta <= 0:
+                continue  # spend went down: nothing crossed upwards
+            limit = budgets[category]
+            spent = self.rollups.total(username, version, "month", month, category)
+            for threshold in self.thresholds:
+                if spent - delta < threshold * limit <= spent:
+                    self._alert(username, month, category, threshold, spent, limit)
+
+    def _alert(self, username: str, month: str, category: str, threshold: float, spent: float, limit: float):
+        alert = {
+            "id": next(self._alert_ids),
+            "category": category,
+            "month": month,
+            "threshold": int(threshold * 100),
+            "spent": round(spent, 2),
+            "monthly_limit": round(limit, 2),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        with self._lock:
+            alerts = self._alerts.get(username)
+            if alerts is None:
+                alerts = self._alerts[username] = deque(maxlen=self.max_alerts)
+            alerts.append(alert)
+
+    def alerts(self, username: str, since_id: int = 0) -> List[dict]:
+        """The user's recent alerts with an id above `since_id`, newest first."""
+        with self._lock:
+            return [alert for alert in reversed(self._alerts.get(username, ())) if alert["id"] > since_id]
+
+    def budget_count(self) -> int:
+        with self._lock:
+            return sum(len(budgets) for budgets in self._budgets.values())
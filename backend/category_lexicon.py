@@ -0,0 +1,92 @@
+import json
+import os
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "category_lexicon.json")
+
+
+class CategoryLexicon:
+    """Weighted keyword lexicon compiled into an Aho-Corasick automaton.
+
+    The lexicon maps each expense category to {keyword: weight}. Every keyword
+    found anywhere in an item name adds its weight to its category and the
+    highest scoring category wins; ties go to the category listed first.
+    Classification is one pass over the item name, whatever the lexicon size.
+    """
+
+    def __init__(self, lexicon: Dict[str, Dict[str, float]], default_category: str = "Other"):
+        self.categories = list(lexicon)
+        self.default_category = default_category
+
+        # Automaton tables, indexed by state: transitions, failure links and
+        # the (category index, weight) pairs emitted when the state is reached
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, float]]] = [[]]
+        self._keyword_count = 0
+
+        for category_index, keywords in enumerate(lexicon.values()):
+            for keyword, weight in keywords.items():
+                self._add_keyword(keyword.lower(), category_index, float(weight))
+        self._build_failure_links()
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> "CategoryLexicon":
+        """Load a lexicon from a JSON file (defaults to category_lexicon.json)."""
+        with open(path or DEFAULT_LEXICON_PATH, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def __len__(self) -> int:
+        return self._keyword_count
+
+    def _add_keyword(self, keyword: str, category_index: int, weight: float):
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state].append((category_index, weight))
+        self._keyword_count += 1
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                # Inherit matches that end at the failure state (suffix keywords)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def _match_totals(self, text: str) -> Dict[int, float]:
+        goto, fail, output = self._goto, self._fail, self._output
+        totals: Dict[int, float] = {}
+        state = 0
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for category_index, weight in output[state]:
+                totals[category_index] = totals.get(category_index, 0.0) + weight
+        return totals
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """Sum keyword weights per category for every keyword found in text."""
+        return {self.categories[index]: total for index, total in self._match_totals(text).items()}
+
+    def classify(self, text: str) -> str:
+        """Return the best scoring category for text, or the default category."""
+        totals = self._match_totals(text)
+        if not totals:
+            return self.default_category
+        best = max(totals, key=lambda index: (totals[index], -index))
+        return self.categories[best]
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+
+# Per-user log of expense changes, numbered by the user's expense version.
+# Clients that know the version they last saw fetch only the changes after it
+# (GET /expenses/changes) or have them pushed (GET /expenses/stream). The log
+# keeps the last CHANGE_LOG_SIZE changes per user; a client further behind
+# than that has to refetch the full list.
+
+CHANGE_LOG_SIZE = int(os.environ.get("CHANGE_LOG_SIZE", "1000"))
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+# Pushed to a subscriber whose queue overflowed: it must refetch
+RESET = {"op": "reset"}
+
+
+class ChangeLog:
+    def __init__(self, max_entries: int = CHANGE_LOG_SIZE):
+        self.max_entries = max_entries
+        self._logs: Dict[str, deque] = {}
+        self._subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, username: str, version: int, op: str, before: Optional[dict], after: Optional[dict]):
+        """Expense change listener: append the change and push it to the user's subscribers."""
+        expense = after if after is not None else before
+        change = {
+            "version": version,
+            "op": op,
+            "id": expense["id"],
+            # Deletes carry only the id
+            "expense": dict(after) if after is not None else None,
+        }
+        with self._lock:
+            log = self._logs.get(username)
+            if log is None:
+                log = self._logs[username] = deque(maxlen=self.max_entries)
+            log.append(change)
+            subscribers = list(self._subscribers.get(username, ()))
+        for loop, subscriber in subscribers:
+            loop.call_soon_threadsafe(_deliver, subscriber, change)
+
+    def since(self, username: str, version: int, current_version: int) -> Optional[List[dict]]:
+        """Changes after `version`, oldest first; None if they are no longer all in the log."""
+        if version > current_version:
+            return None
+        if version == current_version:
+            return []
+        with self._lock:
+            log = list(self._logs.get(username, ()))
+        if not log or log[0]["version"] > version + 1:
+            return None
+        return [change for change in log if change["version"] > version]
+
+    def subscribe(self, username: str) -> asyncio.Queue:
+        """A queue receiving the user's changes on the running event loop. Pair with unsubscribe."""
+        subscriber = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(username, set()).add((asyncio.get_running_loop(), subscriber))
+        return subscriber
+
+    def unsubscribe(self, username: str, subscriber: asyncio.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(username, set())
+            subscribers.difference_update({entry for entry in subscribers if entry[1] is subscriber})
+            if not subscribers:
+                self._subscribers.pop(username, None)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(log) for log in self._logs.values())
+
+
+def _deliver(subscriber: asyncio.Queue, change: dict):
+    try:
+        subscriber.put_nowait(change)
+    except asyncio.QueueFull:
+        # A stalled client: drop what it hasn't read and tell it to refetch
+        while not subscriber.empty():
+            subscriber.get_nowait()
+        subscriber.put_nowait(RESET)
@@ -0,0 +1,70 @@
+import os
+from typing import Callable, Dict, Optional
+
+# Zero-shot classification backends for ReceiptParser. Each loader takes an
+# optional model name and returns a callable with the transformers
+# zero-shot pipeline interface: classifier(sequences, candidate_labels)
+# returns {"labels": [...], "scores": [...]} per sequence, best label first.
+# Heavy libraries are imported inside the loaders, only for the backend in use.
+
+DEFAULT_BACKEND = "torch"
+ZERO_SHOT_MODEL = "facebook/bart-large-mnli"
+DISTILLED_MODEL = "typeform/distilbert-base-uncased-mnli"
+
+
+def load_torch(model_name: Optional[str] = None):
+    """The reference backend: BART-large-MNLI in fp32 on torch."""
+    from transformers import pipeline
+    return pipeline("zero-shot-classification", model=model_name or ZERO_SHOT_MODEL)
+
+
+def load_torch_int8(model_name: Optional[str] = None):
+    """The same model with its Linear layers dynamically quantized to int8 (CPU only)."""
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+
+    model_name = model_name or ZERO_SHOT_MODEL
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    return pipeline("zero-shot-classification", model=model, tokenizer=tokenizer, device=-1)
+
+
+def load_onnx(model_name: Optional[str] = None):
+    """ONNX Runtime inference. model_name may be a hub id (exported on load) or an exported directory."""
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    from transformers import AutoTokenizer, pipeline
+
+    model_name = model_name or ZERO_SHOT_MODEL
+    export = not os.path.isfile(os.path.join(model_name, "model.onnx"))
+    model = ORTModelForSequenceClassification.from_pretrained(model_name, export=export)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    return pipeline("zero-shot-classification", model=model, tokenizer=tokenizer)
+
+
+def load_distilled(model_name: Optional[str] = None):
+    """A distilled NLI model: several times faster and smaller than BART-large, somewhat less accurate."""
+    from transformers import pipeline
+    return pipeline("zero-shot-classification", model=model_name or DISTILLED_MODEL)
+
+
+BACKENDS: Dict[str, Callable] = {
+    "torch": load_torch,
+    "torch-int8": load_torch_int8,
+    "onnx": load_onnx,
+    "distilled": load_distilled,
+}
+
+
+def register_backend(name: str, loader: Callable):
+    """Make a custom backend selectable through CLASSIFIER_BACKEND."""
+    BACKENDS[name] = loader
+
+
+def load_classifier(backend: Optional[str] = None, model_name: Optional[str] = None):
+    """Load the configured backend (CLASSIFIER_BACKEND / CLASSIFIER_MODEL by default)."""
+    backend = backend or os.environ.get("CLASSIFIER_BACKEND", DEFAULT_BACKEND)
+    model_name = model_name or os.environ.get("CLASSIFIER_MODEL") or None
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown classifier backend '{backend}'. Available: {', '.join(BACKENDS)}")
+    return BACKENDS[backend](model_name)
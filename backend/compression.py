@@ -0,0 +1,129 @@
+import gzip
+import os
+from typing import Optional
+
+# Response compression: gzip, and Brotli when the `brotli` package is
+# installed, negotiated from Accept-Encoding. Bodies under
+# COMPRESSION_MIN_BYTES are sent as they are; on slow links the round trip
+# dominates for those and compressing them only costs CPU.
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "5"))
+
+# Preferred first when the client accepts several equally
+SUPPORTED_ENCODINGS = (["br"] if brotli is not None else []) + ["gzip"]
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """The best encoding we support that the Accept-Encoding header allows, or None for identity."""
+    if not COMPRESSION_ENABLED or not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def compressible(headers) -> bool:
+    """Whether a response with these headers can be compressed whole: not already encoded, not a stream."""
+    has_length = False
+    for name, value in headers:
+        name = name.lower()
+        if name == b"content-encoding":
+            return False
+        if name == b"content-type" and value.lower().startswith(b"text/event-stream"):
+            return False
+        if name == b"content-length":
+            has_length = True
+    return has_length
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing single-message response bodies of at least minimum_size.
+
+    Responses that already have a Content-Encoding (such as the cached
+    /expenses variants) and streamed responses pass through untouched. That
+    is decided on the start message, so a stream's headers are never held
+    back waiting for its first chunk: server-sent events and responses
+    without a Content-Length (StreamingResponse) are streams.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = b""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value
+                break
+        encoding = choose_encoding(accept_encoding.decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+            elif message["type"] == "http.response.start":
+                if not compressible(message.get("headers", [])):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                if message.get("more_body") or len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                body = compress(body, encoding)
+                headers = [(name, value) for name, value in start_message.get("headers", []) if name.lower() != b"content-length"]
+                headers += [
+                    (b"content-encoding", encoding.encode()),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"vary", b"Accept-Encoding"),
+                ]
+                await send({**start_message, "headers": headers})
+                await send({"type": "http.response.body", "body": body})
+            else:
+                await send(message)
+
+        await self.app(scope, receive, compressing_send)
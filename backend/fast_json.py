@@ -0,0 +1,59 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+# Fast path for large JSON responses built from our own store: encode with
+# orjson when it is installed (stdlib json otherwise) and cache the encoded
+# bytes per user, tagged with the user's expense version.
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FAST_JSON = os.environ.get("FAST_JSON", "false").lower() == "true"
+EXPENSES_JSON_CACHE_SIZE = int(os.environ.get("EXPENSES_JSON_CACHE_SIZE", "1024"))
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact JSON bytes. Only plain dicts/lists/str/int/float/None are expected."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
+class VersionedCache:
+    """LRU of values tagged with the version they were built from.
+
+    A lookup with any other version is a miss, so bumping a user's version on
+    every change is all the invalidation needed. Build the value from data read
+    after the version, and a concurrent change can only make it look stale.
+    """
+
+    def __init__(self, max_entries: int = EXPENSES_JSON_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: int) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, version: int, value: Any):
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and current[0] > version:
+                return  # a newer value is already cached
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,95 @@
+import calendar
+import os
+from datetime import date, timedelta
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# Month-end spend forecast per category from per-day totals (the day
+# rollups). Each remaining day of the month is expected to cost what the
+# same weekday cost on average over the lookback window; summing the
+# weekday means and variances over the remaining days gives the projection
+# and its confidence band.
+
+FORECAST_LOOKBACK_DAYS = int(os.environ.get("FORECAST_LOOKBACK_DAYS", "90"))
+# Two-sided 90% band under a normal approximation
+Z_90 = 1.645
+
+
+def month_end_forecast(daily: Sequence[dict], today: date, lookback_days: int = FORECAST_LOOKBACK_DAYS) -> dict:
+    """Forecast for today's month from day buckets ({"bucket": "YYYY-MM-DD", "categories": {name: total}}).
+
+    Days up to and including today count as spent; the forecast covers the
+    days after it. History is the `lookback_days` before today, starting no
+    earlier than the first day with spending.
+    """
+    month_start = today.replace(day=1)
+    month_end = today.replace(day=calendar.monthrange(today.year, today.month)[1])
+    categories = sorted({name for point in daily for name in point["categories"]})
+    columns = {name: index for index, name in enumerate(categories)}
+    total_column = len(categories)
+
+    first_day = min((date.fromisoformat(point["bucket"]) for point in daily), default=today)
+    history_start = max(today - timedelta(days=lookback_days), first_day)
+    history_days = (today - history_start).days
+    history = np.zeros((history_days, len(categories) + 1))
+    spent = np.zeros(len(categories) + 1)
+    for point in daily:
+        day = date.fromisoformat(point["bucket"])
+        for name, amount in point["categories"].items():
+            if history_start <= day < today:
+                history[(day - history_start).days, columns[name]] += amount
+            if month_start <= day <= today:
+                spent[columns[name]] += amount
+    history[:, total_column] = history[:, :total_column].sum(axis=1)
+    spent[total_column] = spent[:total_column].sum()
+
+    remaining_days = (month_end - today).days
+    if history_days:
+        # Mean and variance of daily spend per weekday (Monday = 0), per column
+        weekdays = (np.arange(history_days) + history_start.weekday()) % 7
+        counts = np.bincount(weekdays, minlength=7).astype(float)
+        sums = np.zeros((7, history.shape[1]))
+        squares = np.zeros((7, history.shape[1]))
+        np.add.at(sums, weekdays, history)
+        np.add.at(squares, weekdays, history ** 2)
+        seen = counts > 0
+        means = np.zeros_like(sums)
+        variances = np.zeros_like(sums)
+        means[seen] = sums[seen] / counts[seen, None]
+        variances[seen] = np.maximum(squares[seen] / counts[seen, None] - means[seen] ** 2, 0.0)
+        # A weekday with no history yet is expected to cost the overall daily mean
+        means[~seen] = history.mean(axis=0)
+        variances[~seen] = history.var(axis=0)
+
+        remaining = (np.arange(1, remaining_days + 1) + today.weekday()) % 7
+        remaining_counts = np.bincount(remaining, minlength=7).astype(float)
+        expected = remaining_counts @ means
+        spread = Z_90 * np.sqrt(remaining_counts @ variances)
+    else:
+        expected = np.zeros_like(spent)
+        spread = np.zeros_like(spent)
+
+    projected = spent + expected
+    low = np.maximum(projected - spread, spent)
+    high = projected + spread
+
+    def row(index: int) -> Dict[str, float]:
+        return {
+            "spent_to_date": round(float(spent[index]), 2),
+            "projected": round(float(projected[index]), 2),
+            "low": round(float(low[index]), 2),
+            "high": round(float(high[index]), 2),
+        }
+
+    by_category: List[dict] = [{"category": name, **row(index)} for name, index in columns.items()]
+    by_category.sort(key=lambda item: item["projected"], reverse=True)
+    return {
+        "month": today.isoformat()[:7],
+        "as_of": today.isoformat(),
+        "days_remaining": remaining_days,
+        "history_days": history_days,
+        "confidence": 0.9,
+        "total": row(total_column),
+        "categories": by_category,
+    }
@@ -1,26 +1,61 @@
 import uvicorn
+import asyncio
 import json
+import logging
 from datetime import date, timedelta, datetime
-from typing import List, Optional, Dict, Any, Literal
+from typing import Callable, List, Optional, Dict, Any, Literal
 import os
+import tempfile
+import threading
+import time
+from functools import lru_cache
 
-from fastapi import Depends, FastAPI, HTTPException, status, UploadFile, File
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, status, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
-from passlib.context import CryptContext
-from jose import JWTError, jwt
 import hashlib
-import replicate
-from receipt_parser import ReceiptParser
+from rate_limit import (COST_AUTH, COST_LLM, COST_OCR_PAGE, COST_READ, COST_WRITE, GROUP_API, GROUP_AUTH,
+                        GROUP_LLM, GROUP_OCR, RateLimiter)
+from profiling import ProfilingMiddleware, traced
+from change_log import RESET, ChangeLog
+from compression import COMPRESSION_MIN_BYTES, CompressionMiddleware, choose_encoding, compress
+from fast_json import FAST_JSON, VersionedCache, dumps
+from metrics import REGISTRY, REPLICATE_ERRORS, REPLICATE_SECONDS, CacheCounter, MetricsMiddleware
+from anomaly import AnomalyDetector
+from budgets import BudgetTracker, current_month
+from recurring import RecurringDetector
+from rollups import Rollups
+from search_index import SearchIndex
+from readiness import Readiness, ReplicateHealth
+from structured_logging import RequestIdMiddleware, configure_logging, shutdown_logging
+from upload_guard import (
+    MAX_BATCH_UPLOAD_BYTES, MAX_UPLOAD_BYTES, MemoryBudget, UploadLimitMiddleware,
+    estimate_batch_decode_bytes, estimate_decode_bytes, save_upload,
+)
+from user_categories import UserCategoryStore
 
 # --- 1. APPLICATION SETUP ---
+# JSON logs (LOG_LEVEL, LOG_FORMAT) written from a background thread
+configure_logging()
+logger = logging.getLogger(__name__)
+
 app = FastAPI(
     title="Brokemate API",
     description="Backend for the Brokemate personal expense management application.",
     version="1.2.0"
 )
 
+# Cap receipt upload bodies while they stream in (MAX_UPLOAD_MB / MAX_BATCH_UPLOAD_MB).
+# Middleware added later wraps what was added earlier; added first, this runs
+# inside CORS, so its 413s still carry CORS headers.
+app.add_middleware(
+    UploadLimitMiddleware,
+    limits={"/process-receipt": MAX_UPLOAD_BYTES, "/process-receipts": MAX_BATCH_UPLOAD_BYTES},
+)
+
 # --- 2. CORS MIDDLEWARE ---
 app.add_middleware(
     CORSMiddleware,
@@ -36,14 +71,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Expenses-Version", "Retry-After", "X-Suggested-Flag"],
 )
 
+# gzip/Brotli for large responses (COMPRESSION_MIN_BYTES, GZIP_LEVEL, BROTLI_QUALITY)
+app.add_middleware(CompressionMiddleware)
+
+# Opt-in per-request profiling (X-Profile header or PROFILE_SAMPLE_RATE); a
+# pass-through unless PROFILE_SECRET or PROFILE_SAMPLE_RATE is set
+app.add_middleware(ProfilingMiddleware)
+
+# Per-route latency, status and in-flight metrics for GET /metrics; wraps every
+# middleware above, so their cost counts towards request latency
+app.add_middleware(MetricsMiddleware, routes=app.routes)
+
+# Binds X-Request-ID (incoming or generated) to every log record of the request;
+# added last so it is outermost and the other middlewares' logs carry the id too
+app.add_middleware(RequestIdMiddleware)
+
 # --- 3. SECURITY & AUTHENTICATION SETUP ---
 SECRET_KEY = "a_very_secret_key_that_should_be_in_an_env_file"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 # --- REPLICATE API CONFIGURATION ---
@@ -51,9 +101,73 @@ REPLICATE_API_TOKEN = os.environ.get("REPLICATE_API_TOKEN", "")
 if not REPLICATE_API_TOKEN:
     raise ValueError("REPLICATE_API_TOKEN environment variable is required")
 os.environ["REPLICATE_API_TOKEN"] = REPLICATE_API_TOKEN
+REPLICATE_MODEL = "ibm-granite/granite-3.3-8b-instruct"
+
+# --- LAZY HEAVY IMPORTS ---
+# passlib, jose, replicate, numpy and the OCR/ML stack behind receipt_parser take
+# seconds to import between them. They are loaded on first use, so a pod that
+# only serves /expenses never pays for them.
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+@lru_cache(maxsize=None)
+def get_jwt():
+    """Returns (jwt module, JWTError)."""
+    from jose import JWTError, jwt
+    return jwt, JWTError
+
+@lru_cache(maxsize=None)
+def get_replicate():
+    import replicate
+    return replicate
+
+@lru_cache(maxsize=None)
+def get_analytics():
+    import analytics
+    return analytics
+
+@lru_cache(maxsize=None)
+def get_forecast():
+    import forecast
+    return forecast
 
 # --- RECEIPT PARSER INITIALIZATION ---
-receipt_parser = ReceiptParser()
+# Categories learned from users' edits; owned here so edits never load the parser
+user_categories = UserCategoryStore()
+_receipt_parser = None
+_receipt_parser_lock = threading.Lock()
+
+def get_receipt_parser():
+    """The shared ReceiptParser, imported and constructed on first call."""
+    global _receipt_parser
+    if _receipt_parser is None:
+        with _receipt_parser_lock:
+            if _receipt_parser is None:
+                from receipt_parser import ReceiptParser
+                _receipt_parser = ReceiptParser(user_categories=user_categories)
+    return _receipt_parser
+
+# "background" loads the receipt parser, OCR workers and classifier in a
+# thread after startup; "lazy" waits for the first receipt request
+RECEIPT_WARMUP = os.environ.get("RECEIPT_WARMUP", "background").lower()
+MAX_RECEIPT_PAGES = int(os.environ.get("MAX_RECEIPT_PAGES", "20"))
+
+# --- READINESS ---
+# /readyz gates on the OCR stack and classifier having warmed up and on Replicate
+# having answered recently (READINESS_CHECKS); /livez only says the process is up
+readiness = Readiness()
+
+def probe_replicate():
+    """Cheap authenticated Replicate request: fetch the model's metadata, no prediction."""
+    get_replicate().models.get(REPLICATE_MODEL)
+
+replicate_health = ReplicateHealth(readiness, probe_replicate)
+
+# Shared decode-memory budget for in-flight receipt requests (RECEIPT_MEMORY_BUDGET_MB)
+receipt_memory = MemoryBudget()
 
 # --- 4. IN-MEMORY DATABASE ---
 # This is now structured to support multiple users.
@@ -66,7 +180,8 @@ fake_users_db[test_user] = {
     "username": test_user,
     "full_name": "Test User",
     "email": test_user,
-    "hashed_password": pwd_context.hash("password123"[:72]),  # Truncate password to fix bcrypt issue
+    # bcrypt hash of "password123", precomputed so importing this module doesn't load passlib
+    "hashed_password": "$2b$12$gKmgm1pk65vrAvcTbhfdcOFSsBCqb2C2SuM97fJZUM32Ws5y4sHg2",
     "disabled": False,
 }
 user_expenses[test_user] = [
@@ -75,6 +190,149 @@ user_expenses[test_user] = [
     {"id": 3, "amount": 150.00, "category": "Transport", "description": "Metro card recharge", "date": "2025-09-25", "flag": "green"},
 ]
 
+# --- EXPENSE CHANGE TRACKING ---
+# Every mutation of user_expenses goes through _on_expense_change, which bumps
+# the user's version (so anything cached per version goes stale) and tells the
+# registered listeners what changed, in version order. Writers hold
+# _expense_change_lock from the store mutation through the notification, so
+# expense_snapshot() always sees a list that matches its version.
+expense_versions: Dict[str, int] = {}
+expense_change_listeners: List[Callable[[str, int, str, Optional[dict], Optional[dict]], None]] = []
+_expense_change_lock = threading.RLock()
+
+def _on_expense_change(username: str, op: str, before: Optional[dict], after: Optional[dict]):
+    """Record a change to one expense. op is add/edit/flag/delete; before/after are None for add/delete.
+
+    Listeners are called as listener(username, version, op, before, after).
+    `after` is the live store record: listeners that keep it must copy it.
+    """
+    with _expense_change_lock:
+        version = expense_versions.get(username, 0) + 1
+        expense_versions[username] = version
+        for listener in expense_change_listeners:
+            listener(username, version, op, before, after)
+
+def expense_snapshot(username: str):
+    """(version, copy of the user's expenses), consistent with each other."""
+    with _expense_change_lock:
+        return expense_versions.get(username, 0), list(user_expenses.get(username, []))
+
+def expense_changes(username: str, since: Optional[int]):
+    """(version, changes after `since`), consistent with each other: the version
+    is bumped before the change is logged, so they are read under the lock.
+    Changes are None if no longer all kept, [] when `since` is None."""
+    with _expense_change_lock:
+        version = expense_versions.get(username, 0)
+        changes = change_log.since(username, since, version) if since is not None else []
+        return version, changes
+
+# Recent changes per user, for delta sync and live push to clients
+change_log = ChangeLog()
+expense_change_listeners.append(change_log.record)
+SSE_HEARTBEAT_SECONDS = float(os.environ.get("SSE_HEARTBEAT_SECONDS", "15"))
+# Lifetime of the single-purpose tokens /expenses/stream takes in its URL
+STREAM_TICKET_SECONDS = int(os.environ.get("STREAM_TICKET_SECONDS", "60"))
+
+# Day/week/month spending per category, kept current on every change
+rollups = Rollups(expense_snapshot)
+expense_change_listeners.append(rollups.record)
+
+# Monthly category budgets; checked against the rollups on every change, so after them
+budget_tracker = BudgetTracker(rollups)
+expense_change_listeners.append(budget_tracker.record)
+
+# Month-end forecasts per (user, day), valid for one expense version
+forecast_cache = VersionedCache()
+FORECAST_LOOKUPS = CacheCounter("forecast")
+
+def spend_forecast(username: str) -> dict:
+    """This month's projected month-end spend per category, from the day rollups; cached until the next change."""
+    today = date.today()
+    version = expense_versions.get(username, 0)
+    result = forecast_cache.get((username, today), version)
+    if result is not None:
+        FORECAST_LOOKUPS.hits.inc()
+        return result
+    FORECAST_LOOKUPS.misses.inc()
+    forecast = get_forecast()
+    start = min(today - timedelta(days=forecast.FORECAST_LOOKBACK_DAYS), today.replace(day=1))
+    daily = rollups.series(username, version, "day", by_category=True, start=start.isoformat(), end=today.isoformat())
+    result = forecast.month_end_forecast(daily, today)
+    forecast_cache.put((username, today), version, result)
+    return result
+
+# Inverted index over descriptions and categories for /expenses/search
+search_index = SearchIndex(expense_snapshot)
+expense_change_listeners.append(search_index.record)
+
+# Repeat bills and subscriptions for /expenses/recurring
+recurring_detector = RecurringDetector(expense_snapshot)
+expense_change_listeners.append(recurring_detector.record)
+
+# Red-flag suggestions for unusually large expenses, scored as they are added or edited
+anomaly_detector = AnomalyDetector(expense_snapshot)
+expense_change_listeners.append(anomaly_detector.record)
+
+def flag_suggestions(username: str, expenses: List[dict]) -> List[dict]:
+    """Open red-flag suggestions for the given (just written) expenses."""
+    suggestions = [anomaly_detector.suggestion(username, expense['id']) for expense in expenses]
+    return [suggestion for suggestion in suggestions if suggestion is not None]
+
+# NumPy column snapshots of each user's expenses for /analytics, valid for one expense version
+ANALYTICS_SNAPSHOT_CACHE_SIZE = int(os.environ.get("ANALYTICS_SNAPSHOT_CACHE_SIZE", "64"))
+analytics_snapshots = VersionedCache(ANALYTICS_SNAPSHOT_CACHE_SIZE)
+ANALYTICS_SNAPSHOT_LOOKUPS = CacheCounter("analytics_snapshot")
+
+def expense_columns(username: str):
+    """The user's expenses as an analytics.ColumnarSnapshot; rebuilt after their next change."""
+    snapshot = analytics_snapshots.get(username, expense_versions.get(username, 0))
+    if snapshot is not None:
+        ANALYTICS_SNAPSHOT_LOOKUPS.hits.inc()
+        return snapshot
+    ANALYTICS_SNAPSHOT_LOOKUPS.misses.inc()
+    version, expenses = expense_snapshot(username)
+    snapshot = get_analytics().ColumnarSnapshot.from_expenses(expenses)
+    analytics_snapshots.put(username, version, snapshot)
+    return snapshot
+
+# Encoded GET /expenses bodies per user (FAST_JSON=true), valid for one expense version
+expenses_json_cache = VersionedCache()
+EXPENSES_JSON_LOOKUPS = CacheCounter("expenses_json")
+
+def expenses_json(username: str) -> bytes:
+    """The user's expenses, newest first, as JSON bytes; cached until their next change."""
+    version = expense_versions.get(username, 0)
+    body = expenses_json_cache.get(username, version)
+    if body is not None:
+        EXPENSES_JSON_LOOKUPS.hits.inc()
+        return body
+    EXPENSES_JSON_LOOKUPS.misses.inc()
+    # Store records are written from validated models, so they are serialized as they are
+    body = dumps(sorted(user_expenses.get(username, []), key=lambda x: x['date'], reverse=True))
+    expenses_json_cache.put(username, version, body)
+    return body
+
+# Compressed GET /expenses bodies per (user, encoding), valid for one expense version
+compressed_expenses_cache = VersionedCache()
+COMPRESSED_EXPENSES_LOOKUPS = CacheCounter("expenses_compressed")
+
+def expenses_body(username: str, encoding: Optional[str]):
+    """(body, content encoding) for GET /expenses; compressed variants are cached until the user's next change."""
+    version = expense_versions.get(username, 0)
+    if encoding is not None:
+        body = compressed_expenses_cache.get((username, encoding), version)
+        if body is not None:
+            COMPRESSED_EXPENSES_LOOKUPS.hits.inc()
+            return body, encoding
+    body = expenses_json(username)
+    if encoding is None or len(body) < COMPRESSION_MIN_BYTES:
+        return body, None
+    COMPRESSED_EXPENSES_LOOKUPS.misses.inc()
+    # Tagged with the version read first: if a change raced the build, the entry is just stale
+    body = compress(body, encoding)
+    compressed_expenses_cache.put((username, encoding), version, body)
+    return body, encoding
+
 
 # --- 5. PYDANTIC MODELS (DATA & USER VALIDATION) ---
 
@@ -118,11 +376,14 @@ class TokenData(BaseModel):
 class ChatRequest(BaseModel):
     query: str
 
+class BudgetUpdate(BaseModel):
+    monthly_limit: float = Field(..., gt=0, description="Monthly spending limit for the category, must be positive.")
+
 
 # --- 6. AUTHENTICATION HELPER FUNCTIONS ---
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     # Ensure password is a string and has reasonable length
@@ -130,7 +391,7 @@ def get_password_hash(password):
         password = str(password)
     if len(password) > 72:  # bcrypt max length
         password = password[:72]
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def get_user(db, username: str):
     if username in db:
@@ -144,19 +405,22 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
+    jwt, _ = get_jwt()
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+def get_user_from_token(token: str, scope: Optional[str] = None):
+    """The user a token belongs to, or 401. Tokens with a scope (stream tickets) are only valid for that scope."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    jwt, JWTError = get_jwt()
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
-        if username is None:
+        if username is None or payload.get("scope") != scope:
             raise credentials_exception
         token_data = TokenData(username=username)
     except JWTError:
@@ -166,14 +430,35 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         raise credentials_exception
     return user
 
+@traced("auth")
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    return get_user_from_token(token)
+
+# Per-user token buckets per group, weighted by request cost (RATE_LIMIT_*)
+rate_limiter = RateLimiter()
+
+def rate_limit(group: str, cost: float):
+    """Route dependency charging the current user `cost` tokens in `group`; 429 when they run out."""
+    async def charge_user(current_user: User = Depends(get_current_user)):
+        rate_limiter.check(current_user.username, group, cost)
+    return charge_user
+
+def rate_limit_client(group: str, cost: float):
+    """Like rate_limit, keyed by client address, for routes called before login."""
+    async def charge_client(request: Request):
+        rate_limiter.check(request.client.host if request.client else "unknown", group, cost)
+    return charge_client
+
 
 # --- 7. AI RESPONSES USING REPLICATE IBM GRANITE 3.3 8B INSTRUCT ---
 
+@traced("llm")
 def call_replicate_model(prompt: str, max_tokens: int = 1000) -> str:
     """Call the IBM Granite 3.3 8B Instruct model via Replicate API."""
+    start = time.perf_counter()
     try:
-        output = replicate.run(
-            "ibm-granite/granite-3.3-8b-instruct",
+        output = get_replicate().run(
+            REPLICATE_MODEL,
             input={
                 "prompt": prompt,
                 "max_tokens": max_tokens,
@@ -184,12 +469,18 @@ def call_replicate_model(prompt: str, max_tokens: int = 1000) -> str:
         
         # The output is an iterator, so we need to join it
         response = "".join(output)
+        REPLICATE_SECONDS.observe(time.perf_counter() - start)
+        replicate_health.record(True)
         return response.strip()
         
     except Exception as e:
-        print(f"Error calling Replicate API: {e}")
+        logger.warning("Error calling Replicate API: %s", e)
+        REPLICATE_SECONDS.observe(time.perf_counter() - start)
+        REPLICATE_ERRORS.inc()
+        replicate_health.record(False, str(e))
         return f"I apologize, but I'm having trouble connecting to the AI service right now. Please try again later."
 
+@traced("summary")
 def generate_expense_summary(expenses: List[dict]) -> str:
     """Generate a summary of expenses for context."""
     if not expenses:
@@ -216,12 +507,51 @@ def generate_expense_summary(expenses: List[dict]) -> str:
     
     return summary
 
-def generate_ai_analysis(expenses: List[dict]) -> str:
-    """Generate financial analysis using IBM Granite 3.3 8B Instruct."""
+def generate_spending_trends(username: str, months: int = 6) -> str:
+    """Month-by-month totals and top categories for the last few months, from the rollups."""
+    series = rollups.series(username, expense_versions.get(username, 0), "month", by_category=True)[-months:]
+    if not series:
+        return ""
+    trends = f"Monthly spending (last {len(series)} months):\n"
+    for point in series:
+        top = sorted(point["categories"].items(), key=lambda x: x[1], reverse=True)[:3]
+        top_text = ", ".join(f"{cat} ₹{amount:,.2f}" for cat, amount in top)
+        trends += f"  - {point['bucket']}: ₹{point['total']:,.2f} in {point['count']} transactions (top: {top_text})\n"
+    return trends.rstrip("\n")
+
+def generate_budget_status(username: str) -> str:
+    """This month's spend against each budget, from the budget tracker."""
+    status = budget_tracker.status(username, expense_versions.get(username, 0))
+    if not status:
+        return ""
+    text = f"Monthly budgets ({status[0]['month']}):\n"
+    for budget in status:
+        text += (f"  - {budget['category']}: ₹{budget['spent']:,.2f} of ₹{budget['monthly_limit']:,.2f} "
+                 f"({budget['percent_used']:.0f}% used)\n")
+    return text.rstrip("\n")
+
+def generate_spend_forecast(username: str) -> str:
+    """Projected month-end totals with 90% ranges, computed locally (no model call)."""
+    result = spend_forecast(username)
+    total = result["total"]
+    if not total["projected"]:
+        return ""
+    text = (f"Month-end forecast for {result['month']} ({result['days_remaining']} days left): "
+            f"₹{total['projected']:,.2f} projected (90% range ₹{total['low']:,.2f}-₹{total['high']:,.2f}), "
+            f"₹{total['spent_to_date']:,.2f} spent so far\n")
+    for item in result["categories"][:5]:
+        text += (f"  - {item['category']}: ₹{item['projected']:,.2f} projected "
+                 f"(₹{item['low']:,.2f}-₹{item['high']:,.2f}), ₹{item['spent_to_date']:,.2f} so far\n")
+    return text.rstrip("\n")
+
+def generate_ai_analysis(expenses: List[dict], context: str = "") -> str:
+    """Generate financial analysis using IBM Granite 3.3 8B Instruct. `context` is extra per-user data for the prompt."""
     if not expenses:
         return "� You haven't added any expenses yet! Start tracking your spending to get personalized insights."
     
     expense_summary = generate_expense_summary(expenses)
+    if context:
+        expense_summary += "\n" + context
     
     prompt = f"""You are a helpful financial advisor assistant for the Brokemate expense tracking app. 
 Analyze the following expense data and provide actionable insights, tips, and recommendations.
@@ -239,9 +569,11 @@ Format your response with clear sections and bullet points."""
 
     return call_replicate_model(prompt, max_tokens=800)
 
-def generate_ai_chat_response(query: str, expenses: List[dict]) -> str:
-    """Generate chat response using IBM Granite 3.3 8B Instruct."""
+def generate_ai_chat_response(query: str, expenses: List[dict], context: str = "") -> str:
+    """Generate chat response using IBM Granite 3.3 8B Instruct. `context` is extra per-user data for the prompt."""
     expense_summary = generate_expense_summary(expenses)
+    if context:
+        expense_summary += "\n" + context
     
     prompt = f"""You are a helpful financial advisor chatbot for the Brokemate expense tracking app.
 Answer the user's question based on their expense data. Be friendly, helpful, and use emojis where appropriate.
@@ -261,7 +593,8 @@ Provide a helpful, personalized response:"""
 
 # --- AUTHENTICATION ENDPOINTS ---
 
-@app.post("/register", response_model=User, status_code=201, tags=["Authentication"])
+@app.post("/register", response_model=User, status_code=201, tags=["Authentication"],
+          dependencies=[Depends(rate_limit_client(GROUP_AUTH, COST_AUTH))])
 def register_user(user: UserCreate):
     """Register a new user."""
     if user.username in fake_users_db:
@@ -272,7 +605,8 @@ def register_user(user: UserCreate):
     user_expenses[user.username] = []
     return new_user
 
-@app.post("/token", response_model=Token, tags=["Authentication"])
+@app.post("/token", response_model=Token, tags=["Authentication"],
+          dependencies=[Depends(rate_limit_client(GROUP_AUTH, COST_AUTH))])
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     """Logs in a user and returns a JWT token."""
     user = get_user(fake_users_db, form_data.username)
@@ -290,81 +624,318 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 
 # --- PROTECTED EXPENSE MANAGEMENT ENDPOINTS ---
 
-@app.get("/expenses", response_model=List[Expense], tags=["Expenses"])
-def get_expenses(current_user: User = Depends(get_current_user)):
-    """Retrieve all expenses for the current user."""
+@app.get("/expenses", response_model=List[Expense], tags=["Expenses"],
+         dependencies=[Depends(rate_limit(GROUP_API, COST_READ))])
+@traced("store")
+def get_expenses(request: Request, response: Response, current_user: User = Depends(get_current_user)):
+    """Retrieve all expenses for the current user.
+
+    X-Expenses-Version is the version the list is at least as new as; pass it
+    to /expenses/changes or /expenses/stream to receive only later changes.
+    """
+    # Read before the list: replaying a change the list already has is harmless
+    version = str(expense_versions.get(current_user.username, 0))
+    if FAST_JSON:
+        # Cached bytes, compressed if negotiated. Returning a Response skips
+        # response_model revalidation of our own records.
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+        body, content_encoding = expenses_body(current_user.username, encoding)
+        headers = {"Vary": "Accept-Encoding", "X-Expenses-Version": version}
+        if content_encoding is not None:
+            headers["Content-Encoding"] = content_encoding
+        return Response(content=body, media_type="application/json", headers=headers)
+    # Validated against response_model; CompressionMiddleware compresses it
+    response.headers["X-Expenses-Version"] = version
     user_db = user_expenses.get(current_user.username, [])
     return sorted(user_db, key=lambda x: x['date'], reverse=True)
 
-@app.post("/add-expense", response_model=Expense, status_code=201, tags=["Expenses"])
-def add_expense(expense: ExpenseCreate, current_user: User = Depends(get_current_user)):
-    """Add a new expense for the current user."""
+@app.get("/expenses/changes", tags=["Expenses"],
+         dependencies=[Depends(rate_limit(GROUP_API, COST_READ))])
+def get_expense_changes(since: int = Query(..., ge=0), current_user: User = Depends(get_current_user)):
+    """Changes after version `since`, oldest first. 410 if they are no longer all kept: refetch /expenses."""
+    current_version, changes = expense_changes(current_user.username, since)
+    if changes is None:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Change history unavailable, refetch /expenses")
+    return {"version": current_version, "changes": changes}
+
+@app.post("/expenses/stream-ticket", tags=["Expenses"],
+          dependencies=[Depends(rate_limit(GROUP_API, COST_READ))])
+def create_stream_ticket(current_user: User = Depends(get_current_user)):
+    """A short-lived token for /expenses/stream, so the bearer token never goes in a URL (or access log)."""
+    ticket = create_access_token({"sub": current_user.username, "scope": "stream"},
+                                 expires_delta=timedelta(seconds=STREAM_TICKET_SECONDS))
+    return {"ticket": ticket, "expires_in": STREAM_TICKET_SECONDS}
+
+@app.get("/expenses/search", tags=["Expenses"], dependencies=[Depends(rate_limit(GROUP_API, COST_READ))])
+@traced("search")
+def search_expenses(
+    q: str = Query(..., min_length=1, max_length=200),
+    category: Optional[str] = None,
+    flag: Optional[Literal['red', 'green']] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_user),
+):
+    """Expenses whose description or category matches every word of `q` (as a prefix), best match first."""
+    start_text = start.isoformat() if start else None
+    end_text = end.isoformat() if end else None
+    predicate = None
+    if any(value is not None for value in (category, flag, start, end, min_amount, max_amount)):
+        def predicate(expense):
+            return ((category is None or expense['category'] == category)
+                    and (flag is None or expense.get('flag') == flag)
+                    and (start_text is None or expense['date'] >= start_text)
+                    and (end_text is None or expense['date'] <= end_text)
+                    and (min_amount is None or expense['amount'] >= min_amount)
+                    and (max_amount is None or expense['amount'] <= max_amount))
+    total, results = search_index.search(
+        current_user.username, expense_versions.get(current_user.username, 0), q, limit, predicate
+    )
+    return {"query": q, "total": total, "results": results}
+
+@app.get("/expenses/recurring", tags=["Expenses"], dependencies=[Depends(rate_limit(GROUP_API, COST_READ))])
+@traced("recurring")
+def get_recurring_expenses(current_user: User = Depends(get_current_user)):
+    """Weekly, monthly and yearly repeat expenses with their next expected date and monthly cost."""
+    series = recurring_detector.series(current_user.username, expense_versions.get(current_user.username, 0))
+    monthly_total = sum(item["monthly_cost"] for item in series if item["active"])
+    return {"series": series, "monthly_total": round(monthly_total, 2)}
+
+def _sse_event(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    lines = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{lines}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.get("/expenses/stream", tags=["Expenses"])
+async def stream_expense_changes(request: Request, ticket: str = Query(...), since: Optional[int] = Query(None, ge=0)):
+    """Server-sent events: one `change` event per expense change after `since`.
+
+    Authenticates with ?ticket= from POST /expenses/stream-ticket, since
+    EventSource cannot send headers; the ticket is checked on connect, so
+    a reconnect after it expires gets 401 and needs a new one. A
+    reconnecting EventSource resumes from its Last-Event-ID. A `reset` event
+    means changes were missed and the client must refetch /expenses.
+    """
+    username = get_user_from_token(ticket, scope="stream").username
+    rate_limiter.check(username, GROUP_API, COST_READ)
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    # Subscribe before reading the backlog so no change falls between the two
+    subscriber = change_log.subscribe(username)
+    current_version, backlog = expense_changes(username, since)
+
+    async def events():
+        try:
+            sent = since if since is not None else current_version
+            if backlog is None:
+                yield _sse_event("reset", {"version": current_version})
+                sent = current_version
+            else:
+                for change in backlog:
+                    yield _sse_event("change", change, change["version"])
+                    sent = change["version"]
+            while True:
+                try:
+                    change = await asyncio.wait_for(subscriber.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment line: keeps proxies from closing an idle connection
+                    yield ": heartbeat\n\n"
+                    continue
+                if change is RESET:
+                    sent, _ = expense_changes(username, None)
+                    yield _sse_event("reset", {"version": sent})
+                elif change["version"] > sent:
+                    yield _sse_event("change", change, change["version"])
+                    sent = change["version"]
+        finally:
+            change_log.unsubscribe(username, subscriber)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/expenses/flag-suggestions", tags=["Expenses"], dependencies=[Depends(rate_limit(GROUP_API, COST_READ))])
+def get_flag_suggestions(current_user: User = Depends(get_current_user)):
+    """Expenses that look unusually large for their category, suggested as red flags, newest first.
+
+    Accept one with /flag-expense or dismiss it with DELETE.
+    """
+    suggestions = anomaly_detector.suggestions(current_user.username, expense_versions.get(current_user.username, 0))
+    return {"suggestions": suggestions}
+
+@app.delete("/expenses/flag-suggestions/{expense_id}", status_code=204, tags=["Expenses"],
+            dependencies=[Depends(rate_limit(GROUP_API, COST_WRITE))])
+def dismiss_flag_suggestion(expense_id: int, current_user: User = Depends(get_current_user)):
+    """Dismiss the red-flag suggestion for an expense."""
+    if not anomaly_detector.dismiss(current_user.username, expense_id):
+        raise HTTPException(status_code=404, detail="Suggestion not found")
+    return
+
+@app.post("/add-expense", response_model=Expense, status_code=201, tags=["Expenses"],
+          dependencies=[Depends(rate_limit(GROUP_API, COST_WRITE))])
+@traced("store")
+def add_expense(expense: ExpenseCreate, response: Response, current_user: User = Depends(get_current_user)):
+    """Add a new expense for the current user. X-Suggested-Flag: red marks an unusually large one."""
     try:
-        print(f"DEBUG: Received expense data: {expense.dict()}")
-        user_db = user_expenses.get(current_user.username, [])
-        new_id = max((d['id'] for d in user_db), default=0) + 1
+        logger.debug("Received expense data: %s", expense)
         new_expense_data = expense.dict()
-        new_expense_data.update({"id": new_id, "flag": None})
         new_expense_data['date'] = new_expense_data['date'].isoformat()
-        user_db.append(new_expense_data)
-        user_expenses[current_user.username] = user_db
-        print(f"DEBUG: Successfully added expense with id {new_id}")
+        with _expense_change_lock:
+            user_db = user_expenses.get(current_user.username, [])
+            new_id = max((d['id'] for d in user_db), default=0) + 1
+            new_expense_data.update({"id": new_id, "flag": None})
+            user_db.append(new_expense_data)
+            user_expenses[current_user.username] = user_db
+            _on_expense_change(current_user.username, "add", None, new_expense_data)
+        if flag_suggestions(current_user.username, [new_expense_data]):
+            response.headers["X-Suggested-Flag"] = "red"
+        logger.debug("Added expense %d", new_id)
         return new_expense_data
-    except Exception as e:
-        print(f"ERROR in add_expense: {str(e)}")
+    except Exception:
+        logger.exception("add_expense failed")
         raise
     
-@app.put("/edit-expense/{expense_id}", response_model=Expense, tags=["Expenses"])
-def edit_expense(expense_id: int, expense_update: ExpenseCreate, current_user: User = Depends(get_current_user)):
-    """Update an existing expense by its ID for the current user."""
-    user_db = user_expenses.get(current_user.username, [])
-    for index, item in enumerate(user_db):
-        if item["id"] == expense_id:
-            updated_data = expense_update.dict()
-            updated_data['date'] = updated_data['date'].isoformat()
-            user_db[index].update(updated_data)
-            return user_db[index]
-    raise HTTPException(status_code=404, detail="Expense not found")
+@app.put("/edit-expense/{expense_id}", response_model=Expense, tags=["Expenses"],
+         dependencies=[Depends(rate_limit(GROUP_API, COST_WRITE))])
+@traced("store")
+def edit_expense(expense_id: int, expense_update: ExpenseCreate, response: Response,
+                 current_user: User = Depends(get_current_user)):
+    """Update an existing expense by its ID for the current user. X-Suggested-Flag: red marks an unusually large one."""
+    updated_data = expense_update.dict()
+    updated_data['date'] = updated_data['date'].isoformat()
+    with _expense_change_lock:
+        item = next((item for item in user_expenses.get(current_user.username, []) if item["id"] == expense_id), None)
+        if item is None:
+            raise HTTPException(status_code=404, detail="Expense not found")
+        before = dict(item)
+        item.update(updated_data)
+        _on_expense_change(current_user.username, "edit", before, item)
+        updated = dict(item)
+    if flag_suggestions(current_user.username, [updated]):
+        response.headers["X-Suggested-Flag"] = "red"
+    if updated_data['category'] != before['category']:
+        # Category corrections teach the receipt parser this user's categories
+        user_categories.learn_description(current_user.username, updated_data['description'], updated_data['category'])
+    return updated
 
-@app.post("/flag-expense", response_model=Expense, tags=["Expenses"])
+@app.post("/flag-expense", response_model=Expense, tags=["Expenses"],
+          dependencies=[Depends(rate_limit(GROUP_API, COST_WRITE))])
+@traced("store")
 def flag_expense(flag_update: FlagUpdate, current_user: User = Depends(get_current_user)):
     """Flag an expense as 'red' or 'green' for the current user."""
-    user_db = user_expenses.get(current_user.username, [])
-    for item in user_db:
-        if item['id'] == flag_update.id:
-            item['flag'] = flag_update.flag
-            return item
+    with _expense_change_lock:
+        for item in user_expenses.get(current_user.username, []):
+            if item['id'] == flag_update.id:
+                before = dict(item)
+                item['flag'] = flag_update.flag
+                _on_expense_change(current_user.username, "flag", before, item)
+                return item
     raise HTTPException(status_code=404, detail="Expense not found")
 
-@app.delete("/delete-expense/{expense_id}", status_code=204, tags=["Expenses"])
+@app.delete("/delete-expense/{expense_id}", status_code=204, tags=["Expenses"],
+            dependencies=[Depends(rate_limit(GROUP_API, COST_WRITE))])
+@traced("store")
 def delete_expense(expense_id: int, current_user: User = Depends(get_current_user)):
     """Delete an expense by its ID for the current user."""
-    user_db = user_expenses.get(current_user.username, [])
-    original_count = len(user_db)
-    user_db = [item for item in user_db if item['id'] != expense_id]
-    if len(user_db) == original_count:
-        raise HTTPException(status_code=404, detail="Expense not found")
-    user_expenses[current_user.username] = user_db
+    with _expense_change_lock:
+        user_db = user_expenses.get(current_user.username, [])
+        removed = next((item for item in user_db if item['id'] == expense_id), None)
+        if removed is None:
+            raise HTTPException(status_code=404, detail="Expense not found")
+        user_expenses[current_user.username] = [item for item in user_db if item['id'] != expense_id]
+        _on_expense_change(current_user.username, "delete", removed, None)
+    return
+
+# --- STATS ENDPOINTS ---
+
+@app.get("/stats/timeseries", tags=["Stats"], dependencies=[Depends(rate_limit(GROUP_API, COST_READ))])
+def spending_timeseries(
+    bucket: Literal["day", "week", "month"] = "month",
+    group_by: Optional[Literal["category"]] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: User = Depends(get_current_user),
+):
+    """Spending per day, week (starting Monday) or month, optionally split by category, oldest first."""
+    series = rollups.series(
+        current_user.username,
+        expense_versions.get(current_user.username, 0),
+        bucket,
+        by_category=group_by == "category",
+        start=start.isoformat() if start else None,
+        end=end.isoformat() if end else None,
+    )
+    return {"bucket": bucket, "group_by": group_by, "series": series}
+
+@app.get("/analytics", tags=["Stats"], dependencies=[Depends(rate_limit(GROUP_API, COST_READ))])
+@traced("analytics")
+def spending_analytics(days: int = Query(90, ge=1, le=3660), current_user: User = Depends(get_current_user)):
+    """Per-category percentiles, day-of-week pattern, daily totals with 7/30-day rolling averages
+    over the last `days` days, and month-over-month change."""
+    return get_analytics().analyze(expense_columns(current_user.username), last_days=days)
+
+@app.get("/stats/forecast", tags=["Stats"], dependencies=[Depends(rate_limit(GROUP_API, COST_READ))])
+@traced("forecast")
+def spending_forecast(current_user: User = Depends(get_current_user)):
+    """Projected month-end spend, in total and per category, with 90% confidence bands."""
+    return spend_forecast(current_user.username)
+
+# --- BUDGET ENDPOINTS ---
+
+@app.get("/budgets", tags=["Budgets"], dependencies=[Depends(rate_limit(GROUP_API, COST_READ))])
+def list_budgets(month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"), current_user: User = Depends(get_current_user)):
+    """The user's budgets with spend for `month` (YYYY-MM, default this month)."""
+    status = budget_tracker.status(current_user.username, expense_versions.get(current_user.username, 0), month)
+    return {"month": month or current_month(), "budgets": status}
+
+@app.get("/budgets/alerts", tags=["Budgets"], dependencies=[Depends(rate_limit(GROUP_API, COST_READ))])
+def list_budget_alerts(since_id: int = Query(0, ge=0), current_user: User = Depends(get_current_user)):
+    """Recent alerts for writes that took a month's spend past 80% or 100% of a budget, newest first."""
+    return {"alerts": budget_tracker.alerts(current_user.username, since_id)}
+
+@app.put("/budgets/{category}", tags=["Budgets"], dependencies=[Depends(rate_limit(GROUP_API, COST_WRITE))])
+def set_budget(category: str, budget: BudgetUpdate, current_user: User = Depends(get_current_user)):
+    """Create or change the monthly budget for a category."""
+    budget_tracker.set(current_user.username, category, budget.monthly_limit)
+    status = budget_tracker.status(current_user.username, expense_versions.get(current_user.username, 0))
+    return next(item for item in status if item["category"] == category)
+
+@app.delete("/budgets/{category}", status_code=204, tags=["Budgets"],
+            dependencies=[Depends(rate_limit(GROUP_API, COST_WRITE))])
+def delete_budget(category: str, current_user: User = Depends(get_current_user)):
+    """Remove the monthly budget for a category."""
+    if not budget_tracker.delete(current_user.username, category):
+        raise HTTPException(status_code=404, detail="Budget not found")
     return
 
 # --- AI ENDPOINTS (Simplified) ---
 
-@app.post("/analyze", tags=["AI"])
+@app.post("/analyze", tags=["AI"],
+          dependencies=[Depends(rate_limit(GROUP_LLM, COST_LLM))])
 def analyze_expenses(current_user: User = Depends(get_current_user)):
     """Analyzes the current user's spending habits using IBM Granite 3.3 8B Instruct via Replicate."""
     user_db = user_expenses.get(current_user.username, [])
-    analysis_result = generate_ai_analysis(user_db)
+    analysis_result = generate_ai_analysis(user_db, generate_spending_trends(current_user.username))
     return {"analysis": analysis_result}
 
-@app.post("/chat", tags=["AI"])
+@app.post("/chat", tags=["AI"],
+          dependencies=[Depends(rate_limit(GROUP_LLM, COST_LLM))])
 def chat_with_ai(request: ChatRequest, current_user: User = Depends(get_current_user)):
     """Powers the AI chat using IBM Granite 3.3 8B Instruct via Replicate, with the current user's expense data as context."""
     user_db = user_expenses.get(current_user.username, [])
-    chat_response = generate_ai_chat_response(request.query, user_db)
+    context = "\n".join(filter(None, [
+        generate_spending_trends(current_user.username),
+        generate_budget_status(current_user.username),
+        generate_spend_forecast(current_user.username),
+    ]))
+    chat_response = generate_ai_chat_response(request.query, user_db, context)
     return {"response": chat_response}
 
 # --- RECEIPT PROCESSING ENDPOINT ---
-@app.post("/process-receipt", tags=["Expenses"])
+@app.post("/process-receipt", tags=["Expenses"],
+          dependencies=[Depends(rate_limit(GROUP_OCR, COST_OCR_PAGE))])
 async def process_receipt(
     file: UploadFile = File(...),
     description: str = "Receipt items",
@@ -376,40 +947,139 @@ async def process_receipt(
     
     temp_file_path = None
     try:
-        # Read the uploaded file
-        contents = await file.read()
+        # Stream the upload to a temporary file, capped at MAX_UPLOAD_MB
+        temp_file_path = await save_upload(file)
         
-        # Save to temporary file
-        temp_file_path = receipt_parser.save_temp_image(contents)
-        
-        # Process the receipt
-        expenses = receipt_parser.process_receipt(temp_file_path, description)
+        # Size up the decode from the image header, then process within the memory budget.
+        # Off the event loop: OCR waits on the worker pool, and the first call may build the parser.
+        receipt_parser = await run_in_threadpool(get_receipt_parser)
+        decode_bytes = await run_in_threadpool(estimate_decode_bytes, temp_file_path)
+        with receipt_memory.reserve(decode_bytes):
+            expenses = await run_in_threadpool(
+                receipt_parser.process_receipt, temp_file_path, description, current_user.username
+            )
         
         # Add expenses to user's account
-        user_db = user_expenses.get(current_user.username, [])
-        next_id = max((d['id'] for d in user_db), default=0) + 1
-        
-        for expense in expenses:
-            expense['id'] = next_id
-            expense['flag'] = None
-            user_db.append(expense)
-            next_id += 1
-        
-        user_expenses[current_user.username] = user_db
+        with _expense_change_lock:
+            user_db = user_expenses.get(current_user.username, [])
+            next_id = max((d['id'] for d in user_db), default=0) + 1
+            
+            for expense in expenses:
+                expense['id'] = next_id
+                expense['flag'] = None
+                user_db.append(expense)
+                next_id += 1
+            
+            user_expenses[current_user.username] = user_db
+            for expense in expenses:
+                _on_expense_change(current_user.username, "add", None, expense)
         
         return {
             "message": "Receipt processed successfully",
             "expenses_added": len(expenses),
-            "expenses": expenses
+            "expenses": expenses,
+            "flag_suggestions": flag_suggestions(current_user.username, expenses),
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
     finally:
         # Clean up temporary file
         if temp_file_path:
-            receipt_parser.cleanup_temp_file(temp_file_path)
+            try:
+                os.unlink(temp_file_path)
+            except OSError:
+                pass
+
+@app.post("/process-receipts", tags=["Expenses"])
+async def process_receipts(
+    files: List[UploadFile] = File(...),
+    description: str = "Receipt items",
+    current_user: User = Depends(get_current_user)
+):
+    """Process a multi-page receipt or bill (several images and/or PDFs) and add all its expenses at once."""
+    for file in files:
+        if not file.content_type or not (file.content_type.startswith('image/') or file.content_type == 'application/pdf'):
+            raise HTTPException(status_code=400, detail=f"{file.filename}: file must be an image or a PDF")
+    # Charged per file up front, and for any further PDF pages once rasterized
+    rate_limiter.check(current_user.username, GROUP_OCR, COST_OCR_PAGE * len(files))
+
+    receipt_parser = await run_in_threadpool(get_receipt_parser)
+    with tempfile.TemporaryDirectory(prefix="receipt-") as work_dir:
+        uploads = [(file.content_type, await save_upload(file, work_dir)) for file in files]
+        try:
+            # Rasterizing and OCR are CPU bound; keep them off the event loop
+            page_paths = await run_in_threadpool(receipt_parser.save_page_images, uploads, work_dir, MAX_RECEIPT_PAGES)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Could not read the uploaded pages: {e}")
+        if len(page_paths) > len(files):
+            rate_limiter.check(current_user.username, GROUP_OCR, COST_OCR_PAGE * (len(page_paths) - len(files)))
+
+        decode_bytes = await run_in_threadpool(
+            estimate_batch_decode_bytes, page_paths, receipt_parser.ocr_workers
+        )
+        with receipt_memory.reserve(decode_bytes):
+            try:
+                expenses = await run_in_threadpool(
+                    receipt_parser.process_receipt_pages, page_paths, description, current_user.username
+                )
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=str(e))
+
+    # All pages are added together, or nothing is if any page failed
+    with _expense_change_lock:
+        user_db = user_expenses.get(current_user.username, [])
+        next_id = max((d['id'] for d in user_db), default=0) + 1
+        for offset, expense in enumerate(expenses):
+            expense['id'] = next_id + offset
+            expense['flag'] = None
+        user_db.extend(expenses)
+        user_expenses[current_user.username] = user_db
+        for expense in expenses:
+            _on_expense_change(current_user.username, "add", None, expense)
+
+    return {
+        "message": "Receipt processed successfully",
+        "pages": len(page_paths),
+        "expenses_added": len(expenses),
+        "expenses": expenses,
+        "flag_suggestions": flag_suggestions(current_user.username, expenses),
+    }
+
+# --- STARTUP ---
+def _warm_up_receipt_parser():
+    for name in ("ocr", "classifier"):
+        readiness.set(name, False, "warming up")
+    try:
+        receipt_parser = get_receipt_parser()
+    except Exception as e:
+        for name in ("ocr", "classifier"):
+            readiness.set(name, False, f"Receipt parser failed to load: {e}")
+        return
+    for name, (ready, detail) in receipt_parser.warmup().items():
+        readiness.set(name, ready, detail)
+
+@app.on_event("shutdown")
+def flush_logs():
+    shutdown_logging()
+
+@app.on_event("startup")
+def warm_up_receipt_parser():
+    """Load the receipt parser and run a synthetic receipt through OCR and classification in the background.
+
+    Runs in a thread so the server starts answering /livez immediately; /readyz reports ready once it's done.
+    """
+    replicate_health.refresh()
+    if RECEIPT_WARMUP == "background":
+        threading.Thread(target=_warm_up_receipt_parser, name="receipt-warmup", daemon=True).start()
+    else:
+        for name in ("ocr", "classifier"):
+            readiness.set(name, True, "loaded on the first receipt request (RECEIPT_WARMUP=lazy)")
 
 # --- Health Check ---
 @app.get("/", tags=["Health"])
@@ -417,6 +1087,60 @@ def health_check():
     """Health check endpoint."""
     return {"status": "healthy", "message": "Brokemate API is running!"}
 
+def store_sizes():
+    """Store sizes for /metrics. Receipt parser stores are only reported once it has been loaded."""
+    sizes = {
+        "users": len(fake_users_db),
+        "expenses": sum(len(expenses) for expenses in list(user_expenses.values())),
+        "receipt_memory_bytes": receipt_memory.in_use,
+        "expenses_json_cache": len(expenses_json_cache),
+        "compressed_expenses_cache": len(compressed_expenses_cache),
+        "change_log": len(change_log),
+        "change_subscribers": change_log.subscriber_count(),
+        "rate_limit_buckets": len(rate_limiter),
+        "rollup_buckets": rollups.bucket_count(),
+        "analytics_snapshots": len(analytics_snapshots),
+        "budgets": budget_tracker.budget_count(),
+        "search_tokens": search_index.token_count(),
+        "recurring_groups": recurring_detector.group_count(),
+        "forecast_cache": len(forecast_cache),
+        "user_category_models": len(user_categories),
+    }
+    sizes["anomaly_stats"], sizes["flag_suggestions"] = anomaly_detector.sizes()
+    if _receipt_parser is not None:
+        sizes["classification_cache"] = len(_receipt_parser._category_cache)
+    return sizes
+
+REGISTRY.callback_gauge("brokemate_store_size", "Items held by each in-memory store.", store_sizes, "store")
+
+def ocr_engine():
+    """1 for the engine OCR runs on, once the receipt parser has started it."""
+    engine = _receipt_parser.ocr_engine if _receipt_parser is not None else None
+    return {engine: 1} if engine is not None else {}
+
+REGISTRY.callback_gauge("brokemate_ocr_engine", "OCR engine in use (tesserocr resident engines, or pytesseract per call).",
+                        ocr_engine, "engine")
+
+@app.get("/metrics", tags=["Health"])
+def metrics():
+    """Prometheus metrics: request latency per route, receipt stage timings, Replicate calls, caches and stores."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/livez", tags=["Health"])
+def liveness_check():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "alive"}
+
+@app.get("/readyz", tags=["Health"])
+def readiness_check():
+    """Readiness probe: 200 once receipt processing is warmed up and Replicate is reachable, 503 until then."""
+    replicate_health.refresh()
+    ready, checks = readiness.report()
+    return JSONResponse(
+        {"status": "ready" if ready else "not ready", "checks": checks},
+        status_code=200 if ready else 503,
+    )
+
 # --- This line allows you to run the file directly for testing ---
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
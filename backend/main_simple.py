@@ -7,10 +7,16 @@ from typing import List, Optional, Dict, Any
 from fastapi import FastAPI, HTTPException, status, Form, Request, File, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 
+from upload_guard import MAX_UPLOAD_BYTES, save_upload
+from user_categories import UserCategoryStore
+
+# Categories learned from users' edits, shared with the receipt parser
+user_categories = UserCategoryStore()
+
 # Import receipt parser
 try:
     from receipt_parser import ReceiptParser
-    receipt_parser = ReceiptParser()
+    receipt_parser = ReceiptParser(user_categories=user_categories)
     RECEIPT_PARSING_ENABLED = True
 except ImportError as e:
     print(f"Receipt parsing disabled: {e}")
@@ -314,6 +320,9 @@ def edit_expense(
     
     for exp in user_db:
         if exp["id"] == expense_id:
+            if category != exp["category"]:
+                # Category corrections teach the receipt parser this user's categories
+                user_categories.learn_description(username, description, category)
             exp.update({
                 "amount": amount,
                 "category": category,
@@ -398,15 +407,12 @@ async def process_receipt(
         raise HTTPException(status_code=400, detail="Please upload a valid image file")
     
     try:
-        # Read the uploaded file
-        image_data = await file.read()
-        
-        # Save to temporary file
-        temp_path = receipt_parser.save_temp_image(image_data)
+        # Stream the upload to a temporary file, capped at MAX_UPLOAD_MB
+        temp_path = await save_upload(file, max_bytes=MAX_UPLOAD_BYTES)
         
         try:
             # Process the receipt
-            expenses = receipt_parser.process_receipt(temp_path, description)
+            expenses = receipt_parser.process_receipt(temp_path, description, username)
             
             # Add expenses to user's database
             user_db = user_expenses.setdefault(username, [])
@@ -436,6 +442,8 @@ async def process_receipt(
             # Clean up temporary file
             receipt_parser.cleanup_temp_file(temp_path)
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing receipt: {str(e)}")
 
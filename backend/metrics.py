@@ -0,0 +1,361 @@
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# In-process metrics served by GET /metrics in the Prometheus text format.
+#
+# Every metric keeps one value array per thread that touches it. A thread only
+# ever writes its own array, so updates take no lock; a scrape sums the arrays.
+# When a thread exits (idle worker threads are retired), its array is folded
+# into a base total, so the number of arrays tracks live threads only.
+# Labelled children are created once and cached, and callers on hot paths hold
+# on to them, so recording a value doesn't build label tuples or strings.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Request methods labelled as they are; anything else a client sends is "other"
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+
+class _ThreadShard:
+    """Held only by the owning thread's local storage: collected when the thread exits."""
+
+    __slots__ = ("values", "__weakref__")
+
+    def __init__(self, values: List[float]):
+        self.values = values
+
+
+class _Sharded:
+    """Per-thread value arrays, summed on read; a dead thread's array is folded into a base total."""
+
+    def __init__(self, width: int):
+        self._width = width
+        self._local = threading.local()
+        # id(array) -> array, for live threads
+        self._shards: Dict[int, List[float]] = {}
+        self._base = [0.0] * width
+        self._lock = threading.Lock()  # only taken when a thread first writes or exits
+
+    def shard(self) -> List[float]:
+        try:
+            return self._local.shard.values
+        except AttributeError:
+            values = [0.0] * self._width
+            shard = _ThreadShard(values)
+            with self._lock:
+                self._shards[id(values)] = values
+            weakref.finalize(shard, self._retire, values)
+            self._local.shard = shard
+            return values
+
+    def _retire(self, values: List[float]):
+        with self._lock:
+            self._shards.pop(id(values), None)
+            self._base = [total + value for total, value in zip(self._base, values)]
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            shards = [self._base, *self._shards.values()]
+        return [sum(column) for column in zip(*shards)]
+
+    def shard_count(self) -> int:
+        with self._lock:
+            return len(self._shards)
+
+
+class CounterChild(_Sharded):
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount: float = 1.0):
+        self.shard()[0] += amount
+
+    def value(self) -> float:
+        return self.totals()[0]
+
+
+class GaugeChild(CounterChild):
+    """Up/down gauge. Shards may be incremented and decremented on different threads; the sum is still right."""
+
+    def dec(self, amount: float = 1.0):
+        self.shard()[0] -= amount
+
+
+class HistogramChild(_Sharded):
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        # One slot per bucket, one for +Inf, then the running sum
+        super().__init__(len(self.buckets) + 2)
+
+    def observe(self, value: float):
+        shard = self.shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+
+class Metric:
+    """A metric family: name, help, type and its labelled children."""
+
+    def __init__(self, name: str, documentation: str, kind: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets
+        self._children: Dict[Tuple[str, ...], _Sharded] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        if self.kind == "histogram":
+            return HistogramChild(self.buckets)
+        if self.kind == "gauge":
+            return GaugeChild()
+        return CounterChild()
+
+    def labels(self, *values: str):
+        """The child for these label values, created on first use. Keep it to record without a lookup."""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    # Shortcuts for unlabelled metrics
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default.dec(amount)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def _label_text(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self._children.items()):
+            totals = child.totals()
+            if self.kind != "histogram":
+                lines.append(f"{self.name}{self._label_text(values)} {_number(totals[0])}")
+                continue
+            cumulative = 0.0
+            for bound, count in zip(child.buckets + (float("inf"),), totals):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{self._label_text(values, le)} {_number(cumulative)}")
+            lines.append(f"{self.name}_sum{self._label_text(values)} {_number(totals[-1])}")
+            lines.append(f"{self.name}_count{self._label_text(values)} {_number(cumulative)}")
+        return lines
+
+
+class CallbackGauge:
+    """Gauge read at scrape time from a callback returning a number or {label value: number}."""
+
+    def __init__(self, name: str, documentation: str, callback: Callable, labelname: str = ""):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.labelname = labelname
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        try:
+            value = self.callback()
+        except Exception:
+            return lines
+        if isinstance(value, dict):
+            for label, number in value.items():
+                lines.append(f'{self.name}{{{self.labelname}="{_escape(str(label))}"}} {_number(number)}')
+        else:
+            lines.append(f"{self.name} {_number(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Metric:
+        return self.register(Metric(name, documentation, "counter", labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Metric:
+        return self.register(Metric(name, documentation, "gauge", labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS) -> Metric:
+        return self.register(Metric(name, documentation, "histogram", labelnames, buckets))
+
+    def callback_gauge(self, name: str, documentation: str, callback: Callable, labelname: str = "") -> CallbackGauge:
+        return self.register(CallbackGauge(name, documentation, callback, labelname))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+REGISTRY = Registry()
+
+# --- Application metrics ---
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "brokemate_http_request_duration_seconds", "HTTP request latency by route template.", ["route", "method"]
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    "brokemate_http_requests_total", "HTTP requests by route template and status code.", ["route", "method", "status"]
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "brokemate_http_requests_in_flight", "HTTP requests currently being served, by route template.", ["route"]
+)
+RECEIPT_STAGE_SECONDS = REGISTRY.histogram(
+    "brokemate_receipt_stage_duration_seconds", "Receipt processing time per stage (ocr, parse, classify).", ["stage"]
+)
+REPLICATE_SECONDS = REGISTRY.histogram(
+    "brokemate_replicate_request_duration_seconds", "Replicate model call latency, including failed calls.",
+    buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0),
+)
+REPLICATE_ERRORS = REGISTRY.counter("brokemate_replicate_errors_total", "Replicate model calls that raised an error.")
+CACHE_REQUESTS = REGISTRY.counter(
+    "brokemate_cache_requests_total", "Cache lookups by cache and result (hit or miss).", ["cache", "result"]
+)
+RATE_LIMITED = REGISTRY.counter(
+    "brokemate_rate_limited_total", "Requests refused with 429 by rate limit group.", ["group"]
+)
+
+
+def _cache_hit_ratios() -> Dict[str, float]:
+    counts: Dict[str, List[float]] = {}
+    for (cache, result), child in list(CACHE_REQUESTS._children.items()):
+        counts.setdefault(cache, [0.0, 0.0])[0 if result == "hit" else 1] += child.value()
+    return {cache: hits / (hits + misses) for cache, (hits, misses) in counts.items() if hits + misses}
+
+
+REGISTRY.callback_gauge("brokemate_cache_hit_ratio", "Lifetime hit ratio per cache.", _cache_hit_ratios, "cache")
+
+
+class CacheCounter:
+    """Hit and miss children for one cache, resolved up front."""
+
+    def __init__(self, cache: str):
+        self.hits = CACHE_REQUESTS.labels(cache, "hit")
+        self.misses = CACHE_REQUESTS.labels(cache, "miss")
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route latency, status counts and in-flight requests.
+
+    Routes are labelled by their template (/edit-expense/{expense_id}), found by
+    matching the app's routes once per static path; unmatched paths share one
+    label so the series count stays bounded.
+    """
+
+    UNMATCHED = "<unmatched>"
+
+    def __init__(self, app, routes):
+        self.app = app
+        self.routes = routes
+        self._static: Dict[str, "_RouteMetrics"] = {}
+        self._by_template: Dict[str, "_RouteMetrics"] = {}
+
+    def _route_metrics(self, scope) -> "_RouteMetrics":
+        path = scope["path"]
+        metrics = self._static.get(path)
+        if metrics is not None:
+            return metrics
+        from starlette.routing import Match
+
+        # Same precedence as the router: first full match, else first method-only mismatch
+        matched = None
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                matched = route
+                break
+            if match == Match.PARTIAL and matched is None:
+                matched = route
+        template = getattr(matched, "path", self.UNMATCHED)
+        static = not getattr(matched, "param_convertors", None)
+        metrics = self._by_template.get(template)
+        if metrics is None:
+            metrics = self._by_template.setdefault(template, _RouteMetrics(template))
+        if static and template != self.UNMATCHED:
+            self._static[path] = metrics
+        return metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = self._route_metrics(scope)
+        method = scope["method"]
+        status_code = 500
+        route.in_flight.inc()
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route.in_flight.dec()
+            route.record(method, status_code, time.perf_counter() - start)
+
+
+class _RouteMetrics:
+    """Children for one route template, cached by method and status."""
+
+    def __init__(self, template: str):
+        self.template = template
+        self.in_flight = HTTP_IN_FLIGHT.labels(template)
+        self._latency: Dict[str, HistogramChild] = {}
+        self._requests: Dict[str, Dict[int, CounterChild]] = {}
+
+    def record(self, method: str, status_code: int, seconds: float):
+        if method not in HTTP_METHODS:
+            method = "other"  # the label comes from the client; keep the series count bounded
+        latency = self._latency.get(method)
+        if latency is None:
+            latency = self._latency.setdefault(method, HTTP_REQUEST_SECONDS.labels(self.template, method))
+        by_status = self._requests.get(method)
+        if by_status is None:
+            by_status = self._requests.setdefault(method, {})
+        counter = by_status.get(status_code)
+        if counter is None:
+            counter = by_status.setdefault(status_code, HTTP_REQUESTS.labels(self.template, method, status_code))
+        latency.observe(seconds)
+        counter.inc()
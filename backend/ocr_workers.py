@@ -0,0 +1,236 @@
+import logging
+import math
+import multiprocessing
+import os
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+
+from PIL import Image, ImageDraw
+import pytesseract
+
+logger = logging.getLogger(__name__)
+
+# Largest image decoded for OCR. Oversized JPEGs are decoded at reduced scale
+# (down to 1/8 per side), so PIL's own decompression bomb check only needs to
+# catch what even that can't bring under the limit.
+MAX_IMAGE_PIXELS = int(os.environ.get('MAX_IMAGE_PIXELS', str(40_000_000)))
+JPEG_DRAFT_SCALES = (2, 4, 8)
+
+_bomb_limit_lock = threading.Lock()
+
+# Tesseract page segmentation modes tried for every image; the longest text wins
+OCR_PAGE_SEG_MODES = [
+    6,  # Assume a single uniform block of text
+    4,  # Assume a single column of text
+    3,  # Fully automatic page segmentation
+]
+
+
+class ImageTooLarge(ValueError):
+    """The image would decode to more pixels than MAX_IMAGE_PIXELS."""
+
+
+@contextmanager
+def _bomb_limit(max_pixels: int):
+    """Raise PIL's decompression bomb limit for one Image.open, restoring it after."""
+    with _bomb_limit_lock:
+        previous = Image.MAX_IMAGE_PIXELS
+        # PIL raises past twice its limit, so this refuses only what 1/8 scale can't fit
+        Image.MAX_IMAGE_PIXELS = max_pixels * JPEG_DRAFT_SCALES[-1] ** 2 // 2
+        try:
+            yield
+        finally:
+            Image.MAX_IMAGE_PIXELS = previous
+
+
+def open_receipt_image(image_path: str, max_pixels: int = MAX_IMAGE_PIXELS) -> Image.Image:
+    """Open an image for OCR without committing to decode more than max_pixels.
+
+    Only the header has been read when this returns. Oversized JPEGs are set
+    up for reduced decoding with Image.draft (the DCT decoder scales by 1/2,
+    1/4 or 1/8, straight to grayscale); any other oversized image is rejected
+    before it is decoded.
+    """
+    try:
+        with _bomb_limit(max_pixels):
+            image = Image.open(image_path)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e))
+
+    width, height = image.size
+    if width * height > max_pixels:
+        if image.format == "JPEG":
+            # The decoder rounds each side up, so pick the scale from the rounded size
+            scale = next((s for s in JPEG_DRAFT_SCALES
+                          if math.ceil(width / s) * math.ceil(height / s) <= max_pixels), JPEG_DRAFT_SCALES[-1])
+            # draft() reduces by min(width // w, height // h): floor keeps that at `scale`
+            image.draft("L", (width // scale, height // scale))
+        if image.size[0] * image.size[1] > max_pixels:
+            image.close()
+            raise ImageTooLarge(f"Image is {width}x{height} pixels; the limit is {max_pixels:,} pixels")
+    return image
+
+
+def render_receipt_image(lines: List[str], image_path: str):
+    """Draw text lines onto a white receipt-shaped image (used to warm up the OCR pipeline)."""
+    image = Image.new("L", (900, 40 + 34 * len(lines)), color=255)
+    draw = ImageDraw.Draw(image)
+    for index, line in enumerate(lines):
+        draw.text((30, 20 + 34 * index), line, fill=0)
+    image.resize((image.width * 2, image.height * 2)).save(image_path)
+
+
+def ocr_image_file(image_path: str, lang: str = "eng") -> str:
+    """OCR one image file with pytesseract (one tesseract process per mode)."""
+    image = open_receipt_image(image_path)
+    # Preprocess image for better OCR results
+    image = image.convert('L')  # Convert to grayscale
+
+    raw_text = ""
+    for psm in OCR_PAGE_SEG_MODES:
+        try:
+            text = pytesseract.image_to_string(image, lang=lang, config=f'--psm {psm}')
+            if text and len(text.strip()) > len(raw_text):
+                raw_text = text
+        except:
+            continue
+    return raw_text
+
+
+# --- Worker process state ---
+# Each worker loads the Tesseract engine (and its language model) once, through
+# the tesserocr C API binding, and reuses it for every image it is given.
+ENGINE_TESSEROCR = "tesserocr"
+# Fallback when tesserocr or its language data is missing: a tesseract process per call
+ENGINE_PYTESSERACT = "pytesseract"
+
+# Language data for the resident engines: TESSDATA_PREFIX, else the usual tesseract-ocr install locations
+TESSDATA_DIRS = [
+    "/usr/share/tesseract-ocr/5/tessdata",
+    "/usr/share/tesseract-ocr/4.00/tessdata",
+    "/usr/share/tessdata",
+    "/usr/local/share/tessdata",
+    "/opt/homebrew/share/tessdata",
+]
+
+_engine = None
+_engine_lang = "eng"
+
+
+def tessdata_path() -> Optional[str]:
+    prefix = os.environ.get("TESSDATA_PREFIX")
+    if prefix:
+        return prefix
+    return next((path for path in TESSDATA_DIRS if os.path.isdir(path)), None)
+
+
+def _init_worker(lang: str):
+    global _engine, _engine_lang
+    _engine_lang = lang
+    try:
+        from tesserocr import PyTessBaseAPI
+        path = tessdata_path()
+        _engine = PyTessBaseAPI(path=path, lang=lang) if path else PyTessBaseAPI(lang=lang)
+    except (ImportError, RuntimeError) as e:
+        _engine = None
+        logger.warning("OCR worker %d has no resident Tesseract engine (%s); using pytesseract per call", os.getpid(), e)
+
+
+def _ping():
+    """(pid, engine) of the worker that ran it."""
+    return os.getpid(), ENGINE_TESSEROCR if _engine is not None else ENGINE_PYTESSERACT
+
+
+def ocr_in_worker(image_path: str) -> str:
+    """OCR one image file using this worker's resident engine."""
+    if _engine is None:
+        return ocr_image_file(image_path, _engine_lang)
+
+    image = open_receipt_image(image_path).convert('L')
+    raw_text = ""
+    try:
+        for psm in OCR_PAGE_SEG_MODES:
+            try:
+                _engine.SetPageSegMode(psm)
+                _engine.SetImage(image)
+                text = _engine.GetUTF8Text()
+            except Exception:
+                continue
+            if text and len(text.strip()) > len(raw_text):
+                raw_text = text
+    finally:
+        _engine.Clear()
+    return raw_text
+
+
+class OCRWorkerPool:
+    """Long-lived OCR worker processes fed through the executor's task queue.
+
+    Workers start once (spawn context, since the server process runs
+    threads), load the Tesseract engine in their initializer and then serve
+    every OCR request, so no request pays process startup or model loading.
+    A crashed worker breaks the executor; it is rebuilt and the call retried once.
+    """
+
+    def __init__(self, workers: int, lang: str = "eng"):
+        self.workers = max(1, workers)
+        self.lang = lang
+        # Engine the workers run (ENGINE_*), known once they have started
+        self.engine: Optional[str] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker,
+                        initargs=(self.lang,),
+                    )
+        return self._executor
+
+    def _reset(self, broken: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def start(self) -> List[int]:
+        """Start every worker now (and load its engine) instead of on first use. Returns worker pids."""
+        executor = self._get_executor()
+        replies = [future.result() for future in [executor.submit(_ping) for _ in range(self.workers * 2)]]
+        engines = {engine for _, engine in replies}
+        engine = ENGINE_TESSEROCR if engines == {ENGINE_TESSEROCR} else ENGINE_PYTESSERACT
+        if engine != self.engine and engine == ENGINE_PYTESSERACT:
+            logger.warning("OCR workers are running pytesseract per call: install tesserocr and Tesseract "
+                           "language data (or set TESSDATA_PREFIX) for resident engines")
+        self.engine = engine
+        return sorted({pid for pid, _ in replies})
+
+    def ocr_many(self, image_paths: List[str]) -> List[str]:
+        """OCR several images in parallel, keeping their order."""
+        if self.engine is None:
+            self.start()
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                return list(executor.map(ocr_in_worker, image_paths))
+            except BrokenProcessPool:
+                self._reset(executor)
+                if attempt:
+                    raise
+
+    def ocr(self, image_path: str) -> str:
+        return self.ocr_many([image_path])[0]
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
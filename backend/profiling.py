@@ -0,0 +1,190 @@
+import asyncio
+import cProfile
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+# Opt-in per-request profiling. A request is profiled when it carries
+# `X-Profile: <PROFILE_SECRET>` or is picked by PROFILE_SAMPLE_RATE. Its spans
+# (auth, store, summary, llm, ocr, ...) are timed and run under cProfile on
+# whichever thread executes them; the result is written to PROFILE_DIR as
+# <id>.json (spans) and <id>.prof (pstats, open with `python -m pstats` or
+# snakeviz). When a request isn't profiled a span costs one ContextVar lookup.
+
+PROFILE_SECRET = os.environ.get("PROFILE_SECRET", "")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "brokemate-profiles"))
+PROFILE_HEADER = b"x-profile"
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+# cProfile can only be active for one profiler at a time (on 3.12+ it claims
+# the interpreter-wide sys.monitoring slot), so concurrent profiled spans on
+# other threads are timed without a CPU profile
+_cpu_profiler_lock = threading.Lock()
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.method = method
+        self.path = path
+        self.status_code: Optional[int] = None
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.spans: List[Dict] = []
+        self.profiler = cProfile.Profile()
+        self.cpu_profiled = False
+
+    def write(self, directory: str = PROFILE_DIR) -> str:
+        """Write <id>.json and, if any span ran under cProfile, <id>.prof. Returns the json path."""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{self.id}-{re.sub(r'[^A-Za-z0-9]+', '_', self.path).strip('_') or 'root'}")
+        if self.cpu_profiled:
+            self.profiler.dump_stats(base + ".prof")
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump({
+                "id": self.id,
+                "method": self.method,
+                "path": self.path,
+                "status": self.status_code,
+                "duration_ms": round(self.duration * 1000, 3),
+                "spans": sorted(self.spans, key=lambda s: s["start_ms"]),
+                "cpu_profile": base + ".prof" if self.cpu_profiled else None,
+            }, f, indent=2)
+        return base + ".json"
+
+
+class Span:
+    __slots__ = ("name", "profile", "start", "profiling_cpu")
+
+    def __init__(self, name: str, profile: RequestProfile):
+        self.name = name
+        self.profile = profile
+        self.profiling_cpu = False
+
+    def __enter__(self):
+        self.profiling_cpu = _cpu_profiler_lock.acquire(blocking=False)
+        if self.profiling_cpu:
+            try:
+                self.profile.profiler.enable()
+                self.profile.cpu_profiled = True
+            except ValueError:  # another profiler owns the interpreter
+                _cpu_profiler_lock.release()
+                self.profiling_cpu = False
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        if self.profiling_cpu:
+            self.profile.profiler.disable()
+            _cpu_profiler_lock.release()
+        self.profile.spans.append({
+            "name": self.name,
+            "thread": threading.current_thread().name,
+            "start_ms": round((self.start - self.profile.start) * 1000, 3),
+            "duration_ms": round((end - self.start) * 1000, 3),
+            "cpu_profiled": self.profiling_cpu,
+        })
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str):
+    """`with span("store"): ...` — a timed, CPU-profiled span when the current request is being profiled.
+
+    A span nested in another on the same thread is timed only; the outer one's CPU profile covers it.
+    """
+    profile = _current.get()
+    if profile is None:
+        return _NO_SPAN
+    return Span(name, profile)
+
+
+def traced(name: str):
+    """Decorator form of span() for sync and async functions (including FastAPI endpoints and dependencies)."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware that turns on profiling for selected requests.
+
+    Selected by the X-Profile header (must equal PROFILE_SECRET; ignored when
+    that is unset) or at random with probability PROFILE_SAMPLE_RATE. Profiled
+    responses carry an X-Profile-Id header naming the files written.
+    """
+
+    def __init__(self, app, secret: str = PROFILE_SECRET, sample_rate: float = PROFILE_SAMPLE_RATE, directory: str = PROFILE_DIR):
+        self.app = app
+        self.secret = secret.encode()
+        self.sample_rate = sample_rate
+        self.directory = directory
+
+    def _selected(self, scope) -> bool:
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        if self.secret:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    return value == self.secret
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (self.sample_rate or self.secret) or not self._selected(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        token = _current.set(profile)
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            _current.reset(token)
+            profile.duration = time.perf_counter() - profile.start
+            try:
+                path = await asyncio.get_running_loop().run_in_executor(None, profile.write, self.directory)
+                logger.info("Request profile written to %s", path, extra={"profile_id": profile.id})
+            except Exception as e:
+                logger.warning("Could not write request profile %s: %s", profile.id, e)
@@ -0,0 +1,108 @@
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Tuple
+
+from fastapi import HTTPException
+
+from metrics import RATE_LIMITED
+
+# Per-client token buckets, one per client and rate limit group. Each request
+# takes tokens in proportion to the work behind it, so a client firing OCR
+# or LLM requests runs dry long before one reading its expense list does, and
+# one client's flood never spends another's budget. Over the limit the
+# request is refused with 429 and Retry-After instead of queueing for workers.
+
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BURST = float(os.environ.get("RATE_LIMIT_BURST", "120"))
+RATE_LIMIT_PER_SECOND = float(os.environ.get("RATE_LIMIT_PER_SECOND", "2"))
+# Buckets kept before idle (full) ones are dropped
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", "100000"))
+
+# Groups, each with its own bucket per client: reads and edits of the
+# expense list, Replicate calls, OCR, and password checks (bcrypt) by IP
+GROUP_API = "api"
+GROUP_LLM = "llm"
+GROUP_OCR = "ocr"
+GROUP_AUTH = "auth"
+
+# Tokens per request. With the defaults a client can sustain 120 reads, 12
+# AI calls or 6 receipt pages a minute, after a burst of 120/12/6.
+COST_READ = 1
+COST_WRITE = 2
+COST_LLM = 10
+COST_OCR_PAGE = 20
+COST_AUTH = 10
+
+
+class RateLimited(HTTPException):
+    def __init__(self, retry_after: float):
+        seconds = max(1, math.ceil(retry_after))
+        super().__init__(
+            status_code=429,
+            detail=f"Too many requests, retry in {seconds}s",
+            headers={"Retry-After": str(seconds)},
+        )
+
+
+class RateLimiter:
+    """Token buckets keyed by (client, group), holding up to `burst` tokens and refilling at `rate` per second.
+
+    A request costing more than `burst` is charged `burst`, so it can still
+    pass once the bucket is full.
+    """
+
+    def __init__(self, burst: float = RATE_LIMIT_BURST, rate: float = RATE_LIMIT_PER_SECOND,
+                 max_keys: int = RATE_LIMIT_MAX_KEYS, enabled: bool = RATE_LIMIT_ENABLED,
+                 clock: Callable[[], float] = time.monotonic):
+        self.burst = burst
+        self.rate = rate
+        self.max_keys = max_keys
+        self.enabled = enabled
+        self.clock = clock
+        # (client, group) -> [tokens, time of last update]
+        self._buckets: Dict[Tuple[Hashable, str], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, client: Hashable, group: str, cost: float) -> float:
+        """Take `cost` tokens. Returns 0 if admitted, else the seconds until enough tokens are back."""
+        if not self.enabled:
+            return 0.0
+        cost = min(cost, self.burst)
+        key = (client, group)
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._evict(now)
+                bucket = self._buckets[key] = [self.burst, now]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return 0.0
+            return (cost - bucket[0]) / self.rate
+
+    def check(self, client: Hashable, group: str, cost: float):
+        """Take `cost` tokens or raise RateLimited (429 with Retry-After)."""
+        retry_after = self.acquire(client, group, cost)
+        if retry_after:
+            RATE_LIMITED.labels(group).inc()
+            raise RateLimited(retry_after)
+
+    def _evict(self, now: float):
+        # A bucket that has refilled is the same as no bucket: drop those first,
+        # then the least recently used, down to 90% of max_keys
+        full_after = self.burst / self.rate
+        for key in [key for key, (_, updated) in self._buckets.items() if now - updated >= full_after]:
+            del self._buckets[key]
+        excess = len(self._buckets) - int(self.max_keys * 0.9)
+        if excess > 0:
+            for key in sorted(self._buckets, key=lambda key: self._buckets[key][1])[:excess]:
+                del self._buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Tuple
+
+# Readiness state behind /readyz: each check is a component the pod needs
+# before it should take traffic (warmed-up OCR stack, loaded classifier,
+# reachable Replicate), updated by the warmup task and by real calls.
+
+READINESS_CHECKS = [
+    name.strip() for name in os.environ.get("READINESS_CHECKS", "ocr,classifier,replicate").split(",") if name.strip()
+]
+REPLICATE_HEALTH_TTL = float(os.environ.get("REPLICATE_HEALTH_TTL", "60"))
+
+
+class Readiness:
+    """Per-component ready flags. Only the `required` components gate readiness; the rest are reported."""
+
+    def __init__(self, required: Iterable[str] = READINESS_CHECKS):
+        self.required = list(required)
+        self._checks: Dict[str, Tuple[bool, str, float]] = {
+            name: (False, "not checked yet", time.time()) for name in self.required
+        }
+
+    def set(self, name: str, ready: bool, detail: str = ""):
+        # One tuple assignment, so readers never see a half-updated check
+        self._checks[name] = (ready, detail, time.time())
+
+    def is_ready(self, name: str) -> bool:
+        return self._checks.get(name, (False,))[0]
+
+    def report(self) -> Tuple[bool, Dict[str, dict]]:
+        """(ready, checks): ready only when every required check is."""
+        checks = {
+            name: {"ready": ready, "detail": detail, "updated": round(updated, 3)}
+            for name, (ready, detail, updated) in list(self._checks.items())
+        }
+        return all(self.is_ready(name) for name in self.required), checks
+
+
+class ReplicateHealth:
+    """Replicate reachability from real calls, refreshed by a probe when it goes stale.
+
+    Every call_replicate_model outcome is recorded. When nothing has been
+    observed for `ttl` seconds, `refresh` starts one background probe; it
+    never blocks the caller, so /readyz stays fast while Replicate is slow.
+    """
+
+    def __init__(self, readiness: Readiness, probe: Callable[[], None], ttl: float = REPLICATE_HEALTH_TTL, name: str = "replicate"):
+        self.readiness = readiness
+        self.probe = probe
+        self.ttl = ttl
+        self.name = name
+        self.last_observed = 0.0
+        self._probing = threading.Lock()
+
+    def record(self, ok: bool, detail: str = ""):
+        self.last_observed = time.monotonic()
+        self.readiness.set(self.name, ok, detail or ("reachable" if ok else "unreachable"))
+
+    def refresh(self):
+        """Probe in the background if the last observation is older than ttl (or there is none)."""
+        if time.monotonic() - self.last_observed < self.ttl or not self._probing.acquire(blocking=False):
+            return
+        threading.Thread(target=self._run_probe, name="replicate-probe", daemon=True).start()
+
+    def _run_probe(self):
+        try:
+            self.probe()
+            self.record(True, "probe succeeded")
+        except Exception as e:
+            self.record(False, f"probe failed: {e}")
+        finally:
+            self._probing.release()
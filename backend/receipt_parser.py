@@ -1,28 +1,157 @@
+import logging
+import math
 import re
 import os
+import queue
+import subprocess
 import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
 from datetime import date
-from typing import List, Dict, Optional
-from PIL import Image
-import pytesseract
-from transformers import pipeline
+from typing import Callable, List, Dict, Optional, Tuple
+from category_lexicon import CategoryLexicon
+from classifier_backends import DEFAULT_BACKEND, load_classifier
+from metrics import RECEIPT_STAGE_SECONDS, CacheCounter
+from profiling import span
+from structured_logging import OCR_TEXT_LOG_SAMPLE_RATE, sampled
+from ocr_workers import ENGINE_PYTESSERACT, MAX_IMAGE_PIXELS, OCRWorkerPool, ocr_image_file, render_receipt_image
+from user_categories import UserCategoryStore, item_key
+
+logger = logging.getLogger(__name__)
+
+# Stage timers and cache counters, resolved once
+OCR_SECONDS = RECEIPT_STAGE_SECONDS.labels("ocr")
+PARSE_SECONDS = RECEIPT_STAGE_SECONDS.labels("parse")
+CLASSIFY_SECONDS = RECEIPT_STAGE_SECONDS.labels("classify")
+CLASSIFICATION_CACHE = CacheCounter("classification")
+USER_CATEGORY_LOOKUPS = CacheCounter("user_categories")
+
+# Synthetic receipt run through the pipeline by ReceiptParser.warmup
+WARMUP_RECEIPT_LINES = [
+    "WARMUP MART",
+    "Milk 1L          45.00",
+    "Bread            30.00",
+    "Paracetamol      25.00",
+    "TOTAL           100.00",
+]
+
+
+# "Page    2 size: 612 x 792 pts (letter)" in `pdfinfo -f 1 -l N` output
+PDF_PAGE_SIZE_PATTERN = re.compile(r"^Page\s+(\d+) size:\s+([\d.]+) x ([\d.]+) pts", re.MULTILINE)
+
+
+def pdf_page_sizes(path: str, page_count: int) -> List[Tuple[float, float]]:
+    """Size in points of every page of a PDF, from poppler's pdfinfo."""
+    output = subprocess.run(
+        ["pdfinfo", "-f", "1", "-l", str(page_count), path], capture_output=True, text=True, check=True,
+    ).stdout
+    sizes = {int(page): (float(width), float(height)) for page, width, height in PDF_PAGE_SIZE_PATTERN.findall(output)}
+    if len(sizes) < page_count:
+        raise ValueError("Could not read the PDF's page sizes")
+    return [sizes[page] for page in range(1, page_count + 1)]
+
+
+def page_dpi(width_pt: float, height_pt: float, dpi: int, max_pixels: int = MAX_IMAGE_PIXELS) -> int:
+    """The highest resolution up to `dpi` that keeps a page within max_pixels (pages are rounded up to whole pixels)."""
+    if width_pt <= 0 or height_pt <= 0:
+        raise ValueError("PDF page has no area")
+
+    def pixels(resolution: int) -> int:
+        return math.ceil(width_pt * resolution / 72) * math.ceil(height_pt * resolution / 72)
+
+    resolution = max(1, min(dpi, int(72 * (max_pixels / (width_pt * height_pt)) ** 0.5)))
+    while resolution > 1 and pixels(resolution) > max_pixels:
+        resolution -= 1
+    if pixels(resolution) > max_pixels:
+        raise ValueError(f"PDF page is {width_pt:.0f}x{height_pt:.0f} pt, too large to rasterize within {max_pixels:,} pixels")
+    return resolution
+
+
+class ClassificationBatcher:
+    """Coalesces classification requests into batched pipeline calls.
+
+    Callers (one per receipt being processed) submit their item names and
+    block on the result. A single worker thread drains whatever queued up
+    while the previous batch was running (waiting up to max_wait seconds for
+    more, up to max_batch_size names) and classifies all of it in one call,
+    so concurrent receipts share a forward pass.
+    """
+
+    def __init__(self, classify_batch: Callable[[List[str]], List[str]], max_batch_size: int = 64, max_wait: float = 0.0):
+        self.classify_batch = classify_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="classification-batcher", daemon=True)
+        self._worker.start()
+
+    def classify(self, names: List[str]) -> List[str]:
+        future = Future()
+        self._queue.put((names, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            pending = [self._queue.get()]
+            size = len(pending[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    if timeout > 0:
+                        request = self._queue.get(timeout=timeout)
+                    else:
+                        request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                pending.append(request)
+                size += len(request[0])
+
+            # Receipts queued together often share items; classify each name once
+            names = list(dict.fromkeys(name for request_names, _ in pending for name in request_names))
+            try:
+                labels = dict(zip(names, self.classify_batch(names)))
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+
+            for request_names, future in pending:
+                future.set_result([labels[name] for name in request_names])
+
 
 class ReceiptParser:
-    def __init__(self):
-        # Initialize the AI classifier for categorizing items (lightweight mode)
-        self.classifier = None
-        try:
-            # Only load AI model if explicitly requested (to avoid heavy startup)
-            import os
-            if os.environ.get('ENABLE_AI_CLASSIFICATION', 'false').lower() == 'true':
-                self.classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
-                print("AI classifier loaded successfully")
-            else:
-                print("Using lightweight mode - AI classifier disabled (set ENABLE_AI_CLASSIFICATION=true to enable)")
-        except Exception as e:
-            print(f"Warning: AI classifier not available: {e}")
-            self.classifier = None
-        
+    def __init__(self, classifier_backend: Optional[str] = None, user_categories: Optional[UserCategoryStore] = None):
+        # The AI classifier is loaded lazily on first use (or by warmup),
+        # so constructing the parser never pays the model loading cost.
+        # CLASSIFIER_BACKEND picks the inference backend (see classifier_backends.py).
+        self.ai_enabled = os.environ.get('ENABLE_AI_CLASSIFICATION', 'false').lower() == 'true'
+        self.classifier_backend = classifier_backend or os.environ.get('CLASSIFIER_BACKEND', DEFAULT_BACKEND)
+        self._classifier = None
+        self._classifier_error: Optional[Exception] = None
+        self._classifier_lock = threading.Lock()
+        self._batcher: Optional[ClassificationBatcher] = None
+        if not self.ai_enabled:
+            logger.info("Using lightweight mode - AI classifier disabled (set ENABLE_AI_CLASSIFICATION=true to enable)")
+
+        # LRU cache from normalized item name to category, so common items
+        # ("milk", "bread") only reach the model once
+        self.cache_size = int(os.environ.get('CLASSIFICATION_CACHE_SIZE', '4096'))
+        self._category_cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        # Per-user categories learned from edits, consulted before anything else.
+        # Pass the app's store so edits can teach it without loading the parser.
+        self.user_categories = user_categories if user_categories is not None else UserCategoryStore()
+
+        # Resident OCR worker processes, each loading the Tesseract engine once.
+        # OCR_WORKERS=0 runs OCR in-process with a tesseract subprocess per call.
+        self.ocr_lang = os.environ.get('OCR_LANG', 'eng')
+        self.ocr_workers = int(os.environ.get('OCR_WORKERS', str(os.cpu_count() or 1)))
+        self.ocr_pool = OCRWorkerPool(self.ocr_workers, self.ocr_lang) if self.ocr_workers > 0 else None
+
         # Map receipt categories to our expense categories
         self.category_mapping = {
             "Groceries": "Food",
@@ -56,188 +185,319 @@ class ReceiptParser:
             "Movies", "Games", "Utilities", "Bills", "Other"
         ]
 
+        # Line parser, compiled once. A single pattern covers every supported
+        # price format: "Milk 45.00", "Milk: 45,00", "Coffee $3.50",
+        # "Tea ₹ 20.00" and "Bread Rs. 40.00". The currency marker is consumed
+        # so it never ends up in the item name.
+        self.item_line_pattern = re.compile(
+            r"(?P<name>.*?)[\s:]+(?:(?:Rs\.?|₹|\$)\s*)?(?P<units>\d+)[.,](?P<cents>\d{2})"
+        )
+        # Common non-item words (totals, tax lines, footers)
+        skip_words = ['total', 'subtotal', 'tax', 'amount', 'paid', 'change', 'balance', 'receipt', 'thank you']
+        self.skip_words_pattern = re.compile("|".join(re.escape(word) for word in skip_words))
+        self.amount_pattern = re.compile(r"\d+[.,]\d{2}")
+
+        # Keyword lexicon for rule-based classification (CATEGORY_LEXICON_PATH overrides the bundled file)
+        self.category_lexicon = CategoryLexicon.from_file(os.environ.get('CATEGORY_LEXICON_PATH'))
+
     def extract_text_from_image(self, image_path: str) -> str:
         """Extract text from receipt image using OCR."""
         try:
-            image = Image.open(image_path)
-            # Preprocess image for better OCR results
-            image = image.convert('L')  # Convert to grayscale
-            
-            # Try multiple OCR configurations for better results
-            configs = [
-                '--psm 6',  # Assume a single uniform block of text
-                '--psm 4',  # Assume a single column of text
-                '--psm 3',  # Fully automatic page segmentation
-            ]
-            
-            raw_text = ""
-            for config in configs:
-                try:
-                    text = pytesseract.image_to_string(image, config=config)
-                    if text and len(text.strip()) > len(raw_text):
-                        raw_text = text
-                except:
-                    continue
-            
-            print(f"Extracted text:\n{raw_text}")  # Debug logging
+            start = time.perf_counter()
+            with span("ocr"):
+                if self.ocr_pool is not None:
+                    raw_text = self.ocr_pool.ocr(image_path)
+                else:
+                    raw_text = ocr_image_file(image_path, self.ocr_lang)
+            OCR_SECONDS.observe(time.perf_counter() - start)
+            # Full OCR text is large: only at DEBUG, or for a sampled fraction of receipts
+            if sampled(OCR_TEXT_LOG_SAMPLE_RATE):
+                logger.info("Sampled OCR text", extra={"ocr_text": raw_text, "sampled": True})
+            elif logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Extracted OCR text", extra={"ocr_text": raw_text})
             return raw_text
         except Exception as e:
             raise Exception(f"Error extracting text from image: {str(e)}")
 
+    @property
+    def ocr_engine(self) -> Optional[str]:
+        """Engine OCR runs on (see ocr_workers.ENGINE_*); None until the workers have started."""
+        return self.ocr_pool.engine if self.ocr_pool is not None else ENGINE_PYTESSERACT
+
+    def ocr_pages(self, image_paths: List[str]) -> List[str]:
+        """OCR several page images in parallel on the OCR workers, keeping page order."""
+        start = time.perf_counter()
+        with span("ocr"):
+            if self.ocr_pool is None:
+                page_texts = [ocr_image_file(path, self.ocr_lang) for path in image_paths]
+            else:
+                page_texts = self.ocr_pool.ocr_many(image_paths)
+        OCR_SECONDS.observe(time.perf_counter() - start)
+        return page_texts
+
+    def save_page_images(self, uploads: List[Tuple[str, str]], work_dir: str, max_pages: int, dpi: int = 300) -> List[str]:
+        """Turn uploaded files into page image files, in upload order.
+
+        uploads holds (content_type, path) pairs. Images are used as they
+        are; PDFs are rasterized locally into work_dir, page by page, each at
+        a resolution lowered if needed to keep that page within
+        MAX_IMAGE_PIXELS. Raises ValueError past max_pages pages, checked
+        before anything is rasterized, or for a page too large even at 1 dpi.
+        """
+        page_paths = []
+        for index, (content_type, path) in enumerate(uploads):
+            if content_type != "application/pdf":
+                page_paths.append(path)
+            else:
+                from pdf2image import convert_from_path, pdfinfo_from_path
+                info = pdfinfo_from_path(path)
+                if len(page_paths) + info["Pages"] > max_pages:
+                    raise ValueError(f"Too many pages; the limit is {max_pages}")
+                page_dpis = [page_dpi(width_pt, height_pt, dpi) for width_pt, height_pt in pdf_page_sizes(path, info["Pages"])]
+                for page, resolution in enumerate(page_dpis, start=1):
+                    page_paths.extend(convert_from_path(
+                        path, dpi=resolution, first_page=page, last_page=page, fmt="png", grayscale=True,
+                        output_folder=work_dir, output_file=f"upload{index:03d}", paths_only=True,
+                    ))
+            if len(page_paths) > max_pages:
+                raise ValueError(f"Too many pages; the limit is {max_pages}")
+        return page_paths
+
+    def merge_page_texts(self, page_texts: List[str]) -> str:
+        """Join page texts, re-attaching items that were split across a page break.
+
+        When a page ends with a line that has no price (an item name) and the
+        next page starts with a continuation line (a bare price, or text that
+        doesn't start with a letter, e.g. "500g 649.00"), the two lines are
+        joined if together they parse as an item.
+        """
+        pages = [text.strip("\n").split("\n") for text in page_texts]
+        for previous, page in zip(pages, pages[1:]):
+            tail_index = next((i for i in range(len(previous) - 1, -1, -1) if previous[i].strip()), None)
+            head_index = next((i for i, line in enumerate(page) if line.strip()), None)
+            if tail_index is None or head_index is None:
+                continue
+
+            tail, head = previous[tail_index].strip(), page[head_index].strip()
+            head_match = self.item_line_pattern.fullmatch(head)
+            is_continuation = head_match is None or not head_match.group("name").strip()[:1].isalpha()
+            if (is_continuation and self.item_line_pattern.fullmatch(tail) is None
+                    and self.item_line_pattern.fullmatch(f"{tail} {head}")):
+                previous[tail_index] = ""
+                page[head_index] = f"{tail} {head}"
+        return "\n".join("\n".join(page) for page in pages)
+
     def parse_items_from_text(self, text: str) -> List[Dict]:
         """Parse items and prices from OCR text."""
-        lines = text.split("\n")
         items = []
-        
-        for line in lines:
+        match_line = self.item_line_pattern.fullmatch
+        is_skipped = self.skip_words_pattern.search
+
+        for line in text.split("\n"):
             line = line.strip()
             if not line:
                 continue
-                
-            # Try different patterns to match items with prices
-            patterns = [
-                r"^(.*?)[\s:]+(\d+[.,]\d{2})$",  # Item name followed by price
-                r"^(.*?)[\s:]+\$?\s*(\d+[.,]\d{2})$",  # Item name followed by $price
-                r"^(.*?)[\s:]+₹?\s*(\d+[.,]\d{2})$",  # Item name followed by ₹price
-                r"^(.*?)[\s:]+Rs\.?\s*(\d+[.,]\d{2})$",  # Item name followed by Rs price
-                r"^(.*?)[\s]+(\d{1,6}\.\d{2})$",  # Simple decimal price
-                r"^(.*?)[\s]+(\d{1,6},\d{2})$",   # Comma decimal price
-                r"^(.*?)\s+(\d+)\.(\d{2})$",  # Separated decimal
-                r"^(.*?)\s+(\d+),(\d{2})$",   # Separated comma
-            ]
-            
-            for pattern in patterns:
-                match = re.match(pattern, line)
-                if match:
-                    name = match.group(1).strip()
-                    
-                    # Handle both 2-group and 3-group matches
-                    if len(match.groups()) == 3:
-                        price_str = f"{match.group(2)}.{match.group(3)}"
-                    else:
-                        price_str = match.group(2).strip()
-                    
-                    # Clean up the price string
-                    price_str = re.sub(r'[^\d.,]', '', price_str)  # Remove currency symbols
-                    price_str = price_str.replace(",", ".")  # Normalize decimal separator
-                    
-                    try:
-                        price = float(price_str)
-                        # More lenient validation
-                        if price > 0 and price < 1000000 and len(name) > 1:
-                            # Skip common non-item words
-                            skip_words = ['total', 'subtotal', 'tax', 'amount', 'paid', 'change', 'balance', 'receipt', 'thank you']
-                            if not any(skip_word in name.lower() for skip_word in skip_words):
-                                items.append({"item": name, "price": price})
-                                print(f"Found item: {name} - ₹{price}")  # Debug logging
-                                break
-                    except ValueError:
-                        continue
-        
+
+            match = match_line(line)
+            if not match:
+                continue
+
+            name = match.group("name").strip()
+            price = float(f"{match.group('units')}.{match.group('cents')}")
+            # More lenient validation, skipping common non-item words
+            if 0 < price < 1000000 and len(name) > 1 and not is_skipped(name.lower()):
+                items.append({"item": name, "price": price})
+
         # If still no items found, try to extract any numbers as amounts
         if not items:
-            print("No structured items found, trying to extract any amounts...")
-            amount_pattern = r'(\d+[.,]\d{2})'
-            amounts = re.findall(amount_pattern, text)
-            if amounts:
-                for idx, amount_str in enumerate(amounts[:5]):  # Limit to 5 items
-                    amount_str = amount_str.replace(",", ".")
-                    try:
-                        amount = float(amount_str)
-                        if 0 < amount < 100000:
-                            items.append({
-                                "item": f"Item {idx + 1}",
-                                "price": amount
-                            })
-                            print(f"Extracted amount: ₹{amount}")
-                    except ValueError:
-                        continue
-        
+            logger.debug("No structured items found, trying to extract any amounts")
+            amounts = self.amount_pattern.findall(text)
+            for idx, amount_str in enumerate(amounts[:5]):  # Limit to 5 items
+                amount = float(amount_str.replace(",", "."))
+                if 0 < amount < 100000:
+                    items.append({
+                        "item": f"Item {idx + 1}",
+                        "price": amount
+                    })
+                    logger.debug("Extracted amount: %s", amount)
+
         return items
 
-    def classify_item(self, item_name: str) -> str:
-        """Classify an item into a category using AI or rules."""
-        if self.classifier:
+    @property
+    def classifier(self):
+        """The zero-shot pipeline, loaded on first access. None if disabled or unavailable."""
+        if not self.ai_enabled or self._classifier_error is not None:
+            return None
+        if self._classifier is None:
+            with self._classifier_lock:
+                if self._classifier is None and self._classifier_error is None:
+                    try:
+                        self._classifier = load_classifier(self.classifier_backend)
+                        self._batcher = ClassificationBatcher(self._classify_batch_with_model)
+                        logger.info("AI classifier loaded successfully (%s backend)", self.classifier_backend)
+                    except Exception as e:
+                        logger.warning("AI classifier not available: %s", e)
+                        self._classifier_error = e
+        return self._classifier
+
+    def warmup(self) -> Dict[str, Tuple[bool, str]]:
+        """Run a synthetic receipt through OCR, parsing and classification, so the first real receipt doesn't pay for
+        starting OCR workers, loading the model or its first inference.
+
+        Returns {"ocr": (ready, detail), "classifier": (ready, detail)}. The classifier counts as ready once loading
+        has finished, even if it failed and items fall back to rule-based classification.
+        """
+        status = {}
+        with tempfile.TemporaryDirectory(prefix="receipt-warmup-") as work_dir:
+            image_path = os.path.join(work_dir, "warmup.png")
             try:
-                result = self.classifier(item_name, self.candidate_labels)
-                if result and isinstance(result, dict) and 'labels' in result:
-                    ai_category = result['labels'][0]
-                    return self.category_mapping.get(str(ai_category), "Other")
+                render_receipt_image(WARMUP_RECEIPT_LINES, image_path)
+                if self.ocr_pool is not None:
+                    self.ocr_pool.start()
+                text = self.ocr_pages([image_path])[0]
+                status["ocr"] = (True, f"ready ({self.ocr_engine} engine)") if text.strip() else (False, "OCR returned no text for the warmup receipt")
             except Exception as e:
-                print(f"AI classification failed for '{item_name}': {e}")
-        
-        # Fallback to rule-based classification
-        return self.rule_based_classification(item_name)
+                status["ocr"] = (False, f"OCR warmup failed: {e}")
+
+        if not self.ai_enabled:
+            status["classifier"] = (True, "AI classification disabled; using rules")
+        elif self.classifier is None:
+            status["classifier"] = (True, f"AI classifier unavailable ({self._classifier_error}); using rules")
+        else:
+            item_names = [line.rsplit(None, 1)[0] for line in WARMUP_RECEIPT_LINES[1:-1]]
+            try:
+                self._batcher.classify(item_names)
+                status["classifier"] = (True, f"{self.classifier_backend} backend loaded")
+            except Exception as e:
+                status["classifier"] = (False, f"Classifier warmup failed: {e}")
+        return status
+
+    def _classify_batch_with_model(self, item_names: List[str]) -> List[str]:
+        results = self.classifier(item_names, self.candidate_labels)
+        if isinstance(results, dict):
+            results = [results]
+        return [self.category_mapping.get(str(result['labels'][0]), "Other") for result in results]
+
+    def classify_items(self, item_names: List[str], username: Optional[str] = None) -> List[str]:
+        """Classify several items at once: the user's learned categories first,
+        then the AI classifier (uncached items batched into one call) or rules."""
+        keys = [item_key(name) for name in item_names]
+        categories: Dict[str, str] = {}
+        if username is not None:
+            for key in keys:
+                learned = self.user_categories.predict(username, key)
+                if learned is not None:
+                    categories[key] = learned
+                    USER_CATEGORY_LOOKUPS.hits.inc()
+                else:
+                    USER_CATEGORY_LOOKUPS.misses.inc()
+
+        if self.classifier is None:
+            return [categories.get(key) or self.rule_based_classification(name) for key, name in zip(keys, item_names)]
+
+        with self._cache_lock:
+            for key in keys:
+                if key in categories:
+                    continue
+                if key in self._category_cache:
+                    self._category_cache.move_to_end(key)
+                    categories[key] = self._category_cache[key]
+                    CLASSIFICATION_CACHE.hits.inc()
+                else:
+                    CLASSIFICATION_CACHE.misses.inc()
+
+        # One model input per distinct uncached item
+        misses = {}
+        for key, name in zip(keys, item_names):
+            if key not in categories and key not in misses:
+                misses[key] = name
+
+        if misses:
+            try:
+                labels = self._batcher.classify(list(misses.values()))
+            except Exception as e:
+                logger.warning("AI classification failed for %d items: %s", len(misses), e)
+                labels = None
+
+            if labels is None:
+                for key, name in misses.items():
+                    categories[key] = self.rule_based_classification(name)
+            else:
+                with self._cache_lock:
+                    for key, category in zip(misses, labels):
+                        categories[key] = category
+                        self._category_cache[key] = category
+                        self._category_cache.move_to_end(key)
+                    while len(self._category_cache) > self.cache_size:
+                        self._category_cache.popitem(last=False)
+
+        return [categories[key] for key in keys]
+
+    def classify_item(self, item_name: str, username: Optional[str] = None) -> str:
+        """Classify an item into a category using the user's corrections, AI or rules."""
+        return self.classify_items([item_name], username)[0]
 
     def rule_based_classification(self, item_name: str) -> str:
-        """Fallback rule-based classification."""
-        item_lower = item_name.lower()
-        
-        # Food keywords
-        food_keywords = ["bread", "milk", "cheese", "fruit", "vegetable", "rice", "pasta", "meat", "chicken", "beef", "pork", "fish", "coffee", "tea", "juice", "water", "soda", "beer", "wine"]
-        if any(keyword in item_lower for keyword in food_keywords):
-            return "Food"
+        """Fallback rule-based classification using the keyword lexicon."""
+        return self.category_lexicon.classify(item_name)
+
+    def _build_expenses(self, text: str, description: str, username: Optional[str]) -> List[Dict]:
+        """Parse and classify OCR text into expense dicts."""
+        if not text or len(text.strip()) < 5:
+            raise Exception("Could not extract readable text from the image. Please ensure the image is clear and well-lit.")
         
-        # Electronics keywords
-        electronics_keywords = ["phone", "laptop", "computer", "tablet", "headphones", "charger", "cable", "battery"]
-        if any(keyword in item_lower for keyword in electronics_keywords):
-            return "Shopping"
+        # Parse items from text
+        start = time.perf_counter()
+        with span("parse"):
+            items = self.parse_items_from_text(text)
+        PARSE_SECONDS.observe(time.perf_counter() - start)
         
-        # Health keywords
-        health_keywords = ["medicine", "tablet", "capsule", "syrup", "cream", "bandage", "vitamin"]
-        if any(keyword in item_lower for keyword in health_keywords):
-            return "Health"
+        if not items:
+            # More helpful error message
+            raise Exception("No items could be extracted from the receipt. Please ensure the receipt shows clear item names and prices.")
         
-        # Transport keywords
-        transport_keywords = ["fuel", "gas", "petrol", "diesel", "ticket", "bus", "train", "taxi", "uber"]
-        if any(keyword in item_lower for keyword in transport_keywords):
-            return "Transport"
+        # Classify all items in one batch
+        expenses = []
+        today = date.today().isoformat()
+        start = time.perf_counter()
+        with span("classify"):
+            categories = self.classify_items([item["item"] for item in items], username)
+        CLASSIFY_SECONDS.observe(time.perf_counter() - start)
         
-        return "Other"
+        for item, category in zip(items, categories):
+            expense = {
+                "amount": item["price"],
+                "category": category,
+                "description": f"{description} - {item['item']}",
+                "date": today
+            }
+            expenses.append(expense)
+        return expenses
 
-    def process_receipt(self, image_path: str, description: str = "Receipt items") -> List[Dict]:
+    def process_receipt(self, image_path: str, description: str = "Receipt items", username: Optional[str] = None) -> List[Dict]:
         """Process a receipt image and return categorized expenses."""
         try:
             # Extract text from image
             text = self.extract_text_from_image(image_path)
-            
-            if not text or len(text.strip()) < 5:
-                raise Exception("Could not extract readable text from the image. Please ensure the image is clear and well-lit.")
-            
-            # Parse items from text
-            items = self.parse_items_from_text(text)
-            
-            if not items:
-                # More helpful error message
-                raise Exception("No items could be extracted from the receipt. Please ensure the receipt shows clear item names and prices.")
-            
-            # Classify each item
-            expenses = []
-            today = date.today().isoformat()
-            
-            for item in items:
-                category = self.classify_item(item["item"])
-                
-                expense = {
-                    "amount": item["price"],
-                    "category": category,
-                    "description": f"{description} - {item['item']}",
-                    "date": today
-                }
-                expenses.append(expense)
-            
-            print(f"Successfully processed {len(expenses)} items from receipt")
+            expenses = self._build_expenses(text, description, username)
+            logger.info("Processed receipt", extra={"items": len(expenses)})
             return expenses
             
         except Exception as e:
-            print(f"Receipt processing error: {str(e)}")
+            logger.warning("Receipt processing error: %s", e)
             raise Exception(f"Error processing receipt: {str(e)}")
 
-    def save_temp_image(self, image_data: bytes) -> str:
-        """Save uploaded image data to a temporary file."""
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-            temp_file.write(image_data)
-            return temp_file.name
+    def process_receipt_pages(self, image_paths: List[str], description: str = "Receipt items", username: Optional[str] = None) -> List[Dict]:
+        """Process the pages of one long receipt or bill and return categorized expenses."""
+        try:
+            page_texts = self.ocr_pages(image_paths)
+            expenses = self._build_expenses(self.merge_page_texts(page_texts), description, username)
+            logger.info("Processed receipt", extra={"items": len(expenses), "pages": len(image_paths)})
+            return expenses
+
+        except Exception as e:
+            logger.warning("Receipt processing error: %s", e)
+            raise Exception(f"Error processing receipt: {str(e)}")
 
     def cleanup_temp_file(self, file_path: str):
         """Clean up temporary file."""
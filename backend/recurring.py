@@ -0,0 +1,195 @@
+import calendar
+import math
+import re
+import threading
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Recurring expenses and subscriptions. Expenses are hashed into groups by
+# normalized description, category and a ~10% amount band, so each one is
+# placed with a dictionary lookup instead of being compared with every other
+# expense. A group whose dates repeat at a weekly, monthly or yearly interval
+# is reported as a series. Groups are updated per change and their series
+# re-detected only when they have changed.
+
+AMOUNT_BAND_RATIO = 1.1
+MIN_OCCURRENCES = 3
+# Share of intervals that must fall within the period's tolerance
+MIN_REGULARITY = 0.75
+
+# name -> (typical days, tolerance in days, occurrences per month)
+PERIODS = {
+    "weekly": (7, 1, 52 / 12),
+    "monthly": (30, 4, 1.0),
+    "yearly": (365, 10, 1 / 12),
+}
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_description(description: Optional[str]) -> str:
+    """Lowercase words only: drops digits, sizes and punctuation ("MILK 1L" -> "milk")."""
+    if not description:
+        return ""
+    return " ".join(token for token in TOKEN_RE.findall(description.lower()) if token.isalpha())
+
+
+def amount_band(amount: float) -> int:
+    return int(math.floor(math.log(amount) / math.log(AMOUNT_BAND_RATIO))) if amount > 0 else 0
+
+
+def _add_months(day: date, months: int) -> date:
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+class _Group:
+    __slots__ = ("description", "category", "occurrences", "series", "dirty")
+
+    def __init__(self, description: str, category: str):
+        self.description = description
+        self.category = category
+        # expense id -> (date, amount)
+        self.occurrences: Dict[int, Tuple[str, float]] = {}
+        self.series: Optional[dict] = None
+        self.dirty = True
+
+    def detect(self) -> Optional[dict]:
+        if not self.dirty:
+            return self.series
+        self.dirty = False
+        self.series = None
+        if len(self.occurrences) < MIN_OCCURRENCES:
+            return None
+        dates = sorted(date.fromisoformat(day[:10]) for day, _ in self.occurrences.values())
+        intervals = [(later - earlier).days for earlier, later in zip(dates, dates[1:])]
+        median = sorted(intervals)[len(intervals) // 2]
+        for name, (days, tolerance, per_month) in PERIODS.items():
+            if abs(median - days) > tolerance:
+                continue
+            regular = sum(1 for interval in intervals if abs(interval - days) <= tolerance)
+            if regular / len(intervals) < MIN_REGULARITY:
+                return None
+            last = dates[-1]
+            if name == "weekly":
+                next_date = last + timedelta(days=7)
+            elif name == "monthly":
+                next_date = _add_months(last, 1)
+            else:
+                next_date = _add_months(last, 12)
+            average = sum(amount for _, amount in self.occurrences.values()) / len(self.occurrences)
+            self.series = {
+                "description": self.description,
+                "category": self.category,
+                "period": name,
+                "occurrences": len(self.occurrences),
+                "average_amount": round(average, 2),
+                "monthly_cost": round(average * per_month, 2),
+                "first_date": dates[0].isoformat(),
+                "last_date": last.isoformat(),
+                "next_expected_date": next_date.isoformat(),
+                "expense_ids": sorted(self.occurrences),
+            }
+            break
+        return self.series
+
+
+class _UserGroups:
+    def __init__(self, version: int):
+        self.version = version
+        # (description, category, band) -> group
+        self.groups: Dict[Tuple[str, str, int], _Group] = {}
+        # expense id -> its group's key
+        self.keys: Dict[int, Tuple[str, str, int]] = {}
+
+    def add(self, expense: dict):
+        description = normalize_description(expense.get("description"))
+        band = amount_band(expense["amount"])
+        # Join a group in a neighbouring band so prices near a band edge stay together
+        for candidate in (band, band - 1, band + 1):
+            key = (description, expense["category"], candidate)
+            group = self.groups.get(key)
+            if group is not None:
+                break
+        else:
+            key = (description, expense["category"], band)
+            group = self.groups[key] = _Group(description, expense["category"])
+        group.occurrences[expense["id"]] = (expense["date"], expense["amount"])
+        group.dirty = True
+        self.keys[expense["id"]] = key
+
+    def remove(self, expense: dict):
+        key = self.keys.pop(expense["id"], None)
+        group = self.groups.get(key) if key is not None else None
+        if group is None:
+            return
+        group.occurrences.pop(expense["id"], None)
+        group.dirty = True
+        if not group.occurrences:
+            del self.groups[key]
+
+
+class RecurringDetector:
+    """Per-user expense groups, built lazily with `load` and updated by `record`.
+
+    `load(username)` returns (version, expenses) as one consistent snapshot.
+    A user's groups are rebuilt if they miss a version.
+    """
+
+    def __init__(self, load: Callable[[str], Tuple[int, Iterable[dict]]]):
+        self.load = load
+        self._users: Dict[str, _UserGroups] = {}
+        self._lock = threading.Lock()
+
+    def record(self, username: str, version: int, op: str, before: Optional[dict], after: Optional[dict]):
+        """Expense change listener: move the changed expense between groups."""
+        with self._lock:
+            groups = self._users.get(username)
+            if groups is None:
+                return  # built from the store on first query
+            if groups.version != version - 1:
+                del self._users[username]  # missed a change: rebuild on next query
+                return
+            if op != "flag":
+                if before is not None:
+                    groups.remove(before)
+                if after is not None:
+                    groups.add(after)
+            groups.version = version
+
+    def _groups(self, username: str, current_version: int) -> _UserGroups:
+        with self._lock:
+            groups = self._users.get(username)
+        if groups is not None and groups.version == current_version:
+            return groups
+        version, expenses = self.load(username)
+        groups = _UserGroups(version)
+        for expense in expenses:
+            groups.add(expense)
+        with self._lock:
+            current = self._users.get(username)
+            if current is None or current.version < version:
+                self._users[username] = groups
+        return groups
+
+    def series(self, username: str, current_version: int, today: Optional[date] = None) -> List[dict]:
+        """Detected series, largest monthly cost first. `active` is False once two periods pass with no payment."""
+        today = today or date.today()
+        groups = self._groups(username, current_version)
+        detected = []
+        with self._lock:
+            for group in groups.groups.values():
+                if len(group.occurrences) < MIN_OCCURRENCES:
+                    continue
+                series = group.detect()
+                if series is not None:
+                    days = PERIODS[series["period"]][0]
+                    overdue = (today - date.fromisoformat(series["next_expected_date"])).days
+                    detected.append(dict(series, active=overdue <= days))
+        detected.sort(key=lambda series: series["monthly_cost"], reverse=True)
+        return detected
+
+    def group_count(self) -> int:
+        with self._lock:
+            return sum(len(groups.groups) for groups in self._users.values())
@@ -0,0 +1,119 @@
+import threading
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Pre-aggregated spending per user: totals and counts per category in day,
+# week and month buckets. The tables are built from the store once per user,
+# then kept current by the expense change listener, so a two-year monthly
+# breakdown reads ~24 buckets instead of every expense.
+
+BUCKETS = ("day", "week", "month")
+
+
+def bucket_keys(iso_date: str) -> Tuple[str, str, str]:
+    """(day, week, month) bucket keys: the date, the Monday of its ISO week, and YYYY-MM."""
+    day = date.fromisoformat(iso_date[:10])
+    return day.isoformat(), (day - timedelta(days=day.weekday())).isoformat(), iso_date[:7]
+
+
+class _UserRollup:
+    def __init__(self, version: int):
+        self.version = version
+        # bucket kind -> bucket key -> category -> [total, count]
+        self.tables: Dict[str, Dict[str, Dict[str, list]]] = {kind: {} for kind in BUCKETS}
+
+    def apply(self, expense: dict, sign: int):
+        for kind, key in zip(BUCKETS, bucket_keys(expense["date"])):
+            table = self.tables[kind]
+            categories = table.get(key)
+            if categories is None:
+                categories = table[key] = {}
+            cell = categories.get(expense["category"])
+            if cell is None:
+                cell = categories[expense["category"]] = [0.0, 0]
+            cell[0] += sign * expense["amount"]
+            cell[1] += sign
+            if cell[1] == 0:
+                del categories[expense["category"]]
+                if not categories:
+                    del table[key]
+
+
+class Rollups:
+    """Per-user bucket tables, built lazily with `load` and updated by `record`.
+
+    `load(username)` returns (version, expenses) as one consistent snapshot.
+    A user's tables are rebuilt if they fall out of step with the store's
+    version, e.g. after a bulk load that bypassed the change listeners.
+    """
+
+    def __init__(self, load: Callable[[str], Tuple[int, Iterable[dict]]]):
+        self.load = load
+        self._users: Dict[str, _UserRollup] = {}
+        self._lock = threading.Lock()
+
+    def record(self, username: str, version: int, op: str, before: Optional[dict], after: Optional[dict]):
+        """Expense change listener: move the change's amount between buckets."""
+        with self._lock:
+            rollup = self._users.get(username)
+            if rollup is None:
+                return  # built from the store on first query
+            if rollup.version != version - 1:
+                del self._users[username]  # missed a change: rebuild on next query
+                return
+            if op != "flag":
+                if before is not None:
+                    rollup.apply(before, -1)
+                if after is not None:
+                    rollup.apply(after, 1)
+            rollup.version = version
+
+    def _rollup(self, username: str, current_version: int) -> _UserRollup:
+        with self._lock:
+            rollup = self._users.get(username)
+        if rollup is not None and rollup.version == current_version:
+            return rollup
+        version, expenses = self.load(username)
+        rollup = _UserRollup(version)
+        for expense in expenses:
+            rollup.apply(expense, 1)
+        with self._lock:
+            current = self._users.get(username)
+            if current is None or current.version < version:
+                self._users[username] = rollup
+        return rollup
+
+    def series(self, username: str, current_version: int, bucket: str, by_category: bool = False,
+               start: Optional[str] = None, end: Optional[str] = None) -> List[dict]:
+        """Buckets in date order with total and count (and per-category totals), within [start, end] if given."""
+        rollup = self._rollup(username, current_version)
+        first = bucket_keys(start)[BUCKETS.index(bucket)] if start is not None else None
+        series = []
+        with self._lock:
+            for key in sorted(rollup.tables[bucket]):
+                if (first is not None and key < first) or (end is not None and key > end):
+                    continue
+                categories = rollup.tables[bucket][key]
+                point = {
+                    "bucket": key,
+                    "total": round(sum(cell[0] for cell in categories.values()), 2),
+                    "count": sum(cell[1] for cell in categories.values()),
+                }
+                if by_category:
+                    point["categories"] = {category: round(cell[0], 2) for category, cell in sorted(categories.items())}
+                series.append(point)
+        return series
+
+    def total(self, username: str, current_version: int, bucket: str, key: str, category: Optional[str] = None) -> float:
+        """Spend in one bucket (e.g. "month", "2025-09"), for one category or all of them."""
+        rollup = self._rollup(username, current_version)
+        with self._lock:
+            categories = rollup.tables[bucket].get(key, {})
+            if category is not None:
+                cell = categories.get(category)
+                return cell[0] if cell is not None else 0.0
+            return sum(cell[0] for cell in categories.values())
+
+    def bucket_count(self) -> int:
+        with self._lock:
+            return sum(len(table) for rollup in self._users.values() for table in rollup.tables.values())
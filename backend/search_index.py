@@ -0,0 +1,167 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Per-user inverted index over expense descriptions and categories for
+# GET /expenses/search. Built from the store on a user's first search, then
+# kept current by the expense change listener. Every query word matches as
+# a prefix ("coff" finds "coffee"); results rank by IDF-weighted matches,
+# with whole-word matches worth more than prefix matches.
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+PREFIX_MATCH_WEIGHT = 0.5
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def expense_tokens(expense: dict) -> Set[str]:
+    return set(tokenize(expense.get("description"))) | set(tokenize(expense["category"]))
+
+
+class _UserIndex:
+    def __init__(self, version: int):
+        self.version = version
+        # token -> ids of expenses containing it
+        self.postings: Dict[str, Set[int]] = {}
+        # sorted tokens, for prefix lookups by bisection
+        self.vocabulary: List[str] = []
+        # id -> store record. The records are the store's own dicts: every
+        # change to one comes through record(), so they never go stale here.
+        self.docs: Dict[int, dict] = {}
+
+    def add(self, expense: dict):
+        self.docs[expense["id"]] = expense
+        for token in expense_tokens(expense):
+            ids = self.postings.get(token)
+            if ids is None:
+                ids = self.postings[token] = set()
+                bisect.insort(self.vocabulary, token)
+            ids.add(expense["id"])
+
+    def remove(self, expense: dict):
+        self.docs.pop(expense["id"], None)
+        for token in expense_tokens(expense):
+            ids = self.postings.get(token)
+            if ids is None:
+                continue
+            ids.discard(expense["id"])
+            if not ids:
+                del self.postings[token]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+
+    def prefixed(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + "\uffff")
+        return self.vocabulary[start:end]
+
+
+class SearchIndex:
+    """Per-user inverted indexes, built lazily with `load` and updated by `record`.
+
+    `load(username)` returns (version, expenses) as one consistent snapshot.
+    A user's index is rebuilt if it misses a version.
+    """
+
+    def __init__(self, load: Callable[[str], Tuple[int, Iterable[dict]]]):
+        self.load = load
+        self._users: Dict[str, _UserIndex] = {}
+        self._lock = threading.Lock()
+
+    def record(self, username: str, version: int, op: str, before: Optional[dict], after: Optional[dict]):
+        """Expense change listener: re-index the changed expense."""
+        with self._lock:
+            index = self._users.get(username)
+            if index is None:
+                return  # built from the store on first search
+            if index.version != version - 1:
+                del self._users[username]  # missed a change: rebuild on next search
+                return
+            if op != "flag":
+                if before is not None:
+                    index.remove(before)
+                if after is not None:
+                    index.add(after)
+            index.version = version
+
+    def _index(self, username: str, current_version: int) -> _UserIndex:
+        with self._lock:
+            index = self._users.get(username)
+        if index is not None and index.version == current_version:
+            return index
+        version, expenses = self.load(username)
+        index = _UserIndex(version)
+        for expense in expenses:
+            index.add(expense)
+        with self._lock:
+            current = self._users.get(username)
+            if current is None or current.version < version:
+                self._users[username] = index
+        return index
+
+    def search(self, username: str, current_version: int, query: str, limit: int = 50,
+               predicate: Optional[Callable[[dict], bool]] = None) -> Tuple[int, List[dict]]:
+        """(number of matches, best `limit` matches as expense copies with a "score").
+
+        Every query word must match a token of the expense (as a prefix);
+        `predicate` filters the matches further. Ties go to the most
+        recently added expense.
+        """
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return 0, []
+        index = self._index(username, current_version)
+        with self._lock:
+            total_docs = max(len(index.docs), 1)
+            # Per term: the matching tokens' posting sets with their weights, best first
+            term_postings = []
+            for term in terms:
+                weighted = [
+                    (math.log(1 + total_docs / len(index.postings[token])) * (1.0 if token == term else PREFIX_MATCH_WEIGHT),
+                     index.postings[token])
+                    for token in index.prefixed(term)
+                ]
+                if not weighted:
+                    return 0, []
+                weighted.sort(key=lambda item: item[0], reverse=True)
+                term_postings.append(weighted)
+            # Split the matches into groups of equal score with set operations,
+            # instead of scoring expenses one at a time
+            groups = [(0.0, None)]
+            for weighted in term_postings:
+                next_groups = []
+                for score, ids in groups:
+                    for weight, postings in weighted:
+                        part = postings if ids is None else ids & postings
+                        if part:
+                            next_groups.append((score + weight, part))
+                            if ids is not None:
+                                ids = ids - part
+                                if not ids:
+                                    break
+                groups = next_groups
+            # A doc can sit in several groups for a term only when ids is None
+            # (the first term); keep each in its best group
+            groups.sort(key=lambda group: group[0], reverse=True)
+            seen: Set[int] = set()
+            total = 0
+            results = []
+            for score, ids in groups:
+                if len(groups) > 1:
+                    ids = ids - seen
+                    seen |= ids
+                if predicate is not None:
+                    ids = {expense_id for expense_id in ids if predicate(index.docs[expense_id])}
+                total += len(ids)
+                if len(results) < limit:
+                    for expense_id in heapq.nlargest(limit - len(results), ids):
+                        results.append(dict(index.docs[expense_id], score=round(score, 3)))
+        return total, results
+
+    def token_count(self) -> int:
+        with self._lock:
+            return sum(len(index.postings) for index in self._users.values())
@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# Structured, non-blocking logging for the API. Records are put on a bounded
+# queue by the calling thread and written out by a single listener thread, so
+# a slow or piped stdout never stalls a request. Every record carries the id
+# of the request it was logged under (X-Request-ID, or a generated one).
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json").lower()  # json | text
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+# Fraction of receipts whose full OCR text is logged at INFO (it is always logged at DEBUG)
+OCR_TEXT_LOG_SAMPLE_RATE = float(os.environ.get("OCR_TEXT_LOG_SAMPLE_RATE", "0"))
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+_REQUEST_ID_HEADER = b"x-request-id"
+_VALID_REQUEST_ID = re.compile(rb"[A-Za-z0-9._:-]{1,128}")
+# Credentials that can appear in a request URL (/expenses/stream?ticket=...)
+_URL_SECRET = re.compile(r"([?&](?:ticket|token)=)[^&\s]*")
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps each record with the current request id, in the thread that logged it."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class RedactUrlSecretsFilter(logging.Filter):
+    """Masks URL credentials in uvicorn's access log lines (the path is one of the record's args)."""
+
+    def filter(self, record):
+        if isinstance(record.args, tuple):
+            record.args = tuple(_URL_SECRET.sub(r"\1***", arg) if isinstance(arg, str) else arg
+                                for arg in record.args)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra={...}` fields are included as top-level keys."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks: when the queue is full the record is dropped and counted."""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[logging.Handler] = None
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, stream=None, use_queue: bool = True):
+    """Install the app's handler on the root logger, replacing one installed earlier.
+
+    With use_queue=False records are written synchronously by the logging thread (for comparison in benchmarks).
+    """
+    global _listener, _handler
+    root = logging.getLogger()
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _handler is not None:
+        root.removeHandler(_handler)
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+    if use_queue:
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        _handler = DroppingQueueHandler(log_queue)
+        _listener = QueueListener(log_queue, output)
+        _listener.start()
+    else:
+        _handler = output
+    _handler.addFilter(RequestIdFilter())
+    root.addHandler(_handler)
+    access = logging.getLogger("uvicorn.access")
+    if not any(isinstance(f, RedactUrlSecretsFilter) for f in access.filters):
+        access.addFilter(RedactUrlSecretsFilter())
+    root.setLevel(level)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def sampled(rate: float) -> bool:
+    return rate > 0 and random.random() < rate
+
+
+class RequestIdMiddleware:
+    """Pure ASGI middleware binding a request id for the request's logs and echoing it as X-Request-ID.
+
+    A well-formed incoming X-Request-ID is kept so ids can be followed across services; otherwise one is generated.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == _REQUEST_ID_HEADER:
+                if _VALID_REQUEST_ID.fullmatch(value):
+                    request_id = value
+                break
+        if request_id is None:
+            request_id = uuid.uuid4().hex.encode()
+        token = request_id_var.set(request_id.decode())
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(_REQUEST_ID_HEADER, request_id)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
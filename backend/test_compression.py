@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for response compression (compression.CompressionMiddleware)
+
+Run with: python -m pytest test_compression.py
+"""
+import asyncio
+import gzip
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("REPLICATE_API_TOKEN", "r8_test_placeholder")
+
+from compression import CompressionMiddleware
+
+
+def http_scope(path, query_string=b"", headers=()):
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": query_string, "headers": [(b"host", b"testserver"), *headers],
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+
+
+async def first_message(app, scope, timeout=2.0):
+    """The first message app sends for scope, then disconnect the client."""
+    disconnected = asyncio.Event()
+    sent = asyncio.Queue()
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        await sent.put(message)
+
+    task = asyncio.ensure_future(app(scope, receive, send))
+    try:
+        return await asyncio.wait_for(sent.get(), timeout)
+    finally:
+        disconnected.set()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+def test_sse_headers_sent_before_first_event():
+    import main
+
+    ticket = main.create_access_token({"sub": main.test_user, "scope": "stream"})
+    version, _ = main.expense_changes(main.test_user, None)
+    scope = http_scope("/expenses/stream", f"ticket={ticket}&since={version}".encode(),
+                       [(b"accept-encoding", b"gzip")])
+
+    # Nothing has changed since `version`, so no event is due before the first heartbeat
+    message = asyncio.run(first_message(main.app, scope))
+    assert message["type"] == "http.response.start"
+    assert message["status"] == 200
+    headers = dict(message["headers"])
+    assert headers[b"content-type"].startswith(b"text/event-stream")
+    assert b"content-encoding" not in headers
+
+
+def test_streaming_response_headers_not_held_back():
+    async def streaming_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        await asyncio.sleep(60)  # first chunk still being produced
+        await send({"type": "http.response.body", "body": b"x" * 4096})
+
+    scope = http_scope("/", headers=[(b"accept-encoding", b"gzip")])
+    message = asyncio.run(first_message(CompressionMiddleware(streaming_app), scope))
+    assert message["type"] == "http.response.start"
+    assert b"content-encoding" not in dict(message["headers"])
+
+
+def test_whole_body_compressed():
+    body = b'{"amount": 12.5}' * 200
+    sent = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = http_scope("/", headers=[(b"accept-encoding", b"gzip")])
+    asyncio.run(CompressionMiddleware(app)(scope, receive, send))
+    headers = dict(sent[0]["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert gzip.decompress(sent[1]["body"]) == body
+    assert int(headers[b"content-length"]) == len(sent[1]["body"])
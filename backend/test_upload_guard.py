@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Tests for the receipt upload guardrails (upload_guard.py, ocr_workers.open_receipt_image)
+
+Huge and malicious images are opened in a fresh subprocess so its peak RSS
+can be checked against what a full decode would have cost.
+
+Run with: python -m pytest test_upload_guard.py
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import zlib
+
+import pytest
+from fastapi import HTTPException
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+from upload_guard import MB, MemoryBudget, UploadLimitMiddleware, UploadTooLarge, save_upload
+
+RSS_LIMIT_MB = 150
+
+
+def run_isolated(code, env=None):
+    """Run code in a fresh interpreter; it must print one JSON line. Adds the child's peak RSS in MB."""
+    script = (
+        "import json, resource, sys\n"
+        f"sys.path.insert(0, {BACKEND_DIR!r})\n"
+        f"{code}\n"
+        "result['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024\n"
+        "print(json.dumps(result))\n"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True,
+        env={**os.environ, **(env or {})}, timeout=300,
+    )
+    assert completed.returncode == 0, completed.stderr
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def write_png_bomb(path, width, height):
+    """A 1-bit PNG of width x height zeros: tiny on disk, width*height pixels decoded."""
+    def chunk(kind, data):
+        return len(data).to_bytes(4, "big") + kind + data + zlib.crc32(kind + data).to_bytes(4, "big")
+
+    row = b"\x00" * (1 + (width + 7) // 8)  # filter byte + packed bits
+    compressor = zlib.compressobj(9)
+    idat = b"".join(compressor.compress(row) for _ in range(height)) + compressor.flush()
+    ihdr = width.to_bytes(4, "big") + height.to_bytes(4, "big") + bytes([1, 0, 0, 0, 0])
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IDAT", idat) + chunk(b"IEND", b""))
+
+
+class EndlessUpload:
+    """An UploadFile stand-in that never runs out of data."""
+    filename = "endless.jpg"
+
+    async def read(self, size=-1):
+        return b"\xff" * size
+
+
+def test_png_decompression_bomb_rejected_before_decode(tmp_path):
+    path = tmp_path / "bomb.png"
+    write_png_bomb(str(path), 60000, 60000)  # 3.6 gigapixels, a few hundred KB on disk
+    assert path.stat().st_size < 5 * MB
+
+    result = run_isolated(
+        "from upload_guard import estimate_decode_bytes\n"
+        "from fastapi import HTTPException\n"
+        "try:\n"
+        f"    estimate_decode_bytes({str(path)!r})\n"
+        "    result = {'rejected': False}\n"
+        "except HTTPException as e:\n"
+        "    result = {'rejected': True, 'status': e.status_code}\n"
+    )
+    assert result["rejected"] and result["status"] == 413
+    assert result["peak_rss_mb"] < RSS_LIMIT_MB
+
+
+def test_oversized_non_jpeg_rejected_by_ocr_loader(tmp_path):
+    path = tmp_path / "wide.png"
+    write_png_bomb(str(path), 20000, 5000)  # 100 MP: under PIL's bomb check, over ours
+
+    result = run_isolated(
+        "from ocr_workers import ImageTooLarge, open_receipt_image\n"
+        "try:\n"
+        f"    open_receipt_image({str(path)!r}).load()\n"
+        "    result = {'rejected': False}\n"
+        "except ImageTooLarge:\n"
+        "    result = {'rejected': True}\n"
+    )
+    assert result["rejected"]
+    assert result["peak_rss_mb"] < RSS_LIMIT_MB
+
+
+def test_huge_jpeg_decoded_at_reduced_scale(tmp_path):
+    path = tmp_path / "huge.jpg"
+    # 200 MP grayscale JPEG, built in its own process so the test's RSS stays clean
+    subprocess.run(
+        [sys.executable, "-c",
+         "from PIL import Image; Image.MAX_IMAGE_PIXELS = None; "
+         f"Image.new('L', (16000, 12500), 255).save({str(path)!r}, quality=50)"],
+        check=True, timeout=300,
+    )
+
+    result = run_isolated(
+        "from ocr_workers import open_receipt_image\n"
+        f"image = open_receipt_image({str(path)!r}).convert('L')\n"
+        "result = {'size': list(image.size)}\n",
+        env={"MAX_IMAGE_PIXELS": "10000000"},
+    )
+    width, height = result["size"]
+    assert (width, height) == (2000, 1563)  # decoded at 1/8 scale
+    assert width * height <= 10_000_000
+    # A full decode would need 200 MB for the pixels alone
+    assert result["peak_rss_mb"] < RSS_LIMIT_MB
+
+
+def test_streaming_upload_is_capped(tmp_path):
+    with pytest.raises(UploadTooLarge) as excinfo:
+        asyncio.run(save_upload(EndlessUpload(), str(tmp_path), max_bytes=5 * MB))
+    assert excinfo.value.status_code == 413
+    assert list(tmp_path.iterdir()) == []  # partial file removed
+
+
+def test_middleware_refuses_large_content_length():
+    called = []
+    sent = []
+
+    async def app(scope, receive, send):
+        called.append(True)
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = UploadLimitMiddleware(app, {"/process-receipt": MB})
+    scope = {"type": "http", "path": "/process-receipt", "headers": [(b"content-length", str(10 * MB).encode())]}
+    asyncio.run(middleware(scope, receive, send))
+    assert not called
+    assert sent[0]["status"] == 413
+
+
+def test_middleware_aborts_chunked_body_past_limit():
+    sent = []
+
+    async def app(scope, receive, send):
+        while (await receive()).get("more_body"):
+            pass
+
+    async def receive():
+        return {"type": "http.request", "body": b"x" * (256 * 1024), "more_body": True}
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = UploadLimitMiddleware(app, {"/process-receipt": MB})
+    scope = {"type": "http", "path": "/process-receipt", "headers": []}
+    asyncio.run(middleware(scope, receive, send))
+    assert sent[0]["status"] == 413
+
+
+def test_memory_budget_rejects_work_that_does_not_fit():
+    budget = MemoryBudget(total_bytes=100)
+    with budget.reserve(60):
+        with pytest.raises(HTTPException) as excinfo:
+            with budget.reserve(50):
+                pass
+        assert excinfo.value.status_code == 503
+        assert excinfo.value.headers["Retry-After"]
+    assert budget.in_use == 0
+
+    with pytest.raises(UploadTooLarge):
+        with budget.reserve(101):
+            pass
+    with budget.reserve(100):
+        assert budget.in_use == 100
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
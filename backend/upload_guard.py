@@ -0,0 +1,155 @@
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+
+from fastapi import HTTPException, UploadFile
+from starlette.responses import JSONResponse
+
+# Upload guardrails for the receipt endpoints: request bodies are size-capped
+# while they stream in, images are measured from their headers before any
+# decode, and decode work is admitted against a shared memory budget.
+
+MB = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_MB", "15")) * MB
+MAX_BATCH_UPLOAD_BYTES = int(os.environ.get("MAX_BATCH_UPLOAD_MB", "60")) * MB
+RECEIPT_MEMORY_BUDGET_BYTES = int(os.environ.get("RECEIPT_MEMORY_BUDGET_MB", "1024")) * MB
+CHUNK_SIZE = MB
+
+# Decode cost per pixel: the decoded image (up to 4 bytes/pixel) plus its
+# grayscale copy and Tesseract's working copies
+DECODE_BYTES_PER_PIXEL = 6
+
+
+class UploadTooLarge(HTTPException):
+    def __init__(self, detail: str):
+        super().__init__(status_code=413, detail=detail)
+
+
+class UploadLimitMiddleware:
+    """Cap request body size on upload routes while the body streams in.
+
+    A Content-Length over the limit is refused before any of the body is
+    read; chunked bodies are counted as they arrive and aborted with 413 as
+    soon as they pass the limit, so nothing larger is ever buffered.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse({"detail": f"Upload exceeds {limit // MB} MB"}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise UploadTooLarge(f"Upload exceeds {limit // MB} MB")
+            return message
+
+        async def tracked_send(message):
+            nonlocal response_started
+            response_started = response_started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except UploadTooLarge as e:
+            # Normally rendered by the app's exception handling; this covers the rest
+            if response_started:
+                raise
+            await JSONResponse({"detail": e.detail}, status_code=413)(scope, receive, send)
+
+
+async def save_upload(file: UploadFile, directory: Optional[str] = None, max_bytes: int = MAX_UPLOAD_BYTES) -> str:
+    """Copy an upload to a temporary file in fixed-size chunks, enforcing max_bytes. Returns the path."""
+    written = 0
+    with tempfile.NamedTemporaryFile(delete=False, dir=directory, suffix=".upload") as temp_file:
+        try:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLarge(f"{file.filename or 'Upload'} exceeds {max_bytes // MB} MB")
+                temp_file.write(chunk)
+        except BaseException:
+            temp_file.close()
+            os.unlink(temp_file.name)
+            raise
+    return temp_file.name
+
+
+def estimate_decode_bytes(image_path: str) -> int:
+    """Memory needed to decode and OCR an image, read from its header only.
+
+    Accounts for reduced JPEG decoding; raises UploadTooLarge for images over
+    the pixel limit and HTTP 400 for files that aren't images.
+    """
+    # Imported here so loading this module doesn't pull in PIL and pytesseract
+    from ocr_workers import ImageTooLarge, open_receipt_image
+
+    try:
+        image = open_receipt_image(image_path)
+    except ImageTooLarge as e:
+        raise UploadTooLarge(str(e))
+    except Exception:
+        raise HTTPException(status_code=400, detail="File is not a readable image")
+    with image:
+        width, height = image.size
+    return width * height * DECODE_BYTES_PER_PIXEL
+
+
+def estimate_batch_decode_bytes(image_paths: Iterable[str], concurrency: int) -> int:
+    """Peak decode memory for pages OCR'd `concurrency` at a time: the largest pages together."""
+    costs = sorted(estimate_decode_bytes(path) for path in image_paths)
+    return sum(costs[-max(1, concurrency):])
+
+
+class MemoryBudget:
+    """Admission control for decode memory shared by all in-flight receipt requests.
+
+    Work is admitted only if its estimated memory fits in what's left of the
+    budget. It is never queued: a request that can't fit right now gets 503
+    with Retry-After, one that could never fit gets 413.
+    """
+
+    def __init__(self, total_bytes: int = RECEIPT_MEMORY_BUDGET_BYTES):
+        self.total_bytes = total_bytes
+        self.in_use = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def reserve(self, nbytes: int):
+        with self._lock:
+            if nbytes > self.total_bytes:
+                raise UploadTooLarge("Receipt is too large to process")
+            if self.in_use + nbytes > self.total_bytes:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Receipt processing is at capacity, please try again shortly",
+                    headers={"Retry-After": "5"},
+                )
+            self.in_use += nbytes
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_use -= nbytes
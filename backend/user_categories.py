@@ -0,0 +1,117 @@
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Per-user item categories learned from the user's own category corrections.
+# Kept free of the OCR and classifier dependencies, so expense edits can teach
+# it without loading the receipt parser.
+
+ITEM_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def item_key(item_name: str) -> str:
+    """Normalize an item name: lowercase words only, quantities like "1L" dropped."""
+    item_lower = item_name.lower()
+    words = ITEM_WORD_RE.findall(item_lower)
+    return " ".join(word for word in words if word.isalpha()) or item_lower
+
+
+def item_name_from_description(description: str) -> str:
+    """Recover the item name from a receipt expense description ("<description> - <item>")."""
+    return description.rsplit(" - ", 1)[-1].strip()
+
+
+class UserCategoryModel:
+    """Categories learned from one user's edits.
+
+    Two layers, both updated incrementally on every correction:
+      - an exact lookup table from normalized item name to category, which
+        answers repeat items directly
+      - a multi-class perceptron over hashed word and character-trigram
+        features, which generalizes to variants ("amul milk" after "milk")
+        and only answers when it is confident
+    """
+
+    def __init__(self, max_items: int = 5000, buckets: int = 1 << 18, min_margin: float = 2.0):
+        self.max_items = max_items
+        self.buckets = buckets
+        self.min_margin = min_margin
+        self.items: "OrderedDict[str, str]" = OrderedDict()
+        self.weights: Dict[str, Dict[int, float]] = {}
+
+    def _features(self, key: str) -> List[int]:
+        words = key.split()
+        padded = f" {key} "
+        grams = words + [padded[i:i + 3] for i in range(len(padded) - 2)]
+        return [zlib.crc32(gram.encode()) % self.buckets for gram in grams]
+
+    def _scores(self, features: List[int]) -> Dict[str, float]:
+        return {
+            category: sum(weights.get(feature, 0.0) for feature in features)
+            for category, weights in self.weights.items()
+        }
+
+    def predict(self, key: str) -> Optional[str]:
+        category = self.items.get(key)
+        if category is not None:
+            return category
+        if len(self.weights) < 2:
+            return None
+
+        ranked = sorted(self._scores(self._features(key)).items(), key=lambda x: x[1], reverse=True)
+        (best, best_score), (_, runner_up) = ranked[0], ranked[1]
+        if best_score > 0 and best_score - runner_up >= self.min_margin:
+            return best
+        return None
+
+    def learn(self, key: str, category: str):
+        self.items[key] = category
+        self.items.move_to_end(key)
+        if len(self.items) > self.max_items:
+            self.items.popitem(last=False)
+
+        # Perceptron update: reward the corrected category, penalize a wrong guess
+        features = self._features(key)
+        self.weights.setdefault(category, {})
+        scores = self._scores(features)
+        predicted = max(scores, key=scores.get)
+        if predicted != category or scores[category] <= 0:
+            for feature in features:
+                target = self.weights[category]
+                target[feature] = target.get(feature, 0.0) + 1.0
+                if predicted != category:
+                    wrong = self.weights[predicted]
+                    wrong[feature] = wrong.get(feature, 0.0) - 1.0
+
+
+class UserCategoryStore:
+    """UserCategoryModel per username."""
+
+    def __init__(self):
+        self._models: Dict[str, UserCategoryModel] = {}
+        self._lock = threading.Lock()
+
+    def predict(self, username: str, key: str) -> Optional[str]:
+        model = self._models.get(username)
+        if model is None:
+            return None
+        with self._lock:
+            return model.predict(key)
+
+    def learn(self, username: str, key: str, category: str):
+        with self._lock:
+            model = self._models.get(username)
+            if model is None:
+                model = self._models[username] = UserCategoryModel()
+            model.learn(key, category)
+
+    def learn_description(self, username: str, description: str, category: str):
+        """Remember a user's category correction for the item an expense describes."""
+        item_name = item_name_from_description(description or "")
+        if item_name:
+            self.learn(username, item_key(item_name), category)
+
+    def __len__(self) -> int:
+        return len(self._models)
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { BrowserRouter as Router, Routes, Route, useNavigate, useLocation } from 'react-router-dom';
 import { PlusCircle, Wallet, LayoutList, BrainCircuit, MessageSquare, Camera } from 'lucide-react';
 import LandingPage from './components/LandingPage';
@@ -16,7 +16,8 @@ import {
   ErrorDisplay, 
   Modal, 
   ExpenseForm,
-  apiFetch 
+  apiFetch,
+  API_BASE_URL
 } from './components/ExpenseComponents';
 import './styles/global.css';
 
@@ -38,6 +39,10 @@ const ExpenseManager = () => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [isAddModalOpen, setIsAddModalOpen] = useState(false);
+  // Expense version the list in state is at, from X-Expenses-Version
+  const versionRef = useRef(null);
+  // Set once the first full fetch has a version for the live stream to start from
+  const [synced, setSynced] = useState(false);
   const navigate = useNavigate();
 
   const handleLoginSuccess = (newToken) => { 
@@ -49,6 +54,8 @@ const ExpenseManager = () => {
     localStorage.removeItem('brokemate_token'); 
     setToken(null); 
     setExpenses([]);
+    versionRef.current = null;
+    setSynced(false);
     navigate('/');
   };
 
@@ -60,8 +67,14 @@ const ExpenseManager = () => {
     if (!token) { setLoading(false); return; }
     setLoading(true); setError('');
     try { 
-      const data = await apiFetch('/expenses', { token }); 
+      let version = null;
+      const data = await apiFetch('/expenses', {
+        token,
+        onResponse: (response) => { version = response.headers.get('X-Expenses-Version'); },
+      }); 
+      versionRef.current = version === null ? null : Number(version);
       setExpenses(data || []); 
+      setSynced(versionRef.current !== null);
     }
     catch (err) {
       console.error('Fetch expenses error:', err);
@@ -74,11 +87,71 @@ const ExpenseManager = () => {
 
   useEffect(() => { fetchExpenses(); }, [fetchExpenses]);
 
+  // Apply changes from /expenses/changes or /expenses/stream to the list in state
+  const applyChanges = useCallback((changes) => {
+    const fresh = changes.filter(change => versionRef.current !== null && change.version > versionRef.current);
+    if (fresh.length === 0) return;
+    versionRef.current = fresh[fresh.length - 1].version;
+    setExpenses(current => {
+      const byId = new Map(current.map(expense => [expense.id, expense]));
+      fresh.forEach(change => {
+        if (change.op === 'delete') byId.delete(change.id);
+        else byId.set(change.id, change.expense);
+      });
+      return [...byId.values()].sort((a, b) => (a.date < b.date ? 1 : a.date > b.date ? -1 : 0));
+    });
+  }, []);
+
+  // Fetch only what changed since our version; full refetch if the server no longer has it
+  const syncExpenses = useCallback(async () => {
+    if (versionRef.current === null) return fetchExpenses();
+    try {
+      const data = await apiFetch(`/expenses/changes?since=${versionRef.current}`, { token });
+      applyChanges(data.changes);
+    }
+    catch (err) {
+      if (err.status === 410) return fetchExpenses();
+      console.error('Sync expenses error:', err);
+      setError(err instanceof Error ? err.message : 'Failed to sync expenses');
+    }
+  }, [token, fetchExpenses, applyChanges]);
+
+  // Live updates, e.g. from another tab or device. EventSource reconnects by itself
+  // until its short-lived stream ticket expires; then we fetch a new ticket.
+  useEffect(() => {
+    if (!token || !synced || typeof EventSource === 'undefined') return undefined;
+    let source = null;
+    let retry = null;
+    let closed = false;
+    const connect = async () => {
+      try {
+        const { ticket } = await apiFetch('/expenses/stream-ticket', { method: 'POST', token });
+        if (closed) return;
+        source = new EventSource(`${API_BASE_URL}/expenses/stream?ticket=${encodeURIComponent(ticket)}&since=${versionRef.current}`);
+        source.addEventListener('change', (event) => applyChanges([JSON.parse(event.data)]));
+        source.addEventListener('reset', () => fetchExpenses());
+        source.onerror = () => {
+          if (source.readyState === EventSource.CLOSED && !closed) retry = setTimeout(connect, 5000);
+        };
+      }
+      catch (err) {
+        console.error('Expense stream error:', err);
+        if (!closed) retry = setTimeout(connect, 5000);
+      }
+    };
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retry);
+      if (source) source.close();
+    };
+  }, [token, synced, fetchExpenses, applyChanges]);
+
   const handleAddExpense = async (formData) => {
     setLoading(true); setError('');
     try { 
       await apiFetch('/add-expense', { method: 'POST', body: formData, token }); 
-      fetchExpenses(); 
+      syncExpenses(); 
       setIsAddModalOpen(false); 
     }
     catch (err) { 
@@ -93,8 +166,8 @@ const ExpenseManager = () => {
 
   const TABS = [
     { id: 'overview', label: 'Overview', icon: Wallet, component: <Overview expenses={expenses} /> },
-    { id: 'all', label: 'All Expenses', icon: LayoutList, component: <AllExpenses expenses={expenses} token={token} onAction={fetchExpenses} /> },
-    { id: 'receipt', label: 'Receipt Scanner', icon: Camera, component: <ReceiptUpload token={token} onSuccess={fetchExpenses} /> },
+    { id: 'all', label: 'All Expenses', icon: LayoutList, component: <AllExpenses expenses={expenses} token={token} onAction={syncExpenses} /> },
+    { id: 'receipt', label: 'Receipt Scanner', icon: Camera, component: <ReceiptUpload token={token} onSuccess={syncExpenses} /> },
     { id: 'analysis', label: 'AI Analysis', icon: BrainCircuit, component: <AIAnalysis token={token} /> },
     { id: 'chat', label: 'AI Chat', icon: MessageSquare, component: <AIChat token={token} /> },
   ];
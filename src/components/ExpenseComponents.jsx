@@ -18,7 +18,7 @@ const formatINR = (amount) => {
 
 // --- API Helper ---
 const apiFetch = async (endpoint, options = {}) => {
-  const { body, token, isFormData = false, ...customOptions } = options;
+  const { body, token, isFormData = false, onResponse, ...customOptions } = options;
   const headers = { ...customOptions.headers };
   
   console.log('🔍 API Fetch Debug:', { endpoint, hasToken: !!token, isFormData, options });
@@ -54,8 +54,12 @@ const apiFetch = async (endpoint, options = {}) => {
     if (!response.ok) {
       const errorData = await response.json().catch(() => ({ detail: `HTTP error! Status: ${response.status}` }));
       console.error('❌ API Error Response:', errorData);
-      throw new Error(errorData.detail || `HTTP error! Status: ${response.status}`);
+      const error = new Error(errorData.detail || `HTTP error! Status: ${response.status}`);
+      error.status = response.status;
+      throw error;
     }
+    // Lets callers read response headers, e.g. X-Expenses-Version
+    if (onResponse) onResponse(response);
     if (response.status === 204 || response.headers.get('content-length') === '0') return null;
     const data = await response.json();
     console.log('✅ API Success:', data);
@@ -1003,4 +1007,4 @@ const ReceiptUpload = ({ token, onSuccess }) => {
   );
 };
 
-export { Overview, ExpenseForm, AllExpenses, AIAnalysis, AIChat, ReceiptUpload, Header, TabButton, Card, LoadingSpinner, ErrorDisplay, Modal, formatINR, apiFetch, CATEGORIES };
\ No newline at end of file
+export { Overview, ExpenseForm, AllExpenses, AIAnalysis, AIChat, ReceiptUpload, Header, TabButton, Card, LoadingSpinner, ErrorDisplay, Modal, formatINR, apiFetch, API_BASE_URL, CATEGORIES };
\ No newline at end of file